@@ -12,6 +12,7 @@ Modules disponibles:
 import sys
 import os
 import traceback
+import multiprocessing
 
 def main():
     """Point d'entrée principal de l'application"""
@@ -63,4 +64,6 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
+    # Required for the process pools (migration, indexing) in the frozen executable
+    multiprocessing.freeze_support()
     main()
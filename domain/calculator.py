@@ -143,6 +143,36 @@ class Calculator:
         )
         return result
 
+    @staticmethod
+    def calculate_price_breakdown(operations: List[Any], quantity: int, volume_rate: float = 1.0) -> Dict[str, float]:
+        """Per-piece price of a set of operations at one sale quantity.
+
+        unit_price matches Project.total_price (volume rate applied); fixed_part and
+        variable_part split it. The lot totals (purchase/internal sale, purchase cost,
+        internal hours) feed the comparison metrics.
+        """
+        breakdown = {
+            'unit_cost': 0.0, 'unit_price': 0.0, 'fixed_part': 0.0, 'variable_part': 0.0,
+            'volume_rate': volume_rate, 'purchase_sale': 0.0, 'internal_sale': 0.0,
+            'purchase_cost': 0.0, 'internal_hours': 0.0,
+        }
+        base_price = 0.0
+        for op in operations:
+            for cost in op._get_active_costs():
+                res = Calculator.calculate_item(cost, quantity)
+                breakdown['unit_cost'] += res.unit_cost_converted
+                base_price += res.unit_sale_price
+                breakdown['fixed_part'] += res.fixed_part * volume_rate
+                breakdown['variable_part'] += res.variable_part * volume_rate
+                if cost.cost_type == CostType.INTERNAL_OPERATION:
+                    breakdown['internal_sale'] += res.unit_sale_price * quantity
+                    breakdown['internal_hours'] += cost.fixed_time + cost.per_piece_time * quantity
+                else:
+                    breakdown['purchase_sale'] += res.unit_sale_price * quantity
+                    breakdown['purchase_cost'] += res.batch_supplier_cost
+        breakdown['unit_price'] = base_price * volume_rate
+        return breakdown
+
     @staticmethod
     def _empty_result(qty: int, item: CostItem) -> CalculationResult:
         return CalculationResult(
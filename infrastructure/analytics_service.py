@@ -1,98 +1,358 @@
 from __future__ import annotations
 
-import json
-import statistics
+import threading
+from datetime import date
+from concurrent.futures import ProcessPoolExecutor
 
 from infrastructure.persistence import PersistenceService
+from infrastructure.streaming_stats import RunningStats
+
+# Projects without indexed cost lines are loaded from their file; beyond this many,
+# the loads run in a process pool (see AnalyticsService.refresh_incremental_cache)
+FILE_FALLBACK_POOL_MIN = 8
+ANALYTICS_WORKERS = 4
+
+# Time series (see AnalyticsService.get_time_series): dimensions a series can be split
+# by, and the months shown on the dashboard
+TIME_SERIES_GROUPS = ("client", "typology")
+DEFAULT_ROLLING_MONTHS = 3
+DASHBOARD_MONTHS = 24
+
+# Exported quotes with their month, exported version and series group. Exports
+# written before versions existed have no version_index: they are of version 1.
+_EXPORT_ROWS_SQL = """
+    SELECT e.project_id, e.position, COALESCE(e.version_index, 1) AS version_index,
+           substr(e.export_date, 1, 7) AS month, {group} AS grp
+    FROM exports e JOIN projects p ON p.id = e.project_id
+    WHERE p.is_missing = 0 AND e.export_date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-*'{date_filter}
+"""
+
+# Every month of the range for every group (recursive CTE), months without
+# exports at zero: the series have no gaps and the rolling windows count them
+_FILLED_SQL = """,
+    months(month) AS (
+        SELECT COALESCE(?, (SELECT MIN(month) FROM monthly))
+        UNION ALL
+        SELECT strftime('%Y-%m', month || '-01', '+1 month') FROM months
+        WHERE month < COALESCE(?, (SELECT MAX(month) FROM monthly))
+    ),
+    filled AS (
+        SELECT g.grp, m.month,
+               COALESCE(mo.export_count, 0) AS export_count, COALESCE(mo.quote_count, 0) AS quote_count,
+               CASE WHEN mo.month IS NULL THEN {gap_value} ELSE mo.quoted_value END AS quoted_value,
+               COALESCE(mo.margin_sum, 0.0) AS margin_sum, COALESCE(mo.lines, 0) AS lines
+        FROM (SELECT DISTINCT grp FROM monthly) g
+        CROSS JOIN months m
+        LEFT JOIN monthly mo ON mo.grp IS g.grp AND mo.month = m.month
+    )
+"""
+
+# Month totals per group, then rolling figures over the months ending at each row
+# (a month without exports has no margin and weighs nothing in the rolling margin)
+_WINDOW_SQL = """
+    SELECT grp, month, export_count, quote_count, quoted_value,
+           margin_sum / NULLIF(lines, 0) AS margin,
+           SUM(margin_sum) OVER w / NULLIF(SUM(lines) OVER w, 0) AS rolling_margin,
+           AVG(quoted_value) OVER w AS rolling_quoted_value,
+           SUM(export_count) OVER w AS rolling_export_count
+    FROM filled
+    WINDOW w AS (PARTITION BY grp
+                 ORDER BY CAST(substr(month, 1, 4) AS INTEGER) * 12 + CAST(substr(month, 6, 2) AS INTEGER)
+                 RANGE BETWEEN {preceding} PRECEDING AND CURRENT ROW)
+    ORDER BY grp, month
+"""
+
+# Per exported version: margin of its priced cost lines and value at its largest quantity
+_PROJECT_MONTHLY_SQL = """
+    WITH export_rows AS ({export_rows}),
+    version_margins AS (
+        SELECT project_id, version_index, SUM(COALESCE(margin_rate, 0.0)) AS margin_sum, COUNT(*) AS lines
+        FROM cost_lines
+        WHERE in_piece_price = 1
+          AND (project_id, version_index) IN (SELECT project_id, version_index FROM export_rows)
+        GROUP BY project_id, version_index
+    ),
+    version_values AS (
+        SELECT project_id, version_index, value FROM (
+            SELECT project_id, version_index, unit_price * quantity AS value,
+                   ROW_NUMBER() OVER (PARTITION BY project_id, version_index ORDER BY quantity DESC) AS rank
+            FROM project_prices
+            WHERE (project_id, version_index) IN (SELECT project_id, version_index FROM export_rows)
+        ) WHERE rank = 1
+    ),
+    monthly AS (
+        SELECT er.grp, er.month, COUNT(*) AS export_count, COUNT(DISTINCT er.project_id) AS quote_count,
+               SUM(vv.value) AS quoted_value, SUM(vm.margin_sum) AS margin_sum, SUM(vm.lines) AS lines
+        FROM export_rows er
+        LEFT JOIN version_margins vm ON vm.project_id = er.project_id AND vm.version_index = er.version_index
+        LEFT JOIN version_values vv ON vv.project_id = er.project_id AND vv.version_index = er.version_index
+        GROUP BY er.grp, er.month
+    )
+"""
+
+# Per typology: cost lines of the exported versions (no quoted value: prices are per part)
+_TYPOLOGY_MONTHLY_SQL = """
+    WITH export_rows AS ({export_rows}),
+    monthly AS (
+        SELECT COALESCE(NULLIF(TRIM(cl.typology), ''), 'N/A') AS grp, er.month,
+               COUNT(DISTINCT er.project_id || ':' || er.position) AS export_count,
+               COUNT(DISTINCT er.project_id) AS quote_count, NULL AS quoted_value,
+               SUM(COALESCE(cl.margin_rate, 0.0)) AS margin_sum, COUNT(*) AS lines
+        FROM export_rows er
+        JOIN cost_lines cl ON cl.project_id = er.project_id AND cl.version_index = er.version_index
+                          AND cl.in_piece_price = 1
+        GROUP BY 1, er.month
+    )
+"""
+
+
+def _months_back(day: date, months: int) -> str:
+    """"YYYY-MM" of the month `months` months before the month of `day`."""
+    index = day.year * 12 + day.month - 1 - months
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def margins_from_file(filepath: str) -> tuple[float, dict]:
+    """Average margin and margins per typology of a project file. Runs in a worker process."""
+    try:
+        project = PersistenceService.load_project(filepath)
+    except Exception as e:
+        print(f"Analytics: could not load {filepath}: {e}")
+        return 0.0, {}
+    margins = RunningStats()
+    typology_margins: dict[str, RunningStats] = {}
+    for op in project.operations:
+        typ = (op.typology or "N/A").strip() or "N/A"
+        for cost in op._get_active_costs():
+            m = float(getattr(cost, "margin_rate", 0.0) or 0.0)
+            margins.add(m)
+            typology_margins.setdefault(typ, RunningStats()).add(m)
+
+    typology_avg = {typ: round(stats.mean, 3) for typ, stats in typology_margins.items()}
+    return round(margins.mean, 3), typology_avg
 
 
 class AnalyticsService:
-    """Business analytics with lightweight incremental cache."""
+    """Business analytics with an incremental cache, refreshed in the background.
+
+    Per-project metrics live in analytics_project_cache / analytics_typology_cache
+    (created by the schema migrations) and are recomputed only for projects whose
+    last_modified changed. Dashboard aggregates are computed in SQL over those
+    tables: get_cached_dashboard_data answers at once from the last refresh, while
+    refresh_in_background brings the cache up to date off the UI thread.
+    """
 
     LARGE_DATASET_THRESHOLD = 10000
 
-    def __init__(self, db):
+    def __init__(self, db, max_workers: int = ANALYTICS_WORKERS):
         self.db = db
+        self.max_workers = max(1, max_workers)
+        self._refresh_lock = threading.Lock()
+        self._refresh_thread = None
+        self._refresh_callbacks = []
 
     def get_dashboard_data(self) -> dict:
+        """Refresh the cache, then aggregate it (blocking: use refresh_in_background from the UI)."""
         self.refresh_incremental_cache()
         return self._aggregate_from_cache()
 
-    def refresh_incremental_cache(self):
-        rows = self.db.search_projects(include_missing=False, sort_by="last_modified", sort_order="DESC")
+    def get_cached_dashboard_data(self) -> dict:
+        """Aggregates of the last refresh, without refreshing ('refreshed_at' None when never run)."""
+        return self._aggregate_from_cache()
+
+    def refresh_in_background(self, callback=None) -> bool:
+        """Refresh the cache in a background thread, then call callback(dashboard data).
+
+        When a refresh is already running, callback is called once it ends.
+        Returns True when a new refresh was started. callback runs in the
+        background thread (use wx.CallAfter from the UI).
+        """
+        with self._refresh_lock:
+            if callback is not None:
+                self._refresh_callbacks.append(callback)
+            if self._refresh_thread is not None:
+                return False
+            self._refresh_thread = threading.Thread(target=self._refresh_worker, name="analytics-refresh")
+            self._refresh_thread.daemon = True
+            self._refresh_thread.start()
+            return True
+
+    @property
+    def is_refreshing(self) -> bool:
+        return self._refresh_thread is not None
+
+    def _refresh_worker(self):
+        data = None
+        try:
+            self.refresh_incremental_cache()
+            data = self._aggregate_from_cache()
+        except Exception as e:
+            print(f"Analytics refresh error: {e}")
+        finally:
+            with self._refresh_lock:
+                callbacks, self._refresh_callbacks = self._refresh_callbacks, []
+                self._refresh_thread = None
+        if data is None:
+            return
+        for callback in callbacks:
+            try:
+                callback(data)
+            except Exception as e:
+                print(f"Analytics callback error: {e}")
+
+    def refresh_incremental_cache(self) -> int:
+        """Recompute the metrics of new and changed projects; returns how many."""
         with self.db.get_connection() as conn:
             cur = conn.cursor()
-            cur.execute("SELECT project_id, last_modified FROM analytics_project_cache")
-            existing = {r[0]: r[1] for r in cur.fetchall()}
-
-            current_ids = set()
-            for row in rows:
-                pid = row["id"]
-                current_ids.add(pid)
-                lm = str(row.get("last_modified") or "")
-                if existing.get(pid) == lm:
-                    continue
-                metrics = self._compute_project_metrics(row)
-                cur.execute(
-                    "INSERT OR REPLACE INTO analytics_project_cache "
-                    "(project_id, last_modified, client, status, exports_count, avg_margin, typology_margins_json, updated_at) "
-                    "VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)",
-                    (
-                        pid,
-                        lm,
-                        metrics["client"],
-                        metrics["status"],
-                        metrics["exports_count"],
-                        metrics["avg_margin"],
-                        json.dumps(metrics["typology_margins"], ensure_ascii=False),
-                    ),
-                )
-
-            # remove deleted projects from cache
-            for pid in existing.keys():
-                if pid not in current_ids:
-                    cur.execute("DELETE FROM analytics_project_cache WHERE project_id = ?", (pid,))
+            cur.execute("""
+                SELECT p.id, COALESCE(p.last_modified, ''), COALESCE(p.client, ''), p.filepath
+                FROM projects p LEFT JOIN analytics_project_cache c ON c.project_id = p.id
+                WHERE p.is_missing = 0
+                  AND (c.project_id IS NULL OR c.last_modified IS NOT COALESCE(p.last_modified, ''))
+            """)
+            changed = cur.fetchall()
+
+        ids = [row[0] for row in changed]
+        # Margins come from the indexed cost lines: one query instead of one file load per project
+        margin_stats = self.db.get_margin_stats(ids) if ids else {}
+        export_counts = self.db.get_export_counts(ids) if ids else {}
+        # No indexed cost line (empty quote, or indexed before the cost_lines table existed)
+        from_files = self._margins_from_files([row[3] for row in changed if row[0] not in margin_stats])
 
+        project_rows, typology_rows = [], []
+        for pid, last_modified, client, filepath in changed:
+            stats = margin_stats.get(pid)
+            if stats is not None:
+                avg_margin = round(stats["avg_margin"], 3)
+                typology_avg = {typ: round(val, 3) for typ, val in stats["typology_margins"].items()}
+            else:
+                avg_margin, typology_avg = from_files.get(filepath, (0.0, {}))
+            project_rows.append((pid, str(last_modified), client, "", export_counts.get(pid, 0), avg_margin))
+            typology_rows.extend((pid, typ, val) for typ, val in typology_avg.items())
+
+        with self.db.get_connection() as conn:
+            cur = conn.cursor()
+            cur.executemany("DELETE FROM analytics_typology_cache WHERE project_id = ?", [(pid,) for pid in ids])
+            cur.executemany(
+                "INSERT OR REPLACE INTO analytics_project_cache "
+                "(project_id, last_modified, client, status, exports_count, avg_margin, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)",
+                project_rows,
+            )
+            cur.executemany(
+                "INSERT INTO analytics_typology_cache (project_id, typology, avg_margin) VALUES (?, ?, ?)",
+                typology_rows,
+            )
+            # Deleted and missing projects leave the cache
+            cur.execute("DELETE FROM analytics_project_cache "
+                        "WHERE project_id NOT IN (SELECT id FROM projects WHERE is_missing = 0)")
+            cur.execute("DELETE FROM analytics_typology_cache "
+                        "WHERE project_id NOT IN (SELECT project_id FROM analytics_project_cache)")
             cur.execute(
-                "INSERT OR REPLACE INTO analytics_cache_meta (key, value, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP)",
-                ("last_refresh_count", str(len(rows))),
+                "INSERT OR REPLACE INTO analytics_cache_meta (key, value, updated_at) "
+                "SELECT 'last_refresh_count', COUNT(*), CURRENT_TIMESTAMP FROM analytics_project_cache"
             )
             conn.commit()
+        return len(changed)
 
-    def _compute_project_metrics(self, db_row) -> dict:
-        filepath = db_row.get("filepath")
-        project = PersistenceService.load_project(filepath)
-        margins = []
-        typology_map: dict[str, list[float]] = {}
-        for op in project.operations:
-            for cost in op._get_active_costs():
-                m = float(getattr(cost, "margin_rate", 0.0) or 0.0)
-                margins.append(m)
-                typ = (op.typology or "N/A").strip() or "N/A"
-                typology_map.setdefault(typ, []).append(m)
-
-        typology_avg = {}
-        for typ, values in typology_map.items():
-            typology_avg[typ] = round(statistics.mean(values), 3) if values else 0.0
-
-        devis_refs = db_row.get("devis_refs") or ""
-        exports_count = len([x for x in devis_refs.split(",") if x.strip()])
-        avg_margin = round(statistics.mean(margins), 3) if margins else 0.0
-        return {
-            "client": db_row.get("client") or "",
-            "status": db_row.get("status") or "",
-            "exports_count": exports_count,
-            "avg_margin": avg_margin,
-            "typology_margins": typology_avg,
-        }
+    def _margins_from_files(self, filepaths: list) -> dict:
+        """{filepath: (avg_margin, typology margins)}, loaded in a process pool when many."""
+        if len(filepaths) < FILE_FALLBACK_POOL_MIN or self.max_workers == 1:
+            return {path: margins_from_file(path) for path in filepaths}
+        with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+            return dict(zip(filepaths, pool.map(margins_from_file, filepaths, chunksize=16)))
+
+    def get_time_series(self, group_by: str = None, start: str = None, end: str = None,
+                        rolling_months: int = DEFAULT_ROLLING_MONTHS) -> list[dict]:
+        """Monthly margin, quoted value, quote and export counts, with rolling averages.
+
+        Quotes are counted in the month they were exported (exports table), for
+        the version they were exported for. group_by None gives one series,
+        "client" or "typology" one series per value (typology series have no
+        quoted value: prices are per part, not per operation). start / end are
+        "YYYY-MM" months, both included. Every month from start (default: the
+        first exported month) to end (default: the last one) has a row, at zero
+        counts and value and no margin when nothing was exported. Rolling
+        figures cover the rolling_months months ending at each month.
+
+        Returns rows {'group', 'month', 'margin', 'quoted_value', 'quote_count',
+        'export_count', 'rolling_margin', 'rolling_quoted_value',
+        'rolling_export_count'}, ordered by group and month. Everything is
+        computed by SQLite (window functions over the index tables).
+        """
+        if group_by is not None and group_by not in TIME_SERIES_GROUPS:
+            raise ValueError(f"Unknown time series group: {group_by}")
+        date_filter, params = "", []
+        if start:
+            date_filter += " AND e.export_date >= ?"
+            params.append(f"{start}-01")
+        if end:
+            # Every day of the end month sorts before "YYYY-MM-~"
+            date_filter += " AND e.export_date < ?"
+            params.append(f"{end}-~")
+
+        group = "COALESCE(NULLIF(p.client, ''), '(vide)')" if group_by == "client" else "NULL"
+        export_rows = _EXPORT_ROWS_SQL.format(group=group, date_filter=date_filter)
+        template = _TYPOLOGY_MONTHLY_SQL if group_by == "typology" else _PROJECT_MONTHLY_SQL
+        query = (template.format(export_rows=export_rows)
+                 + _FILLED_SQL.format(gap_value="NULL" if group_by == "typology" else "0.0")
+                 + _WINDOW_SQL.format(preceding=max(1, int(rolling_months)) - 1))
+        params += [start, end]
 
-    def _aggregate_from_cache(self) -> dict:
         with self.db.get_connection() as conn:
             cur = conn.cursor()
-            cur.execute("SELECT client, status, exports_count, avg_margin, typology_margins_json FROM analytics_project_cache")
+            cur.execute(query, params)
             rows = cur.fetchall()
 
-        if not rows:
+        def rounded(value, digits):
+            return round(value, digits) if value is not None else None
+
+        return [
+            {
+                "group": grp,
+                "month": month,
+                "margin": rounded(margin, 3),
+                "quoted_value": rounded(value, 2),
+                "quote_count": quote_count,
+                "export_count": export_count,
+                "rolling_margin": rounded(rolling_margin, 3),
+                "rolling_quoted_value": rounded(rolling_value, 2),
+                "rolling_export_count": rolling_exports,
+            }
+            for grp, month, export_count, quote_count, value, margin, rolling_margin, rolling_value, rolling_exports
+            in rows
+        ]
+
+    def _aggregate_from_cache(self) -> dict:
+        with self.db.get_connection() as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                SELECT COUNT(*),
+                       COALESCE(SUM(status = 'Finalisée'), 0),
+                       COALESCE(SUM(status = 'Transmise'), 0),
+                       COALESCE(SUM(exports_count), 0)
+                FROM analytics_project_cache
+            """)
+            total_projects, finalized_count, transmitted_count, total_exports = cur.fetchone()
+            cur.execute("""
+                SELECT COALESCE(NULLIF(client, ''), '(vide)') AS client_name,
+                       ROUND(AVG(COALESCE(avg_margin, 0.0)), 3) AS margin, COUNT(*)
+                FROM analytics_project_cache
+                GROUP BY client_name ORDER BY margin DESC LIMIT 20
+            """)
+            by_client = [{"client": c, "avg_margin": m, "projects_count": n} for c, m, n in cur.fetchall()]
+            cur.execute("""
+                SELECT typology, ROUND(AVG(COALESCE(avg_margin, 0.0)), 3) AS margin, COUNT(*)
+                FROM analytics_typology_cache
+                GROUP BY typology ORDER BY margin DESC
+            """)
+            by_typology = [{"typology": t, "avg_margin": m, "samples": n} for t, m, n in cur.fetchall()]
+            cur.execute("SELECT updated_at FROM analytics_cache_meta WHERE key = 'last_refresh_count'")
+            refreshed = cur.fetchone()
+
+        today = date.today()
+        monthly = self.get_time_series(start=_months_back(today, DASHBOARD_MONTHS - 1), end=_months_back(today, 0))
+        if not total_projects:
             return {
                 "kpis": {
                     "projects_total": 0,
@@ -102,57 +362,25 @@ class AnalyticsService:
                 },
                 "margin_by_client": [],
                 "margin_by_typology": [],
+                "monthly": monthly,
+                "refreshed_at": refreshed[0] if refreshed else None,
             }
 
-        margins_by_client: dict[str, list[float]] = {}
-        margins_by_typology: dict[str, list[float]] = {}
-        finalized_count = 0
-        transmitted_count = 0
-        total_exports = 0
-
-        for client, status, exports_count, avg_margin, typ_json in rows:
-            margins_by_client.setdefault(client or "(vide)", []).append(float(avg_margin or 0.0))
-            total_exports += int(exports_count or 0)
-            if (status or "") == "Finalisée":
-                finalized_count += 1
-            if (status or "") == "Transmise":
-                transmitted_count += 1
-
-            try:
-                tmap = json.loads(typ_json or "{}")
-            except Exception:
-                tmap = {}
-            for typ, val in tmap.items():
-                margins_by_typology.setdefault(typ, []).append(float(val or 0.0))
-
-        total_projects = len(rows)
-        non_finalized = len([1 for _, s, *_ in rows if (s or "") != "Finalisée"])
-        transformation_rate = (transmitted_count / total_projects * 100.0) if total_projects else 0.0
-        avg_exports = (total_exports / total_projects) if total_projects else 0.0
-
-        by_client = [
-            {"client": c, "avg_margin": round(statistics.mean(vals), 3), "projects_count": len(vals)}
-            for c, vals in margins_by_client.items()
-        ]
-        by_client.sort(key=lambda x: x["avg_margin"], reverse=True)
-
-        by_typology = [
-            {"typology": t, "avg_margin": round(statistics.mean(vals), 3), "samples": len(vals)}
-            for t, vals in margins_by_typology.items()
-        ]
-        by_typology.sort(key=lambda x: x["avg_margin"], reverse=True)
-
+        transformation_rate = transmitted_count / total_projects * 100.0
+        avg_exports = total_exports / total_projects
         return {
             "kpis": {
                 "projects_total": total_projects,
-                "projects_non_finalized": non_finalized,
+                "projects_non_finalized": total_projects - finalized_count,
                 "transformation_rate_pct": round(transformation_rate, 2),
                 "avg_exports_per_project": round(avg_exports, 2),
                 "finalized_projects": finalized_count,
                 "transmitted_projects": transmitted_count,
             },
-            "margin_by_client": by_client[:20],
+            "margin_by_client": by_client,
             "margin_by_typology": by_typology,
+            "monthly": monthly,
             "cache_mode": "incremental",
             "large_dataset": total_projects > self.LARGE_DATASET_THRESHOLD,
+            "refreshed_at": refreshed[0] if refreshed else None,
         }
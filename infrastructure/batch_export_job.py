@@ -0,0 +1,140 @@
+# infrastructure/batch_export_job.py
+"""
+Batch XLSX quote export (multi-selection quick export, month-end price lists).
+
+- The quote numbers of the whole batch are reserved in one numbering
+  transaction before anything is rendered.
+- Workbooks are rendered in a process pool: loading the project and filling
+  the template (openpyxl) are CPU-bound. Each worker compiles the template
+  once (see export_service.compile_template) and reuses it for its quotes.
+- The export history entry is written back to each project with
+  PersistenceService.append_export_entry: only project.json and the new XLSX
+  change in the archive, the project is not saved in full. The rewritten
+  files are re-indexed once the batch ends (exports table, signatures).
+- stop() cancels the quotes not started yet; their numbers stay reserved.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, List
+
+from infrastructure.export_service import ExportService
+from infrastructure.indexer import Indexer
+from infrastructure.persistence import PersistenceService
+
+MAX_IN_FLIGHT_PER_WORKER = 2
+
+
+def export_project_quote(filepath: str, template_path: str, output_dir: str, devis_ref: str) -> Dict:
+    """Render the XLSX quote of one project and record it in its history. Runs in a worker process.
+
+    Returns a result dict (never raises) so the coordinator can report every item.
+    """
+    started = time.perf_counter()
+    result = {"filepath": filepath, "devis_ref": devis_ref, "reference": None,
+              "output_path": None, "status": "failed", "error": None}
+    try:
+        project = PersistenceService.load_project(filepath)
+        result["reference"] = project.reference
+        service = ExportService()
+        output_path = os.path.join(output_dir, service.get_default_filename(project, devis_ref=devis_ref))
+        service.export_excel(project, template_path, output_path, devis_ref=devis_ref)
+        PersistenceService.append_export_entry(filepath, project.export_history[-1])
+        result["output_path"] = output_path
+        result["status"] = "done"
+    except Exception as e:
+        result["error"] = str(e)
+    finally:
+        result["duration_ms"] = int((time.perf_counter() - started) * 1000)
+    return result
+
+
+class BatchExportJob:
+    """Parallel, cancellable XLSX export of several projects."""
+
+    def __init__(self, db, max_workers: int = None, indexer: Indexer = None):
+        self.db = db
+        self.max_workers = max_workers or max(1, min(8, os.cpu_count() or 1))
+        self.indexer = indexer or Indexer(db)
+        self.export_service = ExportService(db)
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        """Request a clean stop; in-flight exports finish and are reported."""
+        self._stop_event.set()
+
+    def run(self, filepaths: List[str], template_path: str, output_dir: str,
+            progress_callback: Callable[[Dict, int, int], None] = None) -> Dict:
+        """Export the quotes of filepaths into output_dir.
+
+        progress_callback(result, processed, total) is called for each project
+        as its export ends (status "done" or "failed"), from the calling thread.
+        The returned stats hold the per-project results in the input order,
+        cancelled ones included (status "cancelled").
+        """
+        self._stop_event.clear()
+        # The same project twice would be written by two workers at once
+        filepaths = list(dict.fromkeys(filepaths))
+        references = self.export_service.reserve_devis_references(len(filepaths)) if filepaths else []
+
+        stats = {
+            "total": len(filepaths),
+            "exported": 0,
+            "failed": 0,
+            "cancelled": 0,
+            "results": [],
+            "elapsed_s": 0.0,
+            "quotes_per_s": 0.0,
+        }
+        results = [None] * len(filepaths)
+        started = time.perf_counter()
+        processed = 0
+
+        if filepaths:
+            os.makedirs(output_dir, exist_ok=True)
+            workers = min(self.max_workers, len(filepaths))
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                queue = iter(enumerate(filepaths))
+                in_flight = {}
+                max_in_flight = workers * MAX_IN_FLIGHT_PER_WORKER
+                exhausted = False
+                while True:
+                    while not exhausted and not self._stop_event.is_set() and len(in_flight) < max_in_flight:
+                        item = next(queue, None)
+                        if item is None:
+                            exhausted = True
+                            break
+                        index, filepath = item
+                        future = pool.submit(export_project_quote, filepath, template_path, output_dir,
+                                             references[index])
+                        in_flight[future] = index
+                    if not in_flight:
+                        break
+
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        index = in_flight.pop(future)
+                        result = future.result()
+                        results[index] = result
+                        stats["exported" if result["status"] == "done" else "failed"] += 1
+                        processed += 1
+                        if progress_callback:
+                            progress_callback(result, processed, len(filepaths))
+
+        # The history entries changed the files: refresh their rows like a single export does
+        for result in results:
+            if result is not None and result["status"] == "done":
+                self.indexer.index_file(result["filepath"])
+
+        for index, result in enumerate(results):
+            if result is None:
+                results[index] = {"filepath": filepaths[index], "devis_ref": references[index], "reference": None,
+                                  "output_path": None, "status": "cancelled", "error": None}
+                stats["cancelled"] += 1
+        stats["results"] = results
+        stats["interrupted"] = stats["cancelled"] > 0
+        stats["elapsed_s"] = round(time.perf_counter() - started, 2)
+        stats["quotes_per_s"] = round(processed / stats["elapsed_s"], 2) if stats["elapsed_s"] > 0 else 0.0
+        return stats
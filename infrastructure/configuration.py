@@ -1,7 +1,17 @@
 # infrastructure/configuration.py
 import json
 import os
-from typing import List, Optional
+from typing import Dict, List, Optional
+
+# Directory listings read in parallel per quote root (see DirectoryScanner): a local
+# disk takes many, a NAS or a slow share only a few
+DEFAULT_ROOT_IO_WORKERS = 4
+MAX_ROOT_IO_WORKERS = 32
+
+
+def _same_folder(a: str, b: str) -> bool:
+    return os.path.normcase(os.path.normpath(a)) == os.path.normcase(os.path.normpath(b))
+
 
 class ConfigurationService:
     """Service to load and manage application configuration."""
@@ -31,8 +41,11 @@ class ConfigurationService:
             "cost_typologies": [],
             "project_tags": [],
             "quotes_root_folder": None,
+            "quote_roots": [],
             "auto_migrate_on_root_change": True,
-            "use_uuid_for_filenames": True
+            "use_uuid_for_filenames": True,
+            "indexer_workers": 0,
+            "watch_quotes_folder": True
         }
         
         # 1. Try to load from persistent AppData path
@@ -101,6 +114,60 @@ class ConfigurationService:
         self.save()
         return old_folder
 
+    def get_quote_roots(self) -> List[Dict]:
+        """Every folder indexed for quotes, the main quotes folder first.
+
+        Each root is {'path', 'label', 'io_workers'}; io_workers bounds the
+        directory listings read in parallel on that root. The main folder is
+        where new quotes are saved; the others (archives, legacy trees) are
+        registered with add_quote_root.
+        """
+        main = self.get_quotes_root_folder()
+        roots = []
+        for root in self.config.get("quote_roots", []):
+            if isinstance(root, dict) and root.get("path"):
+                roots.append({
+                    'path': root["path"],
+                    'label': root.get("label") or "",
+                    'io_workers': self._clamp_io_workers(root.get("io_workers")),
+                })
+        main_root = next((r for r in roots if _same_folder(r['path'], main)), None)
+        if main_root is None:
+            main_root = {'path': main, 'label': "", 'io_workers': DEFAULT_ROOT_IO_WORKERS}
+        else:
+            roots.remove(main_root)
+        return [main_root] + roots
+
+    def add_quote_root(self, path: str, label: str = "", io_workers: int = DEFAULT_ROOT_IO_WORKERS):
+        """Register a quote root (or update the label / limit of a registered one)."""
+        roots = [r for r in self.config.get("quote_roots", [])
+                 if isinstance(r, dict) and r.get("path") and not _same_folder(r["path"], path)]
+        roots.append({"path": path, "label": label or "", "io_workers": self._clamp_io_workers(io_workers)})
+        self.config["quote_roots"] = roots
+        self.save()
+
+    def remove_quote_root(self, path: str) -> bool:
+        """Unregister a quote root. The main quotes folder cannot be removed."""
+        roots = self.config.get("quote_roots", [])
+        kept = [r for r in roots if not (isinstance(r, dict) and r.get("path") and _same_folder(r["path"], path))]
+        if len(kept) == len(roots):
+            return False
+        self.config["quote_roots"] = kept
+        self.save()
+        return True
+
+    def set_quote_root_io_workers(self, path: str, io_workers: int):
+        """Set the number of parallel directory listings of a quote root."""
+        root = next((r for r in self.get_quote_roots() if _same_folder(r['path'], path)), None)
+        self.add_quote_root(path, root['label'] if root else "", io_workers)
+
+    @staticmethod
+    def _clamp_io_workers(value) -> int:
+        try:
+            return max(1, min(MAX_ROOT_IO_WORKERS, int(value)))
+        except (TypeError, ValueError):
+            return DEFAULT_ROOT_IO_WORKERS
+
     def is_auto_migrate_enabled(self) -> bool:
         """Check if automatic migration is enabled."""
         return self.config.get("auto_migrate_on_root_change", True)
@@ -118,3 +185,21 @@ class ConfigurationService:
         """Enable/disable UUID-based filenames."""
         self.config["use_uuid_for_filenames"] = use_uuid
         self.save()
+
+    def get_indexer_workers(self) -> int:
+        """Number of worker processes used to parse files while indexing (0 = automatic)."""
+        return int(self.config.get("indexer_workers", 0) or 0)
+
+    def set_indexer_workers(self, workers: int):
+        """Set the number of indexing worker processes (0 = automatic)."""
+        self.config["indexer_workers"] = max(0, int(workers))
+        self.save()
+
+    def is_folder_watch_enabled(self) -> bool:
+        """Check if the quotes root folder is watched for live re-indexing."""
+        return self.config.get("watch_quotes_folder", True)
+
+    def set_folder_watch_enabled(self, enabled: bool):
+        """Enable/disable live re-indexing of the quotes root folder."""
+        self.config["watch_quotes_folder"] = enabled
+        self.save()
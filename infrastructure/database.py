@@ -1,9 +1,143 @@
 import sqlite3
 import datetime
+import functools
+import threading
+from collections import OrderedDict
 from typing import List, Dict, Optional
 import os
+import re
+
+from infrastructure.fuzzy_match import (
+    DEFAULT_MIN_SIMILARITY, FUZZY_FIELDS, min_shared, padded_key, similarity, trigrams,
+)
+
+# Rows per transaction in upsert_projects_bulk
+BULK_BATCH_SIZE = 500
+
+# Full-text indexed fields of a project (see Indexer.build_search_document), with
+# their bm25 weight: a hit on the reference outranks a hit in a comment
+FTS_COLUMNS = (
+    ("name", 5.0),
+    ("reference", 10.0),
+    ("client", 5.0),
+    ("operations", 2.0),
+    ("costs", 1.5),
+    ("comments", 1.0),
+    ("supplier_refs", 8.0),
+    ("templates", 2.0),
+)
+
+# Denormalized project structure (see Indexer.build_structure_rows), in row order
+OPERATION_COLUMNS = (
+    "version_index", "is_current_version", "position", "code", "label", "typology",
+    "template_id", "template_name", "template_drift_score", "cost_count",
+)
+COST_LINE_COLUMNS = (
+    "version_index", "is_current_version", "op_position", "position", "op_code", "typology",
+    "name", "cost_type", "pricing_type", "fixed_time", "per_piece_time", "hourly_rate",
+    "margin_rate", "fixed_price", "unit_price", "tier_count", "is_active", "in_piece_price",
+    "supplier_quote_ref",
+)
+
+# Price breakdown per project version and sale quantity (see Indexer.build_price_rows,
+# Calculator.calculate_price_breakdown), in row order
+PRICE_COLUMNS = (
+    "version_index", "is_current_version", "quantity", "unit_cost", "unit_price",
+    "fixed_part", "variable_part", "volume_rate", "purchase_sale", "internal_sale",
+    "purchase_cost", "internal_hours",
+)
+
+# Export history of every project (see Indexer.build_export_rows), in row order
+EXPORT_COLUMNS = (
+    "position", "devis_ref", "export_date", "export_time", "version_index",
+    "xlsx_filename", "xlsx_path", "xlsx_size",
+)
+# Quote number as issued by QuoteNumberingService (OD260202_014), optionally followed
+# by the version it was quoted for, as written on customer orders (OD260202_014-1)
+QUOTE_NUMBER_PATTERN = re.compile(r"^([A-Za-z]{1,6}\d{6}_\d{3,})(?:-(\d+))?$")
+
+# UPSERT ... RETURNING (SQLite 3.35+); older versions read the counter back in the
+# same transaction (see reserve_quote_numbers)
+HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# Schema migrations (Database methods), in order: the schema version of a file
+# (PRAGMA user_version) is the number of steps already applied to it
+SCHEMA_MIGRATIONS = (
+    "_migrate_projects",
+    "_migrate_structure",
+    "_migrate_prices",
+    "_migrate_full_text",
+    "_migrate_thumbnails",
+    "_migrate_fuzzy_keys",
+    "_migrate_quote_numbers",
+    "_migrate_migration_journal",
+    "_migrate_analytics_cache",
+    "_migrate_exports",
+    "_migrate_analytics_typologies",
+    "_migrate_migration_fingerprints",
+)
+SCHEMA_VERSION = len(SCHEMA_MIGRATIONS)
+
+# Fuzzy search (see fuzzy_search_projects): index entries read at most per query,
+# rarest trigrams first, and candidates scored exactly per result wanted
+FUZZY_MAX_POSTINGS = 20000
+FUZZY_CANDIDATES_PER_RESULT = 10
+
+# Applied to every connection when it is opened. mmap and a larger page cache keep
+# the index in memory; WAL lets readers run while the indexer writes.
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    # Safe with WAL: a power loss can only lose the last commits, never corrupt the file
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-32000",
+    "PRAGMA temp_store=MEMORY",
+)
+# Compiled statements kept per connection (sqlite3 statement cache)
+STATEMENT_CACHE_SIZE = 256
+
+# Sortable search columns (list header label or column name -> projects column);
+# each has an index on (is_missing, column) for ordered, paginated reads
+SORT_COLUMNS = {
+    "Référence": "reference",
+    "Client": "client",
+    "Q. Min": "min_qty",
+    "Q. Max": "max_qty",
+    "Modifié le": "last_modified",
+    "reference": "reference",
+    "client": "client",
+    "min_qty": "min_qty",
+    "max_qty": "max_qty",
+    "last_modified": "last_modified",
+}
+
+# Search results kept in memory per Database (see search_projects)
+SEARCH_CACHE_SIZE = 64
+
+# Columns written by upsert_project / upsert_projects_bulk, in statement order
+_PROJECT_COLUMNS = (
+    "name", "reference", "client", "filepath", "drawing_filename", "preview_filename",
+    "last_modified", "min_qty", "max_qty", "content_hash", "mwq_uuid", "has_serie",
+    "is_prototype", "file_size", "file_mtime_ns", "file_inode",
+)
+
+
+def _writes_projects(method):
+    """Mark a method that changes project rows: cached search results become stale."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self._bump_generation()
+    return wrapper
+
 
 class Database:
+    # Write generation of each database file, shared by all Database objects of the process
+    _generations = {}
+    _generation_lock = threading.Lock()
+
     def __init__(self, db_path: str = None):
         if db_path is None:
             app_data = os.environ.get('LOCALAPPDATA', os.path.expanduser('~\\AppData\\Local'))
@@ -13,17 +147,148 @@ class Database:
             db_path = os.path.join(db_dir, "mwquote_index.db")
 
         self.db_path = db_path
+        # One persistent connection per thread (see get_connection)
+        self._local = threading.local()
+        self._connections = {}  # thread ident -> connection
+        self._connections_lock = threading.Lock()
+        # Long-lived connection of the bulk writer (see upsert_projects_bulk)
+        self._writer_conn = None
+        self._writer_lock = threading.Lock()
+
+        # Search results, stamped with the write generation they were read at
+        self._search_cache = OrderedDict()
+        self._search_cache_lock = threading.Lock()
+
+        self._key = os.path.abspath(db_path)
+        # Services build their own Database(): on a current schema this is one pragma read
         self.init_db()
 
-    def get_connection(self):
-        return sqlite3.connect(self.db_path)
+    def _connect(self, **kwargs) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, cached_statements=STATEMENT_CACHE_SIZE, **kwargs)
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def get_connection(self) -> sqlite3.Connection:
+        """Persistent connection of the calling thread.
+
+        Opened once per thread with the pragmas applied, then reused: its statement
+        cache stays warm. Use it as `with db.get_connection() as conn:` (commits on
+        exit, does not close). row_factory is reset to tuples on each call.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            try:
+                conn.in_transaction
+            except sqlite3.ProgrammingError:
+                # Closed by a caller or by close()
+                conn = None
+        if conn is None:
+            # Connections are closed by close(), from whichever thread shuts down
+            conn = self._connect(check_same_thread=False)
+            self._local.conn = conn
+            with self._connections_lock:
+                self._close_dead_thread_connections()
+                self._connections[threading.get_ident()] = conn
+        conn.row_factory = None
+        return conn
+
+    def _close_dead_thread_connections(self):
+        alive = {t.ident for t in threading.enumerate()}
+        for ident in [i for i in self._connections if i not in alive]:
+            self._connections.pop(ident).close()
+
+    def _bump_generation(self):
+        with Database._generation_lock:
+            Database._generations[self._key] = Database._generations.get(self._key, 0) + 1
+
+    def _cache_stamp(self) -> tuple:
+        """Current write generation: writes through any Database of this process, plus
+        commits by other connections or processes (PRAGMA data_version)."""
+        data_version = self.get_connection().execute("PRAGMA data_version").fetchone()[0]
+        return Database._generations.get(self._key, 0), threading.get_ident(), data_version
+
+    def _cached(self, key: tuple, compute):
+        """Result of compute(), reused while the generation stamp is unchanged."""
+        stamp = self._cache_stamp()
+        with self._search_cache_lock:
+            entry = self._search_cache.get(key)
+            if entry is not None and entry[0] == stamp:
+                self._search_cache.move_to_end(key)
+                return entry[1]
+        result = compute()
+        with self._search_cache_lock:
+            self._search_cache[key] = (stamp, result)
+            self._search_cache.move_to_end(key)
+            while len(self._search_cache) > SEARCH_CACHE_SIZE:
+                self._search_cache.popitem(last=False)
+        return result
+
+    def close(self):
+        """Close every connection of this Database (all threads and the bulk writer).
+
+        Call it once background work is stopped; threads that use the Database
+        again afterwards transparently open a new connection.
+        """
+        with self._connections_lock:
+            for conn in self._connections.values():
+                conn.close()
+            self._connections.clear()
+        with self._search_cache_lock:
+            # data_version numbering restarts with a new connection
+            self._search_cache.clear()
+        with self._writer_lock:
+            if self._writer_conn is not None:
+                self._writer_conn.close()
+                self._writer_conn = None
+
+    def checkpoint(self):
+        """Flush the WAL into the main database file (before copying it)."""
+        with self.get_connection() as conn:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
 
     def init_db(self):
-        """Initialize the database schema."""
+        """Bring the schema up to SCHEMA_VERSION.
+
+        The version reached is stored in PRAGMA user_version: on an up-to-date file
+        this is a single pragma read. Otherwise the missing steps of SCHEMA_MIGRATIONS
+        run in order, in one IMMEDIATE transaction (another process opening the same
+        file waits, then finds the schema current).
+        """
         conn = self.get_connection()
-        cursor = conn.cursor()
+        if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            cursor = conn.cursor()
+            if conn.in_transaction:
+                conn.commit()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                cursor.execute("PRAGMA user_version")
+                version = cursor.fetchone()[0]
+                for step in range(version, SCHEMA_VERSION):
+                    getattr(self, SCHEMA_MIGRATIONS[step])(cursor)
+                if version < SCHEMA_VERSION:
+                    cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+        # Optional virtual tables: absent when SQLite lacks FTS5 / the trigram tokenizer
+        tables = {row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE name IN ('project_fts', 'project_trigrams')")}
+        self.has_fts = "project_fts" in tables
+        self.has_fuzzy = "project_trigrams" in tables
+
+    def schema_version(self) -> int:
+        """Schema version of the database file (PRAGMA user_version)."""
+        return self.get_connection().execute("PRAGMA user_version").fetchone()[0]
 
-        # Projects table
+    # Schema migrations, run once each by init_db. Files created before the schema was
+    # versioned are at version 0 and may already hold any part of it: the first steps
+    # are idempotent. New steps are appended, never edited once released.
+
+    def _migrate_projects(self, cursor):
+        """Projects, directory listings and operation templates."""
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS projects (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -40,38 +305,50 @@ class Database:
                 is_missing INTEGER DEFAULT 0,
                 mwq_uuid TEXT,
                 has_serie INTEGER DEFAULT 0,
-                is_prototype INTEGER DEFAULT 0
+                is_prototype INTEGER DEFAULT 0,
+                file_size INTEGER,
+                file_mtime_ns INTEGER,
+                file_inode INTEGER
             )
         ''')
 
-        # Migration for existing DBs: Add new columns if they don't exist
-        migrations = [
-            "ALTER TABLE projects ADD COLUMN preview_filename TEXT",
-            "ALTER TABLE projects ADD COLUMN min_qty INTEGER",
-            "ALTER TABLE projects ADD COLUMN max_qty INTEGER",
-            "ALTER TABLE projects ADD COLUMN content_hash TEXT",
-            "ALTER TABLE projects ADD COLUMN is_missing INTEGER DEFAULT 0",
-            "ALTER TABLE projects ADD COLUMN mwq_uuid TEXT",
-            "ALTER TABLE projects ADD COLUMN has_serie INTEGER DEFAULT 0",
-            "ALTER TABLE projects ADD COLUMN is_prototype INTEGER DEFAULT 0",
-        ]
-        for migration in migrations:
-            try:
-                cursor.execute(migration)
-            except:
-                pass
+        # Columns added over time to the projects table of older files
+        added_columns = (
+            ("preview_filename", "TEXT"),
+            ("min_qty", "INTEGER"),
+            ("max_qty", "INTEGER"),
+            ("content_hash", "TEXT"),
+            ("is_missing", "INTEGER DEFAULT 0"),
+            ("mwq_uuid", "TEXT"),
+            ("has_serie", "INTEGER DEFAULT 0"),
+            ("is_prototype", "INTEGER DEFAULT 0"),
+            ("file_size", "INTEGER"),
+            ("file_mtime_ns", "INTEGER"),
+            ("file_inode", "INTEGER"),
+        )
+        cursor.execute("PRAGMA table_info(projects)")
+        existing = {row[1] for row in cursor.fetchall()}
+        for column, definition in added_columns:
+            if column not in existing:
+                cursor.execute(f"ALTER TABLE projects ADD COLUMN {column} {definition}")
 
-        # Create index on content_hash for fast reconnection lookups
-        try:
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_content_hash ON projects(content_hash)")
-        except:
-            pass
+        # Fast reconnection lookups by content hash / UUID
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_content_hash ON projects(content_hash)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_mwq_uuid ON projects(mwq_uuid)")
 
-        # Create index on mwq_uuid for fast UUID lookups
-        try:
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_mwq_uuid ON projects(mwq_uuid)")
-        except:
-            pass
+        # Sort indexes of the search list: ORDER BY column, id LIMIT n reads n rows
+        for column in sorted(set(SORT_COLUMNS.values())):
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_projects_sort_{column} ON projects(is_missing, {column})")
+
+        # Directory listings reused by DirectoryScanner while the directory mtime is unchanged
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS scanned_dirs (
+                path TEXT PRIMARY KEY,
+                mtime_ns INTEGER,
+                listing_json TEXT NOT NULL,
+                scanned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
 
         # Templates table
         cursor.execute('''
@@ -85,10 +362,7 @@ class Database:
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         ''')
-        try:
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_operation_templates_typology ON operation_templates(typology)")
-        except:
-            pass
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_operation_templates_typology ON operation_templates(typology)")
 
         # Per-project template usage history
         cursor.execute('''
@@ -102,23 +376,190 @@ class Database:
                 FOREIGN KEY (template_id) REFERENCES operation_templates (id) ON DELETE CASCADE
             )
         ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_template_usage_project_uuid ON project_template_usage(project_uuid)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_template_usage_template_id ON project_template_usage(template_id)")
+
+    def _migrate_structure(self, cursor):
+        """Operations and cost lines of every indexed project version, so cross-project
+        questions are answered in SQL instead of loading .mwq files."""
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'cost_lines'")
+        structure_is_new = cursor.fetchone() is None
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS operations (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                project_id INTEGER NOT NULL,
+                version_index INTEGER NOT NULL,
+                is_current_version INTEGER NOT NULL DEFAULT 0,
+                position INTEGER NOT NULL,
+                code TEXT,
+                label TEXT,
+                typology TEXT,
+                template_id INTEGER,
+                template_name TEXT,
+                template_drift_score REAL,
+                cost_count INTEGER DEFAULT 0
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS cost_lines (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                project_id INTEGER NOT NULL,
+                version_index INTEGER NOT NULL,
+                is_current_version INTEGER NOT NULL DEFAULT 0,
+                op_position INTEGER NOT NULL,
+                position INTEGER NOT NULL,
+                op_code TEXT,
+                typology TEXT,
+                name TEXT,
+                cost_type TEXT,
+                pricing_type TEXT,
+                fixed_time REAL,
+                per_piece_time REAL,
+                hourly_rate REAL,
+                margin_rate REAL,
+                fixed_price REAL,
+                unit_price REAL,
+                tier_count INTEGER DEFAULT 0,
+                is_active INTEGER DEFAULT 1,
+                in_piece_price INTEGER DEFAULT 1,
+                supplier_quote_ref TEXT
+            )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_operations_project ON operations(project_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_cost_lines_project ON cost_lines(project_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_cost_lines_typology ON cost_lines(typology)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_cost_lines_cost_type ON cost_lines(cost_type)")
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS projects_structure_delete AFTER DELETE ON projects
+            BEGIN
+                DELETE FROM operations WHERE project_id = old.id;
+                DELETE FROM cost_lines WHERE project_id = old.id;
+            END
+        ''')
+        if structure_is_new:
+            # Projects indexed before have no structure rows: reload them on the next run
+            cursor.execute("UPDATE projects SET file_size = NULL, file_mtime_ns = NULL, file_inode = NULL")
+
+    def _migrate_prices(self, cursor):
+        """Unit price of every project version at each of its sale quantities: price
+        columns, filters and comparisons without running the Calculator."""
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'project_prices'")
+        prices_are_new = cursor.fetchone() is None
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS project_prices (
+                project_id INTEGER NOT NULL,
+                version_index INTEGER NOT NULL,
+                is_current_version INTEGER NOT NULL DEFAULT 0,
+                quantity INTEGER NOT NULL,
+                unit_cost REAL,
+                unit_price REAL,
+                fixed_part REAL,
+                variable_part REAL,
+                volume_rate REAL DEFAULT 1.0,
+                purchase_sale REAL,
+                internal_sale REAL,
+                purchase_cost REAL,
+                internal_hours REAL,
+                PRIMARY KEY (project_id, version_index, quantity)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_project_prices_quantity "
+                       "ON project_prices(quantity, is_current_version, unit_price)")
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS projects_prices_delete AFTER DELETE ON projects
+            BEGIN
+                DELETE FROM project_prices WHERE project_id = old.id;
+            END
+        ''')
+        if prices_are_new:
+            cursor.execute("UPDATE projects SET file_size = NULL, file_mtime_ns = NULL, file_inode = NULL")
+
+    def _migrate_full_text(self, cursor):
+        """Full-text index of project content (rowid = projects.id). Not available
+        when SQLite is built without FTS5: search falls back to LIKE."""
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'project_fts'")
+        if cursor.fetchone() is not None:
+            return
         try:
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_template_usage_project_uuid ON project_template_usage(project_uuid)")
-        except:
-            pass
-        try:
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_template_usage_template_id ON project_template_usage(template_id)")
-        except:
-            pass
+            cursor.execute(f'''
+                CREATE VIRTUAL TABLE project_fts USING fts5(
+                    {", ".join(col for col, _ in FTS_COLUMNS)},
+                    tokenize = "unicode61 remove_diacritics 2 tokenchars '-_.'",
+                    prefix = '2 3'
+                )
+            ''')
+        except sqlite3.OperationalError as e:
+            print(f"Full-text search unavailable: {e}")
+            return
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS projects_fts_delete AFTER DELETE ON projects
+            BEGIN
+                DELETE FROM project_fts WHERE rowid = old.id;
+            END
+        ''')
+        # Projects indexed before: searchable by name/reference/client at once,
+        # and their signature is cleared so the next indexing run reloads them
+        # and fills the rest of the full-text index
+        cursor.execute("INSERT INTO project_fts (rowid, name, reference, client) "
+                       "SELECT id, COALESCE(name, ''), COALESCE(reference, ''), COALESCE(client, '') FROM projects")
+        cursor.execute("UPDATE projects SET file_size = NULL, file_mtime_ns = NULL, file_inode = NULL")
 
-        conn.commit()
-        conn.close()
+    def _migrate_thumbnails(self, cursor):
+        """Preview thumbnails built at index time (see infrastructure.thumbnails), with
+        the signature of the file they were read from."""
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'thumbnails'")
+        thumbnails_are_new = cursor.fetchone() is None
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS thumbnails (
+                project_id INTEGER PRIMARY KEY,
+                file_size INTEGER,
+                file_mtime_ns INTEGER,
+                file_inode INTEGER,
+                image BLOB NOT NULL
+            )
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS projects_thumbnails_delete AFTER DELETE ON projects
+            BEGIN
+                DELETE FROM thumbnails WHERE project_id = old.id;
+            END
+        ''')
+        if thumbnails_are_new:
+            cursor.execute("UPDATE projects SET file_size = NULL, file_mtime_ns = NULL, file_inode = NULL "
+                           "WHERE preview_filename IS NOT NULL")
 
-    def init_quote_numbering_table(self):
-        """Initialize quote numbering table for persistent counters."""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+    def _migrate_fuzzy_keys(self, cursor):
+        """Trigram index of the normalized references and clients (rowid = projects.id),
+        for the typo-tolerant search. Needs the FTS5 trigram tokenizer (SQLite 3.34+)."""
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'project_trigrams'")
+        if cursor.fetchone() is not None:
+            return
+        try:
+            cursor.execute(f'''
+                CREATE VIRTUAL TABLE project_trigrams USING fts5(
+                    {", ".join(FUZZY_FIELDS)},
+                    tokenize = 'trigram',
+                    detail = 'none'
+                )
+            ''')
+        except sqlite3.OperationalError as e:
+            print(f"Fuzzy search unavailable: {e}")
+            return
+        # Number of projects per trigram, to read the rarest ones first
+        cursor.execute("CREATE VIRTUAL TABLE project_trigram_vocab USING fts5vocab(project_trigrams, 'row')")
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS projects_trigrams_delete AFTER DELETE ON projects
+            BEGIN
+                DELETE FROM project_trigrams WHERE rowid = old.id;
+            END
+        ''')
+        # Built from the projects table itself: no reindexing needed
+        cursor.execute(f"SELECT id, {', '.join(FUZZY_FIELDS)} FROM projects")
+        self._write_fuzzy_keys(cursor, [(row[0], dict(zip(FUZZY_FIELDS, row[1:])))
+                                        for row in cursor.fetchall()])
 
+    def _migrate_quote_numbers(self, cursor):
+        """Persistent quote counters (see QuoteNumberingService)."""
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS quote_numbers (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -129,21 +570,120 @@ class Database:
                 UNIQUE(date, prefix)
             )
         ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_quote_date_prefix ON quote_numbers(date, prefix)")
 
-        try:
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_quote_date_prefix ON quote_numbers(date, prefix)")
-        except:
-            pass
+    def _migrate_migration_journal(self, cursor):
+        """Journal of the legacy JSON -> ZIP migration job (see LegacyMigrationJob)."""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS migration_batches (
+                batch_id TEXT PRIMARY KEY,
+                root_path TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'running',
+                started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                finished_at TIMESTAMP
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS migration_journal (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                batch_id TEXT NOT NULL,
+                filepath TEXT NOT NULL,
+                backup_path TEXT,
+                status TEXT NOT NULL,
+                error TEXT,
+                duration_ms INTEGER,
+                completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(batch_id, filepath)
+            )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_migration_journal_filepath ON migration_journal(filepath)")
+
+    def _migrate_analytics_cache(self, cursor):
+        """Per-project metrics and refresh bookkeeping of AnalyticsService."""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS analytics_project_cache (
+                project_id INTEGER PRIMARY KEY,
+                last_modified TEXT,
+                client TEXT,
+                status TEXT,
+                exports_count INTEGER DEFAULT 0,
+                avg_margin REAL,
+                typology_margins_json TEXT,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS analytics_cache_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+    def _migrate_exports(self, cursor):
+        """Export history of every project (quote numbers, dates, XLSX), so that a
+        quote number resolves to its project and version without opening files."""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS exports (
+                project_id INTEGER NOT NULL,
+                position INTEGER NOT NULL,
+                devis_ref TEXT NOT NULL,
+                export_date TEXT,
+                export_time TEXT,
+                version_index INTEGER,
+                xlsx_filename TEXT,
+                xlsx_path TEXT,
+                xlsx_size INTEGER,
+                PRIMARY KEY (project_id, position)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_exports_devis_ref ON exports(devis_ref COLLATE NOCASE)")
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS projects_exports_delete AFTER DELETE ON projects
+            BEGIN
+                DELETE FROM exports WHERE project_id = old.id;
+            END
+        ''')
+        # Projects indexed before have no export rows: reload them on the next run
+        cursor.execute("UPDATE projects SET file_size = NULL, file_mtime_ns = NULL, file_inode = NULL")
+
+    def _migrate_analytics_typologies(self, cursor):
+        """Per-project margin of each typology, so that the dashboard aggregates in SQL."""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS analytics_typology_cache (
+                project_id INTEGER NOT NULL,
+                typology TEXT NOT NULL,
+                avg_margin REAL,
+                PRIMARY KEY (project_id, typology)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_analytics_typology ON analytics_typology_cache(typology)")
+        # Cached projects have no typology rows yet: computed again on the next refresh
+        cursor.execute("DELETE FROM analytics_project_cache")
+
+    def _migrate_migration_fingerprints(self, cursor):
+        """Fingerprint of each converted file, checked before a rollback overwrites it."""
+        cursor.execute("PRAGMA table_info(migration_journal)")
+        if "converted_fingerprint" not in {row[1] for row in cursor.fetchall()}:
+            cursor.execute("ALTER TABLE migration_journal ADD COLUMN converted_fingerprint TEXT")
+
+    def init_quote_numbering_table(self):
+        """Ensure the quote_numbers table exists (created by the schema migrations)."""
+        self.init_db()
 
-        conn.commit()
-        conn.close()
+    def init_migration_journal_table(self):
+        """Ensure the migration journal tables exist (created by the schema migrations)."""
+        self.init_db()
 
+    @_writes_projects
     def upsert_project(self, project_data: Dict) -> int:
         """Insert or update a project."""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             content_hash = project_data.get('content_hash')
             filepath = project_data['filepath']
+            last_modified = project_data.get('last_modified') or datetime.datetime.now()
+            signature = (project_data.get('file_size'), project_data.get('file_mtime_ns'), project_data.get('file_inode'))
 
             # First, check if project exists by filepath
             cursor.execute('SELECT id FROM projects WHERE filepath = ?', (filepath,))
@@ -162,7 +702,7 @@ class Database:
                         SET filepath = ?, is_missing = 0, name = ?, reference = ?, client = ?,
                             drawing_filename = ?, preview_filename = ?, last_modified = ?,
                             min_qty = ?, max_qty = ?, content_hash = ?, mwq_uuid = ?, has_serie = ?,
-                            is_prototype = ?
+                            is_prototype = ?, file_size = ?, file_mtime_ns = ?, file_inode = ?
                         WHERE id = ?
                     ''', (
                         filepath,
@@ -171,15 +711,17 @@ class Database:
                         project_data['client'],
                         project_data['drawing_filename'],
                         project_data.get('preview_filename'),
-                        datetime.datetime.now(),
+                        last_modified,
                         project_data.get('min_qty'),
                         project_data.get('max_qty'),
                         content_hash,
                         project_data.get('mwq_uuid'),
                         1 if project_data.get('has_serie') else 0,
                         1 if project_data.get('is_prototype') else 0,
+                        *signature,
                         project_id
                     ))
+                    self._write_derived_rows(cursor, [(project_id, project_data)])
                     return project_id
 
             if row:
@@ -188,7 +730,8 @@ class Database:
                     UPDATE projects
                     SET name = ?, reference = ?, client = ?, drawing_filename = ?, preview_filename = ?,
                         last_modified = ?, min_qty = ?, max_qty = ?,
-                        content_hash = ?, is_missing = 0, mwq_uuid = ?, has_serie = ?, is_prototype = ?
+                        content_hash = ?, is_missing = 0, mwq_uuid = ?, has_serie = ?, is_prototype = ?,
+                        file_size = ?, file_mtime_ns = ?, file_inode = ?
                     WHERE id = ?
                 ''', (
                     project_data['name'],
@@ -196,21 +739,22 @@ class Database:
                     project_data['client'],
                     project_data['drawing_filename'],
                     project_data.get('preview_filename'),
-                    datetime.datetime.now(),
+                    last_modified,
                     project_data.get('min_qty'),
                     project_data.get('max_qty'),
                     content_hash,
                     project_data.get('mwq_uuid'),
                     1 if project_data.get('has_serie') else 0,
                     1 if project_data.get('is_prototype') else 0,
+                    *signature,
                     project_id
                 ))
             else:
                 cursor.execute('''
                     INSERT INTO projects (name, reference, client, filepath, drawing_filename, preview_filename,
                                         last_modified, min_qty, max_qty, content_hash, is_missing, mwq_uuid,
-                                        has_serie, is_prototype)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0, ?, ?, ?)
+                                        has_serie, is_prototype, file_size, file_mtime_ns, file_inode)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0, ?, ?, ?, ?, ?, ?)
                 ''', (
                     project_data['name'],
                     project_data['reference'],
@@ -218,67 +762,485 @@ class Database:
                     filepath,
                     project_data['drawing_filename'],
                     project_data.get('preview_filename'),
-                    datetime.datetime.now(),
+                    last_modified,
                     project_data.get('min_qty'),
                     project_data.get('max_qty'),
                     content_hash,
                     project_data.get('mwq_uuid'),
                     1 if project_data.get('has_serie') else 0,
                     1 if project_data.get('is_prototype') else 0,
+                    *signature,
                 ))
                 project_id = cursor.lastrowid
 
+            self._write_derived_rows(cursor, [(project_id, project_data)])
             return project_id
 
+    @_writes_projects
+    def upsert_projects_bulk(self, projects: List[Dict], batch_size: int = BULK_BATCH_SIZE) -> Dict:
+        """Insert or update many projects on the long-lived writer connection.
+
+        Rows are written with executemany, batch_size rows per transaction.
+        Before each batch, a single query finds the new paths whose content hash
+        or UUID matches a missing project (file moved or renamed): those rows are
+        reconnected to their new path instead of being inserted again.
+
+        Returns {'written': int, 'reconnected': [(old_path, new_path), ...]}.
+        """
+        stats = {'written': 0, 'reconnected': []}
+        if not projects:
+            return stats
+
+        columns = ", ".join(_PROJECT_COLUMNS)
+        placeholders = ", ".join("?" for _ in _PROJECT_COLUMNS)
+        updates = ", ".join(f"{col} = excluded.{col}" for col in _PROJECT_COLUMNS if col != "filepath")
+        upsert_sql = (
+            f"INSERT INTO projects ({columns}, is_missing) VALUES ({placeholders}, 0) "
+            f"ON CONFLICT(filepath) DO UPDATE SET {updates}, is_missing = 0"
+        )
+
+        with self._writer_lock:
+            conn = self._get_writer_connection()
+            for start in range(0, len(projects), batch_size):
+                batch = projects[start:start + batch_size]
+                # Take the write lock up front: a deferred transaction that reads first
+                # fails at once (no busy wait) if another connection committed meanwhile
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    cursor = conn.cursor()
+                    stats['reconnected'].extend(self._reconnect_moved(cursor, batch))
+                    cursor.executemany(upsert_sql, [self._project_params(p) for p in batch])
+                    self._write_derived_rows(cursor, [(None, p) for p in batch])
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+                stats['written'] += len(batch)
+        return stats
+
+    def _get_writer_connection(self):
+        if self._writer_conn is None:
+            # Used from the indexer's writer thread, closed from the UI thread (under _writer_lock)
+            self._writer_conn = self._connect(check_same_thread=False, isolation_level=None)
+            self._writer_conn.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS bulk_incoming "
+                "(filepath TEXT PRIMARY KEY, content_hash TEXT, mwq_uuid TEXT)"
+            )
+        return self._writer_conn
+
+    @staticmethod
+    def _reconnect_moved(cursor, batch: List[Dict]) -> List[tuple]:
+        """Point missing rows to the new path of their file (set-based)."""
+        cursor.execute("DELETE FROM temp.bulk_incoming")
+        cursor.executemany(
+            "INSERT OR IGNORE INTO temp.bulk_incoming (filepath, content_hash, mwq_uuid) VALUES (?, ?, ?)",
+            [(p['filepath'], p.get('content_hash'), p.get('mwq_uuid'))
+             for p in batch if p.get('content_hash') or p.get('mwq_uuid')]
+        )
+        cursor.execute('''
+            SELECT MIN(p.id), p.filepath, b.filepath
+            FROM temp.bulk_incoming b
+            JOIN projects p ON p.is_missing = 1
+                AND (p.content_hash = b.content_hash OR p.mwq_uuid = b.mwq_uuid)
+            WHERE NOT EXISTS (SELECT 1 FROM projects q WHERE q.filepath = b.filepath)
+            GROUP BY b.filepath
+        ''')
+        moves = []
+        taken = set()
+        for project_id, old_path, new_path in cursor.fetchall():
+            # Two copies of the same file: only the first one takes over the old row
+            if project_id not in taken:
+                taken.add(project_id)
+                moves.append((project_id, old_path, new_path))
+        cursor.executemany(
+            "UPDATE projects SET filepath = ?, is_missing = 0 WHERE id = ?",
+            [(new_path, project_id) for project_id, _, new_path in moves]
+        )
+        return [(old_path, new_path) for _, old_path, new_path in moves]
+
+    def _write_derived_rows(self, cursor, rows: List[tuple]):
+        """Refresh the full-text entries, operations / cost lines, prices and exports of written projects.
+
+        rows are (project_id or None, project_data); with None the project is found
+        by filepath. Parts missing from project_data are left untouched.
+        """
+        resolved = []
+        for project_id, project_data in rows:
+            if project_id is None:
+                cursor.execute("SELECT id FROM projects WHERE filepath = ?", (project_data['filepath'],))
+                found = cursor.fetchone()
+                if found is None:
+                    continue
+                project_id = found[0]
+            resolved.append((project_id, project_data))
+
+        documents = [(pid, p['search_document']) for pid, p in resolved if p.get('search_document') is not None]
+        if documents and self.has_fts:
+            columns = [col for col, _ in FTS_COLUMNS]
+            cursor.executemany("DELETE FROM project_fts WHERE rowid = ?", [(pid,) for pid, _ in documents])
+            cursor.executemany(
+                f"INSERT INTO project_fts (rowid, {', '.join(columns)}) VALUES (?, {', '.join('?' for _ in columns)})",
+                [(pid, *(doc.get(col, "") for col in columns)) for pid, doc in documents]
+            )
+
+        structures = [(pid, p['structure']) for pid, p in resolved if p.get('structure') is not None]
+        if structures:
+            ids = [(pid,) for pid, _ in structures]
+            cursor.executemany("DELETE FROM operations WHERE project_id = ?", ids)
+            cursor.executemany("DELETE FROM cost_lines WHERE project_id = ?", ids)
+            cursor.executemany(
+                f"INSERT INTO operations (project_id, {', '.join(OPERATION_COLUMNS)}) "
+                f"VALUES (?, {', '.join('?' for _ in OPERATION_COLUMNS)})",
+                [(pid, *op) for pid, structure in structures for op in structure['operations']]
+            )
+            cursor.executemany(
+                f"INSERT INTO cost_lines (project_id, {', '.join(COST_LINE_COLUMNS)}) "
+                f"VALUES (?, {', '.join('?' for _ in COST_LINE_COLUMNS)})",
+                [(pid, *line) for pid, structure in structures for line in structure['cost_lines']]
+            )
+
+        if self.has_fuzzy:
+            self._write_fuzzy_keys(cursor, [(pid, p) for pid, p in resolved if 'reference' in p])
+
+        thumbnails = [(pid, p) for pid, p in resolved if 'thumbnail' in p]
+        if thumbnails:
+            cursor.executemany("DELETE FROM thumbnails WHERE project_id = ?", [(pid,) for pid, _ in thumbnails])
+            cursor.executemany(
+                "INSERT INTO thumbnails (project_id, file_size, file_mtime_ns, file_inode, image) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(pid, p.get('file_size'), p.get('file_mtime_ns'), p.get('file_inode'), p['thumbnail'])
+                 for pid, p in thumbnails if p['thumbnail']]
+            )
+
+        exports = [(pid, p['exports']) for pid, p in resolved if p.get('exports') is not None]
+        if exports:
+            cursor.executemany("DELETE FROM exports WHERE project_id = ?", [(pid,) for pid, _ in exports])
+            cursor.executemany(
+                f"INSERT INTO exports (project_id, {', '.join(EXPORT_COLUMNS)}) "
+                f"VALUES (?, {', '.join('?' for _ in EXPORT_COLUMNS)})",
+                [(pid, *row) for pid, rows in exports for row in rows]
+            )
+
+        prices = [(pid, p['prices']) for pid, p in resolved if p.get('prices') is not None]
+        if prices:
+            cursor.executemany("DELETE FROM project_prices WHERE project_id = ?", [(pid,) for pid, _ in prices])
+            cursor.executemany(
+                f"INSERT INTO project_prices (project_id, {', '.join(PRICE_COLUMNS)}) "
+                f"VALUES (?, {', '.join('?' for _ in PRICE_COLUMNS)})",
+                [(pid, *row) for pid, rows in prices for row in rows]
+            )
+
+    @staticmethod
+    def _write_fuzzy_keys(cursor, rows: List[tuple]):
+        """Replace the trigram index entries of (project_id, project_data) rows."""
+        cursor.executemany("DELETE FROM project_trigrams WHERE rowid = ?", [(pid,) for pid, _ in rows])
+        cursor.executemany(
+            f"INSERT INTO project_trigrams (rowid, {', '.join(FUZZY_FIELDS)}) "
+            f"VALUES (?, {', '.join('?' for _ in FUZZY_FIELDS)})",
+            [(pid, *(padded_key(p.get(field)) for field in FUZZY_FIELDS)) for pid, p in rows]
+        )
+
+    @staticmethod
+    def _fts_query(term: str) -> Optional[str]:
+        """Turn user input into an FTS5 query: every word is a prefix, all must match.
+
+        Returns None for input FTS cannot express (a '*' inside a word), which is
+        then matched with LIKE as before.
+        """
+        words = [w.replace('"', '').rstrip('*') for w in term.split()]
+        if any('*' in w for w in words):
+            return None
+        words = [w for w in words if w]
+        if not words:
+            return None
+        return " ".join(f'"{w}"*' for w in words)
+
+    @staticmethod
+    def _project_params(project_data: Dict) -> tuple:
+        return (
+            project_data['name'],
+            project_data['reference'],
+            project_data['client'],
+            project_data['filepath'],
+            project_data['drawing_filename'],
+            project_data.get('preview_filename'),
+            project_data.get('last_modified') or datetime.datetime.now(),
+            project_data.get('min_qty'),
+            project_data.get('max_qty'),
+            project_data.get('content_hash'),
+            project_data.get('mwq_uuid'),
+            1 if project_data.get('has_serie') else 0,
+            1 if project_data.get('is_prototype') else 0,
+            project_data.get('file_size'),
+            project_data.get('file_mtime_ns'),
+            project_data.get('file_inode'),
+        )
+
+    @staticmethod
+    def _root_clause(root_path: str, column: str = "p.filepath") -> tuple:
+        """WHERE clause and params keeping the files located under root_path (prefix
+        comparison, so that LIKE wildcards in folder names match nothing extra)."""
+        prefix = os.path.join(root_path, "")
+        return f"substr({column}, 1, ?) = ?", [len(prefix), prefix]
+
+    def _search_clauses(self, global_search: str = None, include_missing: bool = False,
+                        price_quantity: int = None, min_price: float = None,
+                        max_price: float = None, root_path: str = None) -> tuple:
+        """FROM / WHERE of a project search, shared by search_projects and count_projects.
+
+        Returns (select_columns, from_clause, where_clauses, params, fts_query).
+        """
+        price_select, join_clause = "", ""
+        where_clauses = []
+        params = []
+
+        if price_quantity is not None:
+            price_select = ", pp.unit_price AS price_at_qty"
+            join_clause = (" LEFT JOIN project_prices pp ON pp.project_id = p.id"
+                           " AND pp.is_current_version = 1 AND pp.quantity = ?")
+            params.append(price_quantity)
+            if min_price is not None:
+                where_clauses.append("pp.unit_price >= ?")
+                params.append(min_price)
+            if max_price is not None:
+                where_clauses.append("pp.unit_price <= ?")
+                params.append(max_price)
+
+        select_columns = f"p.*{price_select}"
+        from_clause = "projects p" + join_clause
+
+        # By default, exclude missing files
+        if not include_missing:
+            where_clauses.append("p.is_missing = 0")
+
+        # One of the quote roots (see ConfigurationService.get_quote_roots)
+        if root_path:
+            clause, root_params = self._root_clause(root_path)
+            where_clauses.append(clause)
+            params.extend(root_params)
+
+        quote_number = self.parse_quote_number(global_search)
+        fts_query = self._fts_query(global_search) if global_search and self.has_fts and not quote_number else None
+        if quote_number:
+            # Quote number search: the projects it was exported from (see find_exports)
+            where_clauses.append("p.id IN (SELECT project_id FROM exports WHERE devis_ref COLLATE NOCASE IN (?, ?))")
+            params.extend([global_search.strip(), quote_number[0]])
+        elif fts_query:
+            # Full-text match over the project content, ranked with bm25
+            weights = ", ".join(str(weight) for _, weight in FTS_COLUMNS)
+            select_columns += f", bm25(project_fts, {weights}) AS relevance"
+            from_clause = "project_fts JOIN projects p ON p.id = project_fts.rowid" + join_clause
+            where_clauses.append("project_fts MATCH ?")
+            params.append(fts_query)
+        elif global_search and global_search.strip():
+            raw_term = global_search.strip()
+            term = raw_term.replace('*', '%') if '*' in raw_term else f"%{raw_term}%"
+            search_clause = "(p.reference LIKE ? OR p.client LIKE ? OR p.name LIKE ?)"
+            where_clauses.append(search_clause)
+            params.extend([term, term, term])
+
+        return select_columns, from_clause, where_clauses, params, fts_query
+
     def search_projects(self,
                        global_search: str = None,
                        sort_by: str = "last_modified",
                        sort_order: str = "DESC",
-                       include_missing: bool = False) -> List[Dict]:
-        """Search for projects matching criteria using a unified search term."""
+                       include_missing: bool = False,
+                       price_quantity: int = None,
+                       min_price: float = None,
+                       max_price: float = None,
+                       limit: int = None,
+                       offset: int = 0,
+                       after: tuple = None,
+                       root_path: str = None) -> List[Dict]:
+        """Search for projects matching criteria using a unified search term.
+
+        The term is matched against the full-text index (reference, client, name,
+        operations, costs, comments, supplier quote refs, templates); every word
+        is a prefix. sort_by="relevance" orders the results by bm25 rank. A quote
+        number (see QUOTE_NUMBER_PATTERN) finds the projects it was exported from.
+
+        With price_quantity, each row gets the unit price of the current version at
+        that quantity ('price_at_qty', None when not quoted), which min_price /
+        max_price filter on and sort_by="price_at_qty" sorts on.
+
+        root_path keeps the projects of one quote root.
+
+        Pages: limit / offset, or keyset with after=search_key(last row of the
+        previous page) for the column sorts (see SORT_COLUMNS), which reads only
+        the requested rows through the sort indexes.
+
+        Results are cached until the next write to the projects (see _writes_projects):
+        re-sorting back or returning to a previous search does not query again.
+        """
+        term = " ".join(global_search.split()) if global_search else ""
+        key = ("search", term, sort_by, sort_order.upper(), include_missing, price_quantity,
+               min_price, max_price, limit, offset, tuple(after) if after is not None else None, root_path)
+        rows = self._cached(key, lambda: self._search_projects(
+            term, sort_by, sort_order, include_missing, price_quantity, min_price, max_price,
+            limit, offset, after, root_path))
+        # Callers may annotate the rows they get
+        return [dict(row) for row in rows]
+
+    def _search_projects(self, global_search, sort_by, sort_order, include_missing, price_quantity,
+                         min_price, max_price, limit, offset, after, root_path=None) -> List[Dict]:
+        select_columns, from_clause, where_clauses, params, fts_query = self._search_clauses(
+            global_search, include_missing, price_quantity, min_price, max_price, root_path)
+        order = "DESC" if sort_order.upper() == "DESC" else "ASC"
+
+        if sort_by == "relevance" and fts_query:
+            # bm25: lower is better
+            order_by = "relevance ASC, p.last_modified DESC, p.id ASC"
+        elif sort_by == "price_at_qty" and price_quantity is not None:
+            # Projects not quoted at this quantity come last
+            order_by = f"pp.unit_price IS NULL, pp.unit_price {order}, p.id {order}"
+        else:
+            column = SORT_COLUMNS.get(sort_by, "last_modified")
+            order_by = f"p.{column} {order}, p.id {order}"
+            if after is not None:
+                clause, key_params = self._keyset_clause(column, order, after)
+                where_clauses.append(clause)
+                params.extend(key_params)
+
+        full_query = f"SELECT {select_columns} FROM {from_clause}"
+        if where_clauses:
+            full_query += " WHERE " + " AND ".join(where_clauses)
+        full_query += f" ORDER BY {order_by}"
+        if limit is not None:
+            full_query += " LIMIT ? OFFSET ?"
+            params.extend([limit, offset or 0])
+
         with self.get_connection() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
-
-            query = "SELECT DISTINCT p.* FROM projects p"
-            where_clauses = []
-            params = []
-
-            # By default, exclude missing files
-            if not include_missing:
-                where_clauses.append("p.is_missing = 0")
-
-            if global_search and global_search.strip():
-                raw_term = global_search.strip()
-                term = raw_term.replace('*', '%') if '*' in raw_term else f"%{raw_term}%"
-                search_clause = "(p.reference LIKE ? OR p.client LIKE ? OR p.name LIKE ?)"
-                where_clauses.append(search_clause)
-                params.extend([term, term, term])
-
-            full_query = query
-            if where_clauses:
-                full_query += " WHERE " + " AND ".join(where_clauses)
-
-            col_map = {
-                "Référence": "reference",
-                "Client": "client",
-                "Q. Min": "min_qty",
-                "Q. Max": "max_qty",
-                "Modifié le": "last_modified",
-                "reference": "reference",
-                "client": "client",
-                "min_qty": "min_qty",
-                "max_qty": "max_qty",
-                "last_modified": "last_modified"
-            }
-            db_sort_col = col_map.get(sort_by, "last_modified")
-            order = "DESC" if sort_order.upper() == "DESC" else "ASC"
-            full_query += f" ORDER BY p.{db_sort_col} {order}"
-
             cursor.execute(full_query, params)
             rows = cursor.fetchall()
             return [dict(row) for row in rows]
 
+    def count_projects(self, global_search: str = None, include_missing: bool = False,
+                       price_quantity: int = None, min_price: float = None,
+                       max_price: float = None, root_path: str = None) -> int:
+        """Number of rows search_projects returns for the same criteria (cached likewise)."""
+        term = " ".join(global_search.split()) if global_search else ""
+        _, from_clause, where_clauses, params, _ = self._search_clauses(
+            term, include_missing, price_quantity, min_price, max_price, root_path)
+        query = f"SELECT COUNT(*) FROM {from_clause}"
+        if where_clauses:
+            query += " WHERE " + " AND ".join(where_clauses)
+
+        def count():
+            with self.get_connection() as conn:
+                return conn.execute(query, params).fetchone()[0]
+        return self._cached(("count", term, include_missing, price_quantity, min_price, max_price, root_path),
+                            count)
+
+    def fuzzy_search_projects(self, term: str, limit: int = 20,
+                              min_similarity: float = DEFAULT_MIN_SIMILARITY,
+                              include_missing: bool = False, root_path: str = None) -> List[Dict]:
+        """Projects whose reference or client looks like term, best first (top limit).
+
+        For mistyped references that search_projects does not find. Rows get
+        'similarity' (see fuzzy_match.similarity) and 'matched_field'.
+
+        Index entries are read for the rarest trigrams of term first, and only
+        those that can still reach min_similarity (see fuzzy_match.min_shared),
+        within FUZZY_MAX_POSTINGS: a client prefix shared by thousands of
+        references is never scanned. The candidates sharing the most trigrams
+        are then scored exactly.
+        """
+        if not self.has_fuzzy:
+            return []
+        term = " ".join(term.split()) if term else ""
+        key = ("fuzzy", term, limit, min_similarity, include_missing, root_path)
+        rows = self._cached(key, lambda: self._fuzzy_search_projects(
+            term, limit, min_similarity, include_missing, root_path))
+        return [dict(row) for row in rows]
+
+    def _fuzzy_search_projects(self, term, limit, min_similarity, include_missing, root_path=None) -> List[Dict]:
+        query = trigrams(term)
+        if not query:
+            return []
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            frequencies = []
+            for trigram in query:
+                cursor.execute("SELECT doc FROM project_trigram_vocab WHERE term = ?", (trigram,))
+                found = cursor.fetchone()
+                if found:
+                    frequencies.append((found[0], trigram))
+            frequencies.sort()
+            # Trigrams of term found nowhere count among those a candidate lacks
+            useful = len(query) - min_shared(len(query), min_similarity) + 1 - (len(query) - len(frequencies))
+
+            shared = {}
+            read = 0
+            for count, trigram in frequencies[:max(0, useful)]:
+                if read and read + count > FUZZY_MAX_POSTINGS:
+                    break
+                cursor.execute("SELECT rowid FROM project_trigrams WHERE project_trigrams MATCH ?",
+                               ('"' + trigram.replace('"', '""') + '"',))
+                for (project_id,) in cursor.fetchall():
+                    shared[project_id] = shared.get(project_id, 0) + 1
+                read += count
+            candidates = sorted(shared, key=lambda pid: (-shared[pid], pid))
+            candidates = candidates[:max(limit, 1) * FUZZY_CANDIDATES_PER_RESULT]
+            if not candidates:
+                return []
+
+            scored = []
+            filters, params = "" if include_missing else " AND is_missing = 0", []
+            if root_path:
+                clause, params = self._root_clause(root_path, "filepath")
+                filters += f" AND {clause}"
+            cursor.execute(
+                f"SELECT id, {', '.join(FUZZY_FIELDS)} FROM projects "
+                f"WHERE id IN ({', '.join('?' for _ in candidates)}){filters}",
+                candidates + params
+            )
+            for row in cursor.fetchall():
+                score, field = max((similarity(query, trigrams(value)), field)
+                                   for field, value in zip(FUZZY_FIELDS, row[1:]))
+                if score >= min_similarity:
+                    scored.append((-score, row[0], field))
+            scored.sort()
+            scored = scored[:limit]
+            if not scored:
+                return []
+
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT * FROM projects WHERE id IN ({', '.join('?' for _ in scored)})",
+                           [project_id for _, project_id, _ in scored])
+            projects = {row['id']: dict(row) for row in cursor.fetchall()}
+
+        results = []
+        for score, project_id, field in scored:
+            row = projects[project_id]
+            row['similarity'] = round(-score, 3)
+            row['matched_field'] = field
+            results.append(row)
+        return results
+
+    @staticmethod
+    def search_key(row: Dict, sort_by: str) -> Optional[tuple]:
+        """Keyset position of a search_projects row (for after=), None for non-column sorts."""
+        if sort_by in ("relevance", "price_at_qty"):
+            return None
+        return row.get(SORT_COLUMNS.get(sort_by, "last_modified")), row['id']
+
+    @staticmethod
+    def _keyset_clause(column: str, order: str, after: tuple) -> tuple:
+        """Rows after (value, id) in ORDER BY column, id; NULLs sort first in ASC, last in DESC."""
+        value, row_id = after
+        col = f"p.{column}"
+        if order == "ASC":
+            if value is None:
+                return f"(({col} IS NULL AND p.id > ?) OR {col} IS NOT NULL)", [row_id]
+            return f"({col} > ? OR ({col} = ? AND p.id > ?))", [value, value, row_id]
+        if value is None:
+            return f"({col} IS NULL AND p.id < ?)", [row_id]
+        return f"({col} < ? OR ({col} = ? AND p.id < ?) OR {col} IS NULL)", [value, value, row_id]
+
     def find_by_hash(self, content_hash: str) -> Optional[Dict]:
         """Find a project by its content hash."""
         with self.get_connection() as conn:
@@ -288,6 +1250,288 @@ class Database:
             row = cursor.fetchone()
             return dict(row) if row else None
 
+    def get_thumbnail(self, project_id: int) -> Optional[bytes]:
+        """Preview thumbnail (PNG) of a project, None without one or when the
+        file changed since it was built."""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT t.image FROM thumbnails t JOIN projects p ON p.id = t.project_id
+                WHERE t.project_id = ? AND t.file_size IS p.file_size AND t.file_mtime_ns IS p.file_mtime_ns
+            ''', (project_id,))
+            row = cursor.fetchone()
+            return row[0] if row else None
+
+    @staticmethod
+    def parse_quote_number(text: str) -> Optional[tuple]:
+        """(quote number, version index or None) when text is a quote number, else None."""
+        match = QUOTE_NUMBER_PATTERN.match(text.strip()) if text else None
+        if match is None:
+            return None
+        return match.group(1), int(match.group(2)) if match.group(2) else None
+
+    def find_exports(self, quote_number: str) -> List[Dict]:
+        """Exports carrying a quote number, with their project, best match first.
+
+        The number is looked up as written, then without its version suffix:
+        "OD260202_014-1" finds export OD260202_014, the one of version 1 first.
+        Rows hold the export columns (see EXPORT_COLUMNS) plus project_id,
+        filepath, name, reference, client and is_missing.
+        """
+        term = (quote_number or "").strip()
+        if not term:
+            return []
+        parsed = self.parse_quote_number(term)
+        base, version = parsed if parsed else (term, None)
+        with self.get_connection() as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT {', '.join('e.' + col for col in EXPORT_COLUMNS)}, e.project_id, "
+                "p.filepath, p.name, p.reference, p.client, p.is_missing "
+                "FROM exports e JOIN projects p ON p.id = e.project_id "
+                "WHERE e.devis_ref COLLATE NOCASE IN (?, ?) "
+                "ORDER BY e.devis_ref = ? COLLATE NOCASE DESC, e.version_index IS ? DESC, "
+                "p.is_missing, e.export_date DESC, e.position DESC",
+                (term, base, term, version)
+            )
+            return [dict(row) for row in cursor.fetchall()]
+
+    def get_project_exports(self, project_id: int) -> List[Dict]:
+        """Indexed export history of a project, oldest first."""
+        with self.get_connection() as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT {', '.join(EXPORT_COLUMNS)} FROM exports WHERE project_id = ? ORDER BY position",
+                           (project_id,))
+            return [dict(row) for row in cursor.fetchall()]
+
+    def get_export_counts(self, project_ids: List[int] = None) -> Dict[int, int]:
+        """Number of exports of each project ({project_id: count}, projects without export absent)."""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            if project_ids is None:
+                cursor.execute("SELECT project_id, COUNT(*) FROM exports GROUP BY project_id")
+                return dict(cursor.fetchall())
+            counts = {}
+            for start in range(0, len(project_ids), 500):
+                chunk = project_ids[start:start + 500]
+                cursor.execute(f"SELECT project_id, COUNT(*) FROM exports "
+                               f"WHERE project_id IN ({', '.join('?' for _ in chunk)}) GROUP BY project_id", chunk)
+                counts.update(cursor.fetchall())
+            return counts
+
+    def get_project_structure(self, project_id: int, version_index: int = None) -> tuple:
+        """Indexed (operations, cost_lines) of a project version, as lists of dicts.
+
+        Without version_index, the project's current version is returned.
+        """
+        version_clause = "version_index = ?" if version_index is not None else "is_current_version = 1"
+        params = (project_id, version_index) if version_index is not None else (project_id,)
+        with self.get_connection() as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT * FROM operations WHERE project_id = ? AND {version_clause} "
+                           "ORDER BY position", params)
+            operations = [dict(row) for row in cursor.fetchall()]
+            cursor.execute(f"SELECT * FROM cost_lines WHERE project_id = ? AND {version_clause} "
+                           "ORDER BY op_position, position", params)
+            cost_lines = [dict(row) for row in cursor.fetchall()]
+        return operations, cost_lines
+
+    def get_margin_stats(self, project_ids: List[int] = None) -> Dict[int, Dict]:
+        """Average margin of the priced cost lines of each project's current version.
+
+        Returns {project_id: {'avg_margin': float, 'lines': int,
+        'typology_margins': {typology: float}}}; projects without cost lines are absent.
+        """
+        where = "is_current_version = 1 AND in_piece_price = 1"
+        chunks = [None] if project_ids is None else [
+            project_ids[i:i + 500] for i in range(0, len(project_ids), 500)
+        ]
+        stats = {}
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            for chunk in chunks:
+                clause, params = where, []
+                if chunk is not None:
+                    clause += f" AND project_id IN ({', '.join('?' for _ in chunk)})"
+                    params = chunk
+                cursor.execute(f'''
+                    SELECT project_id, COALESCE(NULLIF(TRIM(typology), ''), 'N/A'),
+                           AVG(COALESCE(margin_rate, 0)), COUNT(*)
+                    FROM cost_lines WHERE {clause}
+                    GROUP BY 1, 2
+                ''', params)
+                for project_id, typology, avg_margin, count in cursor.fetchall():
+                    entry = stats.setdefault(project_id, {'avg_margin': 0.0, 'lines': 0, 'typology_margins': {}})
+                    entry['typology_margins'][typology] = avg_margin
+                    # Overall mean = mean of the typology means weighted by their line counts
+                    total = entry['avg_margin'] * entry['lines'] + avg_margin * count
+                    entry['lines'] += count
+                    entry['avg_margin'] = total / entry['lines']
+        return stats
+
+    def get_project_prices(self, project_ids: List[int] = None, version_index: int = None) -> Dict[int, Dict[int, Dict]]:
+        """Indexed price breakdowns: {project_id: {quantity: {column: value}}}.
+
+        Without version_index, the current version of each project is returned.
+        """
+        where, params = ("version_index = ?", [version_index]) if version_index is not None \
+            else ("is_current_version = 1", [])
+        chunks = [None] if project_ids is None else [
+            project_ids[i:i + 500] for i in range(0, len(project_ids), 500)
+        ]
+        prices = {}
+        with self.get_connection() as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            for chunk in chunks:
+                clause, chunk_params = where, list(params)
+                if chunk is not None:
+                    clause += f" AND project_id IN ({', '.join('?' for _ in chunk)})"
+                    chunk_params += chunk
+                cursor.execute(f"SELECT * FROM project_prices WHERE {clause} ORDER BY project_id, quantity",
+                               chunk_params)
+                for row in cursor.fetchall():
+                    prices.setdefault(row['project_id'], {})[row['quantity']] = dict(row)
+        return prices
+
+    def get_file_signatures(self, root_path: str = None, filepaths: List[str] = None) -> Dict[str, tuple]:
+        """Get the stored (size, mtime_ns, inode, is_missing, content_hash) of indexed files.
+
+        If root_path is given, only files located under that folder are returned.
+        If filepaths is given, only those files are looked up.
+        """
+        select = "SELECT filepath, file_size, file_mtime_ns, file_inode, is_missing, content_hash FROM projects"
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            if filepaths is None:
+                cursor.execute(select)
+                rows = cursor.fetchall()
+            else:
+                rows = []
+                # Stay under SQLite's bound-parameter limit
+                for start in range(0, len(filepaths), 500):
+                    chunk = filepaths[start:start + 500]
+                    cursor.execute(f"{select} WHERE filepath IN ({', '.join('?' for _ in chunk)})", chunk)
+                    rows.extend(cursor.fetchall())
+
+        signatures = {}
+        prefix = os.path.join(os.path.normpath(root_path), "") if root_path else None
+        for filepath, size, mtime_ns, inode, is_missing, content_hash in rows:
+            if prefix and not os.path.normpath(filepath).startswith(prefix):
+                continue
+            signatures[filepath] = (size, mtime_ns, inode, is_missing, content_hash)
+        return signatures
+
+    @_writes_projects
+    def set_missing_status(self, filepaths: List[str], is_missing: bool) -> int:
+        """Flag (or unflag) a set of files as missing in one transaction."""
+        if not filepaths:
+            return 0
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(
+                "UPDATE projects SET is_missing = ? WHERE filepath = ?",
+                [(1 if is_missing else 0, path) for path in filepaths]
+            )
+            conn.commit()
+            return cursor.rowcount
+
+    def get_scanned_dirs(self, root_path: str) -> Dict[str, tuple]:
+        """Stored (mtime_ns, listing_json) of root_path and the directories below it."""
+        prefix = os.path.join(root_path, "")
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT path, mtime_ns, listing_json FROM scanned_dirs WHERE path = ? OR substr(path, 1, ?) = ?",
+                (root_path, len(prefix), prefix)
+            )
+            return {path: (mtime_ns, listing_json) for path, mtime_ns, listing_json in cursor.fetchall()}
+
+    def save_scanned_dirs(self, rows: List[tuple]):
+        """Store (path, mtime_ns, listing_json) directory listings."""
+        with self.get_connection() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO scanned_dirs (path, mtime_ns, listing_json, scanned_at) "
+                "VALUES (?, ?, ?, CURRENT_TIMESTAMP)",
+                rows
+            )
+            conn.commit()
+
+    def delete_scanned_dirs(self, paths: List[str]):
+        """Forget the listings of directories that no longer exist."""
+        if not paths:
+            return
+        with self.get_connection() as conn:
+            conn.executemany("DELETE FROM scanned_dirs WHERE path = ?", [(p,) for p in paths])
+            conn.commit()
+
+    @_writes_projects
+    def move_filepaths(self, moves: List[tuple]) -> int:
+        """Apply (old_path, new_path) renames detected on disk, keeping each row."""
+        if not moves:
+            return 0
+        moved = 0
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            for old_path, new_path in moves:
+                # Drop a stale row already registered under the new path with a plain
+                # DELETE: the rows deleted by UPDATE OR REPLACE do not fire the
+                # triggers that clean the derived tables (FTS, trigrams, structure...)
+                cursor.execute(
+                    "DELETE FROM projects WHERE filepath = ? AND filepath != ? "
+                    "AND EXISTS (SELECT 1 FROM projects WHERE filepath = ?)",
+                    (new_path, old_path, old_path)
+                )
+                cursor.execute("UPDATE projects SET filepath = ?, is_missing = 0 WHERE filepath = ?",
+                               (new_path, old_path))
+                moved += cursor.rowcount
+            conn.commit()
+        return moved
+
+    @_writes_projects
+    def update_file_signatures(self, signatures: Dict[str, tuple]) -> int:
+        """Record the new (size, mtime_ns, inode) of files whose content did not change
+        (same fingerprint): the project and its derived rows are kept as they are."""
+        if not signatures:
+            return 0
+        rows = [(size, mtime_ns, inode, datetime.datetime.fromtimestamp(mtime_ns / 1e9), path)
+                for path, (size, mtime_ns, inode) in signatures.items()]
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany('''
+                UPDATE thumbnails SET file_size = ?, file_mtime_ns = ?, file_inode = ?
+                WHERE project_id = (SELECT id FROM projects WHERE filepath = ?)
+            ''', [(size, mtime_ns, inode, path) for size, mtime_ns, inode, _, path in rows])
+            cursor.executemany(
+                "UPDATE projects SET file_size = ?, file_mtime_ns = ?, file_inode = ?, last_modified = ?, "
+                "is_missing = 0 WHERE filepath = ?",
+                rows
+            )
+            conn.commit()
+            return cursor.rowcount
+
+    def find_duplicate_files(self) -> List[List[str]]:
+        """Groups of present files with the same content fingerprint (copies)."""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT content_hash, filepath FROM projects
+                WHERE is_missing = 0 AND content_hash IN (
+                    SELECT content_hash FROM projects
+                    WHERE is_missing = 0 AND content_hash IS NOT NULL
+                    GROUP BY content_hash HAVING COUNT(*) > 1
+                )
+                ORDER BY content_hash, filepath
+            ''')
+            groups = {}
+            for content_hash, filepath in cursor.fetchall():
+                groups.setdefault(content_hash, []).append(filepath)
+            return list(groups.values())
+
+    @_writes_projects
     def mark_missing(self, filepath: str) -> bool:
         """Mark a project as missing (file not found)."""
         with self.get_connection() as conn:
@@ -295,6 +1539,7 @@ class Database:
             cursor.execute('UPDATE projects SET is_missing = 1 WHERE filepath = ?', (filepath,))
             return cursor.rowcount > 0
 
+    @_writes_projects
     def update_filepath(self, project_id_or_path, new_path: str):
         """Update the filepath for a project."""
         with self.get_connection() as conn:
@@ -316,6 +1561,7 @@ class Database:
             rows = cursor.fetchall()
             return [dict(row) for row in rows]
 
+    @_writes_projects
     def delete_project(self, project_id: int):
         """Delete a project."""
         with self.get_connection() as conn:
@@ -324,12 +1570,10 @@ class Database:
             conn.commit()
 
     def get_all_clients(self) -> List[str]:
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT DISTINCT client FROM projects WHERE is_missing = 0 ORDER BY client")
-        clients = [row[0] for row in cursor.fetchall() if row[0]]
-        conn.close()
-        return clients
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT DISTINCT client FROM projects WHERE is_missing = 0 ORDER BY client")
+            return [row[0] for row in cursor.fetchall() if row[0]]
 
     def get_db_path(self) -> str:
         return os.path.abspath(self.db_path)
@@ -345,6 +1589,7 @@ class Database:
     def backup_database(self, backup_path: str) -> bool:
         import zipfile
         try:
+            self.checkpoint()
             with zipfile.ZipFile(backup_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
                 zipf.write(self.db_path, arcname="mwquote_index.db")
             return True
@@ -354,6 +1599,7 @@ class Database:
     def backup_database_with_projects(self, backup_path: str, projects_folder: str = None) -> bool:
         import zipfile
         try:
+            self.checkpoint()
             with zipfile.ZipFile(backup_path, 'w', zipfile.ZIP_DEFLATED) as master_zip:
                 master_zip.write(self.db_path, arcname="mwquote_index.db")
                 if projects_folder and os.path.exists(projects_folder):
@@ -367,36 +1613,53 @@ class Database:
         except Exception as e:
             raise Exception(f"Erreur backup: {str(e)}")
 
+    @_writes_projects
     def restore_database(self, backup_path: str, projects_folder: str = None) -> bool:
-        import shutil
+        import tempfile
         import zipfile
         try:
             with zipfile.ZipFile(backup_path, 'r') as zipf:
                 if "mwquote_index.db" in zipf.namelist():
-                    db_parent = os.path.dirname(self.db_path)
-                    zipf.extract("mwquote_index.db", path=db_parent)
-                    extracted_db = os.path.join(db_parent, "mwquote_index.db")
-                    if extracted_db != self.db_path:
-                        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-                        shutil.move(extracted_db, self.db_path)
+                    # The watcher, indexer and services keep their own connections open
+                    # on the live file: copy the pages into it through the backup API
+                    # (in the WAL, visible to every connection) rather than swapping it
+                    with tempfile.TemporaryDirectory() as tmp_dir:
+                        extracted_db = zipf.extract("mwquote_index.db", path=tmp_dir)
+                        source = sqlite3.connect(extracted_db)
+                        try:
+                            source.backup(self.get_connection())
+                        finally:
+                            source.close()
                 if projects_folder:
                     parent_folder = os.path.dirname(projects_folder)
                     os.makedirs(parent_folder, exist_ok=True)
                     for member in zipf.namelist():
                         if member != "mwquote_index.db" and not member.endswith('/'):
                             zipf.extract(member, path=parent_folder)
+            # The backup may predate some schema versions
+            self.init_db()
             return True
         except Exception as e:
             raise Exception(f"Erreur restore: {str(e)}")
 
+    @_writes_projects
     def clear_all(self):
         """Wipe all data from the database."""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM projects")
-        conn = sqlite3.connect(self.db_path, isolation_level=None)
-        conn.execute("VACUUM")
-        conn.close()
+            cursor.execute("DELETE FROM scanned_dirs")
+            cursor.execute("DELETE FROM operations")
+            cursor.execute("DELETE FROM cost_lines")
+            cursor.execute("DELETE FROM project_prices")
+            cursor.execute("DELETE FROM thumbnails")
+            cursor.execute("DELETE FROM exports")
+            if self.has_fts:
+                cursor.execute("DELETE FROM project_fts")
+            if self.has_fuzzy:
+                cursor.execute("DELETE FROM project_trigrams")
+            conn.commit()
+            conn.execute("VACUUM")
 
     def get_stats(self) -> Dict:
         """Get database statistics."""
@@ -421,49 +1684,23 @@ class Database:
 
     def mark_missing_files(self) -> int:
         """Mark projects as missing if their files no longer exist on disk."""
-        marked = 0
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT id, filepath FROM projects WHERE is_missing = 0")
-            rows = cursor.fetchall()
-            for pid, path in rows:
-                if not os.path.exists(path):
-                    cursor.execute("UPDATE projects SET is_missing = 1 WHERE id = ?", (pid,))
-                    marked += 1
-            conn.commit()
-        return marked
+        from infrastructure.reconcile_engine import ReconcileEngine
+        return ReconcileEngine(self).reconcile(include_missing=False)['missing']
 
+    @_writes_projects
     def delete_missing_files(self) -> int:
         """Remove projects from DB that are marked as missing."""
-        removed = 0
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT id FROM projects WHERE is_missing = 1")
-            rows = cursor.fetchall()
-            for (pid,) in rows:
-                cursor.execute("DELETE FROM projects WHERE id = ?", (pid,))
-                removed += 1
+            # Derived rows (FTS, structure, prices) go with them through the delete triggers
+            cursor.execute("DELETE FROM projects WHERE is_missing = 1")
             conn.commit()
-        return removed
+            return cursor.rowcount
 
-    def reconcile_files(self) -> Dict:
-        """Check all file paths and update missing status."""
-        stats = {'checked': 0, 'missing': 0, 'found': 0}
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT id, filepath, is_missing FROM projects")
-            rows = cursor.fetchall()
-            for pid, path, was_missing in rows:
-                stats['checked'] += 1
-                exists = os.path.exists(path)
-                if exists and was_missing:
-                    cursor.execute("UPDATE projects SET is_missing = 0 WHERE id = ?", (pid,))
-                    stats['found'] += 1
-                elif not exists and not was_missing:
-                    cursor.execute("UPDATE projects SET is_missing = 1 WHERE id = ?", (pid,))
-                    stats['missing'] += 1
-            conn.commit()
-        return stats
+    def reconcile_files(self, progress_callback=None) -> Dict:
+        """Check all file paths and update missing status (see ReconcileEngine)."""
+        from infrastructure.reconcile_engine import ReconcileEngine
+        return ReconcileEngine(self).reconcile(progress_callback=progress_callback)
 
     def get_project_by_uuid(self, mwq_uuid: str):
         """Get project by its MWQ UUID."""
@@ -474,6 +1711,7 @@ class Database:
             row = cursor.fetchone()
             return dict(row) if row else None
 
+    @_writes_projects
     def set_project_uuid(self, project_id: int, mwq_uuid: str):
         """Set the MWQ UUID for a project."""
         with self.get_connection() as conn:
@@ -481,6 +1719,7 @@ class Database:
             cursor.execute("UPDATE projects SET mwq_uuid = ? WHERE id = ?", (mwq_uuid, project_id))
             conn.commit()
 
+    @_writes_projects
     def update_filepath_by_filepath(self, old_path: str, new_path: str):
         """Update filepath from old to new path."""
         with self.get_connection() as conn:
@@ -539,7 +1778,165 @@ class Database:
 
     def increment_quote_counter(self, date: datetime.date, prefix: str = "OD") -> int:
         """Increment counter and return new value."""
-        current = self.get_quote_counter(date, prefix)
-        new_value = current + 1
-        self.update_quote_counter(date, prefix, new_value)
-        return new_value
+        return self.reserve_quote_numbers(date, prefix, 1)
+
+    def reserve_quote_numbers(self, date: datetime.date, prefix: str = "OD", count: int = 1) -> int:
+        """Allocate count consecutive counters and return the first one.
+
+        A single UPSERT inside BEGIN IMMEDIATE: the write lock is taken before
+        the counter is read, so two threads or two workstations sharing the
+        database never get the same number.
+        """
+        if count < 1:
+            raise ValueError(f"Nombre de numéros à réserver invalide : {count}")
+        date_str = date.isoformat()
+        upsert = '''
+            INSERT INTO quote_numbers (date, prefix, counter, last_updated)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(date, prefix) DO UPDATE SET
+                counter = counter + excluded.counter,
+                last_updated = CURRENT_TIMESTAMP
+        '''
+        conn = self.get_connection()
+        if conn.in_transaction:
+            conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if HAS_RETURNING:
+                last = conn.execute(upsert + " RETURNING counter", (date_str, prefix, count)).fetchall()[0][0]
+            else:
+                conn.execute(upsert, (date_str, prefix, count))
+                last = conn.execute("SELECT counter FROM quote_numbers WHERE date = ? AND prefix = ?",
+                                    (date_str, prefix)).fetchone()[0]
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return last - count + 1
+
+    def reset_quote_counter(self, date: datetime.date, prefix: str = "OD"):
+        """Set the counter of a date and prefix back to 0."""
+        self.update_quote_counter(date, prefix, 0)
+
+    def get_all_quote_counters_for_date(self, date: datetime.date) -> Dict[str, int]:
+        """Counter of every prefix used on a date."""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT prefix, counter FROM quote_numbers WHERE date = ? ORDER BY prefix",
+                           (date.isoformat(),))
+            return dict(cursor.fetchall())
+
+    def get_quote_stats_for_date(self, date: datetime.date) -> List[Dict]:
+        """One {'prefix', 'counter', 'last_updated'} row per prefix used on a date."""
+        return self._quote_counter_rows(date, date)
+
+    def export_quote_numbering_stats(self, start_date: datetime.date, end_date: datetime.date) -> Dict:
+        """Quote numbers allocated between two dates (inclusive), per day and per prefix."""
+        rows = self._quote_counter_rows(start_date, end_date)
+        by_date, by_prefix = {}, {}
+        for row in rows:
+            by_date.setdefault(row['date'], {})[row['prefix']] = row['counter']
+            by_prefix[row['prefix']] = by_prefix.get(row['prefix'], 0) + row['counter']
+        return {
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+            "total_quotes": sum(by_prefix.values()),
+            "by_prefix": by_prefix,
+            "by_date": by_date,
+        }
+
+    def _quote_counter_rows(self, start_date: datetime.date, end_date: datetime.date) -> List[Dict]:
+        # ISO dates sort as text: a range scan of the (date, prefix) index
+        with self.get_connection() as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT date, prefix, counter, last_updated FROM quote_numbers
+                WHERE date BETWEEN ? AND ? AND counter > 0
+                ORDER BY date, prefix
+            ''', (start_date.isoformat(), end_date.isoformat()))
+            return [dict(row) for row in cursor.fetchall()]
+
+    # ============= Legacy Migration Journal Methods =============
+
+    def start_migration_batch(self, batch_id: str, root_path: str):
+        """Register a migration batch (or flag an interrupted one as running again)."""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO migration_batches (batch_id, root_path, status)
+                VALUES (?, ?, 'running')
+                ON CONFLICT(batch_id) DO UPDATE SET status = 'running', finished_at = NULL
+            ''', (batch_id, root_path))
+            conn.commit()
+
+    def finish_migration_batch(self, batch_id: str, status: str = "completed"):
+        """Close a migration batch with its final status."""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "UPDATE migration_batches SET status = ?, finished_at = CURRENT_TIMESTAMP WHERE batch_id = ?",
+                (status, batch_id)
+            )
+            conn.commit()
+
+    def get_migration_batches(self) -> List[Dict]:
+        """List migration batches, most recent first."""
+        with self.get_connection() as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM migration_batches ORDER BY started_at DESC, batch_id DESC")
+            return [dict(row) for row in cursor.fetchall()]
+
+    def record_migration_entry(self, batch_id: str, filepath: str, status: str,
+                               backup_path: str = None, error: str = None, duration_ms: int = None,
+                               converted_fingerprint: str = None):
+        """Journal the outcome of one file conversion.
+
+        converted_fingerprint is the fingerprint of the ZIP file written by the
+        conversion: a rollback only restores files that still have it.
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT OR REPLACE INTO migration_journal
+                    (batch_id, filepath, backup_path, status, error, duration_ms, converted_fingerprint,
+                     completed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ''', (batch_id, filepath, backup_path, status, error, duration_ms, converted_fingerprint))
+            conn.commit()
+
+    def get_migration_entries(self, batch_id: str, status: str = None) -> List[Dict]:
+        """Get journal entries of a batch, optionally filtered by status."""
+        with self.get_connection() as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            if status:
+                cursor.execute(
+                    "SELECT * FROM migration_journal WHERE batch_id = ? AND status = ? ORDER BY id",
+                    (batch_id, status)
+                )
+            else:
+                cursor.execute("SELECT * FROM migration_journal WHERE batch_id = ? ORDER BY id", (batch_id,))
+            return [dict(row) for row in cursor.fetchall()]
+
+    def get_migration_finished_paths(self, batch_id: str) -> set:
+        """Paths already handled by a batch (converted or skipped), used to resume."""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT filepath FROM migration_journal WHERE batch_id = ? AND status IN ('done', 'skipped')",
+                (batch_id,)
+            )
+            return {row[0] for row in cursor.fetchall()}
+
+    def set_migration_entry_status(self, batch_id: str, filepath: str, status: str, error: str = None):
+        """Update the status of a journal entry (e.g. after a rollback)."""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "UPDATE migration_journal SET status = ?, error = ?, completed_at = CURRENT_TIMESTAMP "
+                "WHERE batch_id = ? AND filepath = ?",
+                (status, error, batch_id, filepath)
+            )
+            conn.commit()
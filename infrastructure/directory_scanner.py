@@ -0,0 +1,149 @@
+# infrastructure/directory_scanner.py
+"""
+Directory tree scanner shared by the indexer and the file migrations.
+
+- Built on os.scandir: the stat data of each entry comes with the listing
+  (free on Windows, where os.walk + os.stat costs one extra SMB round trip
+  per file).
+- Each directory listing is stored in the index DB with the directory mtime.
+  Adding, removing or renaming an entry changes that mtime; when it did not
+  change, the stored listing is reused and the directory is not read again.
+  MWQuote saves projects atomically (temp file + rename), so a saved project
+  also changes its directory mtime. Files edited in place by other tools are
+  only picked up by a full scan (scan(..., full=True)): the "Re-scanner"
+  maintenance actions run one, and the folder watcher stats every file
+  periodically between them.
+- Directories are read by up to io_workers threads at once: on a network share
+  each listing is a round trip, and os.scandir releases the GIL, so the round
+  trips overlap. Each quote root has its own limit (see
+  ConfigurationService.get_quote_roots): high for a local disk, low for a NAS
+  that slows down under parallel requests.
+"""
+
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, NamedTuple, Optional
+
+# Listings of directories modified less than this long ago are not trusted:
+# a change within the filesystem timestamp granularity would go unnoticed
+RACY_WINDOW_NS = 2_000_000_000
+# Directories handed to the listing threads at once, per thread
+DIRS_PER_WORKER = 4
+
+
+class ScannedFile(NamedTuple):
+    path: str
+    size: int
+    mtime_ns: int
+    inode: int
+
+
+class DirectoryScanner:
+    """Walk a tree with os.scandir, reusing the listings of unchanged directories."""
+
+    def __init__(self, db=None, extension: str = ".mwq", io_workers: int = 1):
+        self.db = db
+        self.extension = extension.lower()
+        self.io_workers = max(1, int(io_workers or 1))
+        self.stats = {}
+
+    def scan(self, root_path: str, full: bool = False, stop_event=None) -> Iterator[ScannedFile]:
+        """Yield every matching file below root_path.
+
+        Args:
+            root_path: Folder to scan
+            full: List every directory, ignoring stored listings
+            stop_event: threading.Event checked between directories
+        """
+        cache = self.db.get_scanned_dirs(root_path) if self.db is not None else {}
+        self.stats = {'dirs': 0, 'listed': 0, 'reused': 0}
+        updates = []
+        visited = set()
+        completed = False
+
+        pool = ThreadPoolExecutor(self.io_workers, thread_name_prefix="scan") if self.io_workers > 1 else None
+        read_all = pool.map if pool is not None else map
+        batch = self.io_workers * DIRS_PER_WORKER if pool is not None else 1
+        stack = [root_path]
+        try:
+            while stack:
+                if stop_event is not None and stop_event.is_set():
+                    return
+                directories = [stack.pop() for _ in range(min(batch, len(stack)))]
+                read = read_all(self._read, directories, [cache] * len(directories), [full] * len(directories))
+
+                for directory, (mtime_ns, listing, reused) in zip(directories, read):
+                    if mtime_ns is None:
+                        continue
+                    visited.add(directory)
+                    self.stats['dirs'] += 1
+                    self.stats['reused' if reused else 'listed'] += 1
+                    if listing is None:
+                        # Unreadable: not cached, and its subtree is kept in the cache
+                        visited.update(d for d in cache if d.startswith(os.path.join(directory, "")))
+                        continue
+                    if not reused:
+                        stable = time.time_ns() - mtime_ns > RACY_WINDOW_NS
+                        updates.append((directory, mtime_ns if stable else None, json.dumps(listing)))
+
+                    for name, (size, file_mtime_ns, inode) in listing['files'].items():
+                        yield ScannedFile(os.path.join(directory, name), size, file_mtime_ns, inode)
+                    stack.extend(os.path.join(directory, name) for name in reversed(listing['dirs']))
+            completed = True
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
+            if self.db is not None:
+                if updates:
+                    self.db.save_scanned_dirs(updates)
+                if completed:
+                    self.db.delete_scanned_dirs([d for d in cache if d not in visited])
+
+    def list_files(self, root_path: str, full: bool = False) -> list:
+        """Paths of every matching file below root_path."""
+        return [f.path for f in self.scan(root_path, full=full)]
+
+    def _read(self, directory: str, cache: Dict, full: bool) -> tuple:
+        """(mtime_ns, listing, reused) of a directory; mtime_ns is None when it is gone,
+        listing is None when it cannot be read."""
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+        except OSError:
+            return None, None, False
+        cached = cache.get(directory)
+        if not full and cached is not None and cached[0] == mtime_ns:
+            return mtime_ns, json.loads(cached[1]), True
+        return mtime_ns, self._list(directory), False
+
+    def _list(self, directory: str) -> Optional[Dict]:
+        files, dirs = {}, []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            dirs.append(entry.name)
+                        elif entry.name.lower().endswith(self.extension):
+                            st = entry.stat()
+                            # Free on POSIX; on Windows it would cost the stat() call
+                            # scandir saves, so the inode is left unknown (0)
+                            inode = entry.inode() if os.name != 'nt' else 0
+                            files[entry.name] = (st.st_size, st.st_mtime_ns, inode)
+                    except OSError:
+                        continue
+        except OSError as e:
+            print(f"Error listing {directory}: {e}")
+            return None
+        dirs.sort()
+        return {'files': dict(sorted(files.items())), 'dirs': dirs}
+
+
+def same_signature(stored: Optional[tuple], signature: tuple) -> bool:
+    """Compare (size, mtime_ns, inode) signatures; an inode of 0 means unknown."""
+    if stored is None:
+        return False
+    size, mtime_ns, inode = stored[:3]
+    return (size == signature[0] and mtime_ns == signature[1]
+            and (not inode or not signature[2] or inode == signature[2]))
@@ -2,6 +2,9 @@ import os
 import base64
 import datetime
 import calendar
+import io
+import pickle
+import threading
 from copy import copy
 from openpyxl import load_workbook
 from openpyxl.utils import get_column_letter
@@ -10,6 +13,90 @@ from domain.cost import CostType
 
 logger = get_module_logger("ExportService", "export_project.log")
 
+# Cell values replaced at export (see ExportService._replace_cell_placeholder)
+TEMPLATE_PLACEHOLDERS = frozenset({
+    "DEVIS_REF", "PART_REF", "CUSTOMER_NAME", "DATE_REF", "VALIDITY_REF", "COMMENT_REF",
+    "IMAGE_PREVIEW", "QTY_REF", "PU_REF", "TOOL_REF", "PTOOL_REF",
+})
+
+
+class CompiledTemplate:
+    """
+    Template XLSX analysé une seule fois : classeur sérialisé et coordonnées des
+    placeholders. Chaque export part d'une copie en mémoire (désérialisation,
+    bien plus rapide que load_workbook) et n'écrit que les cellules repérées.
+
+    La copie par pickle dépend d'attributs privés d'openpyxl (vérifiée avec
+    openpyxl 3.1) : si elle échoue, chaque export relit le template depuis ses
+    octets en mémoire avec load_workbook (plus lent, même résultat).
+    """
+
+    def __init__(self, template_path):
+        self.path = template_path
+        stat = os.stat(template_path)
+        self.signature = (stat.st_mtime_ns, stat.st_size)
+        with open(template_path, "rb") as f:
+            self._template_bytes = f.read()
+        wb = load_workbook(io.BytesIO(self._template_bytes))
+        # {row: {column: token}} of the active sheet
+        self.placeholders = {}
+        for row in wb.active.iter_rows():
+            for cell in row:
+                if isinstance(cell.value, str) and cell.value.strip() in TEMPLATE_PLACEHOLDERS:
+                    self.placeholders.setdefault(cell.row, {})[cell.column] = cell.value.strip()
+        # copy.deepcopy breaks the workbook style tables; a pickle round trip does not
+        try:
+            self._workbook_blob = pickle.dumps(wb, protocol=pickle.HIGHEST_PROTOCOL)
+            self._unpickle_workbook()
+        except Exception as e:
+            self._disable_pickle_copy(e)
+
+    def new_workbook(self):
+        """Copie indépendante du classeur template."""
+        if self._workbook_blob is not None:
+            try:
+                return self._unpickle_workbook()
+            except Exception as e:
+                self._disable_pickle_copy(e)
+        return load_workbook(io.BytesIO(self._template_bytes))
+
+    def _unpickle_workbook(self):
+        wb = pickle.loads(self._workbook_blob)
+        for ws in wb.worksheets:
+            # The row / column dimension holders lose their factory when unpickled
+            ws.row_dimensions.default_factory = ws._add_row
+            ws.column_dimensions.default_factory = ws._add_column
+        return wb
+
+    def _disable_pickle_copy(self, error):
+        logger.warning(f"Copie en mémoire du template impossible ({error}) : "
+                       f"relecture du template à chaque export")
+        self._workbook_blob = None
+
+    def columns(self, row_idx):
+        """Colonnes de la ligne portant un placeholder."""
+        return sorted(self.placeholders.get(row_idx, ()))
+
+    def rows_with(self, placeholder):
+        return [row for row in sorted(self.placeholders) if placeholder in self.placeholders[row].values()]
+
+
+_compiled_templates = {}
+_compiled_templates_lock = threading.Lock()
+
+
+def compile_template(template_path):
+    """CompiledTemplate du fichier, analysé de nouveau seulement s'il a changé sur le disque."""
+    key = os.path.abspath(template_path)
+    stat = os.stat(template_path)
+    with _compiled_templates_lock:
+        compiled = _compiled_templates.get(key)
+        if compiled is None or compiled.signature != (stat.st_mtime_ns, stat.st_size):
+            compiled = CompiledTemplate(template_path)
+            _compiled_templates[key] = compiled
+            logger.info(f"Template compilé : {template_path} ({len(compiled.placeholders)} lignes à remplir)")
+        return compiled
+
 
 class ExportService:
     """
@@ -42,6 +129,18 @@ class ExportService:
         today = datetime.date.today()
         return f"OD{today.strftime('%y%m%d')}_001"
 
+    def reserve_devis_references(self, count: int):
+        """
+        Réserve count références de devis consécutives en une seule transaction
+        (exports multiples).
+        """
+        if self.numbering_service:
+            return self.numbering_service.reserve_block(count, "OD")
+
+        # Fallback sans DB
+        today = datetime.date.today()
+        return [f"OD{today.strftime('%y%m%d')}_{i + 1:03d}" for i in range(count)]
+
     def get_default_filename(self, project, devis_ref: str = None):
         """Génère le nom de fichier par défaut : DEVIS_REF-PART_REF-xQTYmin-xQTYmax.xlsx"""
         if devis_ref is None:
@@ -87,7 +186,8 @@ class ExportService:
     # =========================
     def export_excel(self, project, template_path, output_path, project_save_path=None, devis_ref=None):
         try:
-            wb = load_workbook(template_path)
+            template = compile_template(template_path)
+            wb = template.new_workbook()
             ws = wb.active
 
             # 0. Generate devis reference
@@ -99,12 +199,13 @@ class ExportService:
 
             self._current_export_ref = devis_ref
 
-            import datetime as _dt
-            ref_date = _dt.date.today()
+            now = datetime.datetime.now()
+            ref_date = now.date()
+            self._current_export_date = ref_date
             project.export_history.append({
                 "devis_ref": devis_ref,
                 "date": ref_date.strftime("%d/%m/%Y"),
-                "time": _dt.datetime.now().strftime("%H:%M"),
+                "time": now.strftime("%H:%M"),
                 "version_index": getattr(project, 'current_version_index', 1),
             })
 
@@ -120,14 +221,15 @@ class ExportService:
 
             logger.info(f"Export {qty_count} quantités vers le template.")
 
-            # 3. Identifier les lignes de placeholders et les remplir
+            # 3. Remplir les lignes de placeholders repérées à la compilation du template
             rows_to_hide = []
             
-            for row_idx in range(1, ws.max_row + 1):
+            for row_idx in sorted(template.placeholders):
                 # La ligne 33 doit rester statique
                 if row_idx == 33:
                     continue
 
+                columns = template.columns(row_idx)
                 is_qty_row = False
                 
                 # Vérifier si c'est une ligne de quantité (PART_REF en colonne B)
@@ -137,41 +239,44 @@ class ExportService:
                     if cell_b.value == "PART_REF":
                         if qty_processed < qty_count:
                             qty = quantities[qty_processed]
-                            self._fill_qty_row(ws, row_idx, project, qty, global_comment)
+                            self._fill_qty_row(ws, row_idx, project, qty, global_comment, columns)
                             qty_processed += 1
                             is_qty_row = True
                         else:
                             # Effacer les placeholders de la ligne avant de la masquer
-                            self._clear_row_placeholders(ws, row_idx)
+                            self._clear_row_placeholders(ws, row_idx, columns)
                             rows_to_hide.append(row_idx)
                             continue
 
-                # 4. Remplacer les placeholders globaux sur toute la ligne
+                # 4. Remplacer les placeholders globaux de la ligne
                 if not is_qty_row:
-                    self._replace_global_placeholders(ws, row_idx, project, global_comment)
+                    self._replace_global_placeholders(ws, row_idx, project, global_comment, columns)
 
             # 5. Masquer les lignes en trop (au lieu de les supprimer pour préserver les fusions)
             for row_idx in rows_to_hide:
                 ws.row_dimensions[row_idx].hidden = True
 
             # 5.b Gestion des lignes outillage (TOOL_REF / QTY_REF / PTOOL_REF)
-            self._fill_tooling_rows(ws, tooling_lines, project, global_comment)
+            inserted = self._fill_tooling_rows(ws, tooling_lines, project, global_comment, template)
             # 5.c Sécurise COMMENT_REF (certaines manipulations de lignes peuvent l'effacer)
-            self._fill_comment_placeholders(ws, global_comment)
+            self._fill_comment_placeholders(ws, global_comment, template, inserted)
 
             # 7. Ajouter l'onglet SERIE si le mode série est actif
             if getattr(project, 'serie_data', None) is not None:
                 self._add_serie_sheet(wb, project.serie_data)
 
+            # Rendered in memory: the same bytes are written and embedded in the project
+            buffer = io.BytesIO()
+            wb.save(buffer)
+            xlsx_bytes = buffer.getvalue()
             os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            wb.save(output_path)
+            with open(output_path, 'wb') as f:
+                f.write(xlsx_bytes)
 
             logger.info(f"Export Excel réussi → {output_path}")
 
             # Embed the generated XLSX bytes in the last export_history entry
             try:
-                with open(output_path, 'rb') as f:
-                    xlsx_bytes = f.read()
                 xlsx_filename = os.path.basename(output_path)
                 if project.export_history:
                     last_entry = project.export_history[-1]
@@ -204,8 +309,12 @@ class ExportService:
             ref = f"{ref} - PROTO"
         return ref
 
-    def _fill_qty_row(self, ws, row_idx, project, qty, global_comment):
-        for col_idx in range(1, ws.max_column + 1):
+    def _row_columns(self, ws, columns):
+        """Colonnes à examiner : celles du template compilé, sinon toute la ligne."""
+        return columns if columns is not None else range(1, ws.max_column + 1)
+
+    def _fill_qty_row(self, ws, row_idx, project, qty, global_comment, columns=None):
+        for col_idx in self._row_columns(ws, columns):
             cell = ws.cell(row=row_idx, column=col_idx)
             val = cell.value
             if not isinstance(val, str):
@@ -223,8 +332,8 @@ class ExportService:
             else:
                 self._replace_cell_placeholder(cell, project, global_comment)
 
-    def _replace_global_placeholders(self, ws, row_idx, project, global_comment):
-        for col_idx in range(1, ws.max_column + 1):
+    def _replace_global_placeholders(self, ws, row_idx, project, global_comment, columns=None):
+        for col_idx in self._row_columns(ws, columns):
             cell = ws.cell(row=row_idx, column=col_idx)
             self._replace_cell_placeholder(cell, project, global_comment)
 
@@ -234,9 +343,9 @@ class ExportService:
             return
         token = val.strip()
 
-        # Determine reference date (used for both DATE_REF and VALIDITY_REF)
-        # Always use today's date at the moment of export
-        ref_date = datetime.date.today()
+        # Determine reference date (used for both DATE_REF and VALIDITY_REF):
+        # the date of the export session, taken once per export
+        ref_date = getattr(self, '_current_export_date', None) or datetime.date.today()
 
         if token == "DEVIS_REF":
             # Use the reference pre-calculated for this export session
@@ -304,14 +413,14 @@ class ExportService:
             else:
                 cell.value = "Preview non fournie"
 
-    def _clear_row_placeholders(self, ws, row_idx):
+    def _clear_row_placeholders(self, ws, row_idx, columns=None):
         """Efface les placeholders d'une ligne avant de la masquer."""
         placeholders = [
             "PART_REF", "QTY_REF", "PU_REF",
             "TOOL_REF", "PTOOL_REF",
             "DEVIS_REF", "DATE_REF", "VALIDITY_REF", "CUSTOMER_NAME"
         ]
-        for col_idx in range(1, ws.max_column + 1):
+        for col_idx in self._row_columns(ws, columns):
             cell = ws.cell(row=row_idx, column=col_idx)
             if isinstance(cell.value, str) and cell.value.strip() in placeholders:
                 cell.value = ""
@@ -349,13 +458,13 @@ class ExportService:
         ws.row_dimensions[target_row].height = src_dim.height
         ws.row_dimensions[target_row].hidden = src_dim.hidden
 
-    def _fill_tool_row(self, ws, row_idx, tool_cost, project, global_comment):
+    def _fill_tool_row(self, ws, row_idx, tool_cost, project, global_comment, columns=None):
         price = 0.0
         if getattr(tool_cost, "pricing", None):
             # Outillage exporté en ligne unitaire x1: on utilise le montant de lot.
             price = float(getattr(tool_cost.pricing, "fixed_price", 0.0) or 0.0)
 
-        for col_idx in range(1, ws.max_column + 1):
+        for col_idx in self._row_columns(ws, columns):
             cell = ws.cell(row=row_idx, column=col_idx)
             val = cell.value
             if not isinstance(val, str):
@@ -372,45 +481,64 @@ class ExportService:
                 self._replace_cell_placeholder(cell, project, global_comment)
         ws.row_dimensions[row_idx].hidden = False
 
-    def _fill_tooling_rows(self, ws, tooling_lines, project, global_comment):
-        tool_rows = self._find_rows_with_placeholder(ws, "TOOL_REF")
+    def _fill_tooling_rows(self, ws, tooling_lines, project, global_comment, template=None):
+        """Remplit les lignes TOOL_REF ; retourne (ligne, nombre) des lignes insérées ou None."""
+        if template is not None:
+            tool_rows = template.rows_with("TOOL_REF")
+            columns = {row: template.columns(row) for row in tool_rows}
+        else:
+            tool_rows = self._find_rows_with_placeholder(ws, "TOOL_REF")
+            columns = {}
         if not tool_rows:
-            return
+            return None
 
         if not tooling_lines:
             for row_idx in tool_rows:
-                self._clear_row_placeholders(ws, row_idx)
+                self._clear_row_placeholders(ws, row_idx, columns.get(row_idx))
                 ws.row_dimensions[row_idx].hidden = True
-            return
+            return None
 
         n_tools = len(tooling_lines)
         n_template = len(tool_rows)
 
         # Si plus d'outillages que de lignes template → cloner la dernière
+        inserted = None
         if n_tools > n_template:
             extra_needed = n_tools - n_template
             last_row = tool_rows[-1]
             ws.insert_rows(last_row + 1, amount=extra_needed)
             for i in range(extra_needed):
                 self._clone_row_format(ws, last_row, last_row + 1 + i)
+                if last_row in columns:
+                    columns[last_row + 1 + i] = columns[last_row]
             tool_rows = tool_rows + [last_row + 1 + i for i in range(extra_needed)]
+            inserted = (last_row + 1, extra_needed)
 
         for idx, tool_cost in enumerate(tooling_lines):
-            self._fill_tool_row(ws, tool_rows[idx], tool_cost, project, global_comment)
+            self._fill_tool_row(ws, tool_rows[idx], tool_cost, project, global_comment, columns.get(tool_rows[idx]))
 
         # Masquer les lignes template non utilisées
         for row_idx in tool_rows[n_tools:]:
-            self._clear_row_placeholders(ws, row_idx)
+            self._clear_row_placeholders(ws, row_idx, columns.get(row_idx))
             ws.row_dimensions[row_idx].hidden = True
-
-    def _fill_comment_placeholders(self, ws, global_comment):
+        return inserted
+
+    def _fill_comment_placeholders(self, ws, global_comment, template=None, inserted=None):
+        if template is not None:
+            # Cellules COMMENT_REF du template, décalées des lignes outillage insérées au-dessus
+            at, count = inserted or (0, 0)
+            coordinates = [(row + count if row >= at else row, col)
+                           for row in template.rows_with("COMMENT_REF")
+                           for col, token in template.placeholders[row].items() if token == "COMMENT_REF"]
+        else:
+            coordinates = [(row_idx, col_idx) for row_idx in range(1, ws.max_row + 1)
+                           for col_idx in range(1, ws.max_column + 1)]
         replaced = 0
-        for row_idx in range(1, ws.max_row + 1):
-            for col_idx in range(1, ws.max_column + 1):
-                cell = ws.cell(row=row_idx, column=col_idx)
-                if isinstance(cell.value, str) and cell.value.strip() == "COMMENT_REF":
-                    cell.value = global_comment
-                    replaced += 1
+        for row_idx, col_idx in coordinates:
+            cell = ws.cell(row=row_idx, column=col_idx)
+            if isinstance(cell.value, str) and cell.value.strip() == "COMMENT_REF":
+                cell.value = global_comment
+                replaced += 1
         logger.info(f"COMMENT_REF replaced count: {replaced}")
 
     def _build_global_comment(self, project):
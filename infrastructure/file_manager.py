@@ -15,6 +15,8 @@ import uuid
 from typing import Optional, Dict, List
 from pathlib import Path
 
+from infrastructure.directory_scanner import DirectoryScanner
+
 
 class FileManager:
     """Manages MWQ file organization with UUID-based systematic naming."""
@@ -141,54 +143,50 @@ class FileManager:
             "details": []
         }
         
-        # Find all .mwq files
-        for root, _, files in os.walk(root_folder):
-            for filename in files:
-                if not filename.lower().endswith(FileManager.MWQ_EXTENSION):
-                    continue
+        # Find all .mwq files (listed up front: files are moved while we go)
+        for old_path in DirectoryScanner(db, FileManager.MWQ_EXTENSION).list_files(root_folder):
+            filename = os.path.basename(old_path)
+            stats["scanned"] += 1
+            
+            # Skip if already has UUID format
+            if FileManager.extract_uuid_from_filename(filename):
+                stats["already_uuid"] += 1
+                continue
+            
+            try:
+                # Generate new UUID-based filename
+                new_filename = FileManager.generate_mwq_filename(use_uuid=True)
+                new_path = os.path.join(root_folder, new_filename)
                 
-                stats["scanned"] += 1
-                old_path = os.path.join(root, filename)
+                # Ensure uniqueness
+                counter = 1
+                base_name, ext = os.path.splitext(new_filename)
+                while os.path.exists(new_path):
+                    new_filename = f"{base_name}_{counter}{ext}"
+                    new_path = os.path.join(root_folder, new_filename)
+                    counter += 1
                 
-                # Skip if already has UUID format
-                if FileManager.extract_uuid_from_filename(filename):
-                    stats["already_uuid"] += 1
-                    continue
+                # Rename file (move to root folder with new name)
+                shutil.move(old_path, new_path)
                 
-                try:
-                    # Generate new UUID-based filename
-                    new_filename = FileManager.generate_mwq_filename(use_uuid=True)
-                    new_path = os.path.join(root_folder, new_filename)
-                    
-                    # Ensure uniqueness
-                    counter = 1
-                    base_name, ext = os.path.splitext(new_filename)
-                    while os.path.exists(new_path):
-                        new_filename = f"{base_name}_{counter}{ext}"
-                        new_path = os.path.join(root_folder, new_filename)
-                        counter += 1
-                    
-                    # Rename file (move to root folder with new name)
-                    shutil.move(old_path, new_path)
-                    
-                    # Update database if provided
-                    if db:
-                        db.update_filepath_by_filepath(old_path, new_path)
-                    
-                    stats["migrated"] += 1
-                    stats["details"].append({
-                        "old": old_path,
-                        "new": new_path,
-                        "status": "success"
-                    })
-                    
-                except Exception as e:
-                    stats["errors"].append(f"{filename}: {str(e)}")
-                    stats["details"].append({
-                        "old": old_path,
-                        "error": str(e),
-                        "status": "failed"
-                    })
+                # Update database if provided
+                if db:
+                    db.update_filepath_by_filepath(old_path, new_path)
+                
+                stats["migrated"] += 1
+                stats["details"].append({
+                    "old": old_path,
+                    "new": new_path,
+                    "status": "success"
+                })
+                
+            except Exception as e:
+                stats["errors"].append(f"{filename}: {str(e)}")
+                stats["details"].append({
+                    "old": old_path,
+                    "error": str(e),
+                    "status": "failed"
+                })
         
         return stats
 
@@ -219,11 +217,7 @@ class FileManager:
         }
         
         # Find all .mwq files in old location
-        mwq_files = []
-        for root, _, files in os.walk(old_root):
-            for filename in files:
-                if filename.lower().endswith(FileManager.MWQ_EXTENSION):
-                    mwq_files.append(os.path.join(root, filename))
+        mwq_files = DirectoryScanner(db, FileManager.MWQ_EXTENSION).list_files(old_root)
         
         total = len(mwq_files)
         
@@ -279,19 +273,15 @@ class FileManager:
         return stats
 
     @staticmethod
-    def get_all_mwq_files(root_folder: str) -> List[str]:
-        """Get list of all .mwq files in root folder and subdirectories."""
-        mwq_files = []
-        
+    def get_all_mwq_files(root_folder: str, db=None) -> List[str]:
+        """Get list of all .mwq files in root folder and subdirectories.
+
+        With db, listings of unchanged folders are reused (see DirectoryScanner).
+        """
         if not os.path.exists(root_folder):
-            return mwq_files
-        
-        for root, _, files in os.walk(root_folder):
-            for filename in files:
-                if filename.lower().endswith(FileManager.MWQ_EXTENSION):
-                    mwq_files.append(os.path.join(root, filename))
+            return []
         
-        return mwq_files
+        return DirectoryScanner(db, FileManager.MWQ_EXTENSION).list_files(root_folder)
 
     @staticmethod
     def estimate_size(filepath: str) -> int:
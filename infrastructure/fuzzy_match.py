@@ -0,0 +1,66 @@
+# infrastructure/fuzzy_match.py
+"""
+Trigram similarity of part references and client names.
+
+References are typed inconsistently ("MINITUBES-OPP-26-001929-3858",
+"minitubes opp 26-1929"): keys are lower-cased, accents and separators are
+normalized, and two keys are compared on the set of their 3-character slices.
+A typo only changes the few trigrams around it, so the rest still match.
+
+The index side is an FTS5 trigram table of the normalized keys (see
+Database.fuzzy_search_projects); this module only holds the arithmetic.
+"""
+
+import math
+import re
+import unicodedata
+from typing import FrozenSet
+
+# Keys are indexed for these project fields
+FUZZY_FIELDS = ("reference", "client")
+DEFAULT_MIN_SIMILARITY = 0.4
+
+_SEPARATORS = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_key(text: str) -> str:
+    """Lower case, no accents, every run of separators turned into one space."""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _SEPARATORS.sub(" ", text.lower()).strip()
+
+
+def padded_key(text: str) -> str:
+    """Normalized key with a space on each side, so that word ends form trigrams too."""
+    key = normalize_key(text)
+    return f" {key} " if key else ""
+
+
+def trigrams(text: str) -> FrozenSet[str]:
+    """Trigrams of the padded normalized key."""
+    padded = padded_key(text)
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def similarity(query: FrozenSet[str], key: FrozenSet[str]) -> float:
+    """Score in [0, 1]: mean of the Jaccard index and of the share of the query found.
+
+    The Jaccard index alone penalizes a partial reference typed by the user; the
+    query coverage alone would rank every long key containing it first.
+    """
+    if not query or not key:
+        return 0.0
+    shared = len(query & key)
+    return (shared / len(query | key) + shared / len(query)) / 2
+
+
+def min_shared(query_size: int, min_similarity: float) -> int:
+    """Trigrams a key must share with the query to reach min_similarity.
+
+    similarity() never exceeds shared / len(query), so any key scoring at least
+    min_similarity contains at least one of the (query_size - min_shared + 1)
+    rarest query trigrams: only those need to be looked up to find candidates.
+    """
+    return max(1, math.ceil(min_similarity * query_size - 1e-9))
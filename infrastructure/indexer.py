@@ -1,20 +1,188 @@
+import datetime
 import os
+import queue
+import sqlite3
 import threading
-from typing import Callable, Dict
-from infrastructure.database import Database
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple, Union
+from domain.calculator import Calculator
+from infrastructure.database import Database, PRICE_COLUMNS
 from infrastructure.persistence import PersistenceService
+from infrastructure.legacy_migration_job import LegacyMigrationJob
+from infrastructure.directory_scanner import DirectoryScanner, same_signature
+from infrastructure.reconcile_engine import ReconcileEngine
+from infrastructure.thumbnails import build_thumbnail
+
+MAX_IN_FLIGHT_PER_WORKER = 4
+WRITE_BATCH_SIZE = 200
+
+# Control messages sent to the writer thread of the indexing pipeline
+_MARK_MISSING = object()
+_END = object()
+
+
+def build_project_data(project, filepath: str, content_hash: str,
+                       signature: Tuple[int, int, int] = None) -> Dict:
+    """Build the project data dict for database insertion."""
+    qtys = sorted(project.sale_quantities)
+    size, mtime_ns, inode = signature or (None, None, None)
+    return {
+        'name': project.name,
+        'reference': project.reference,
+        'client': project.client,
+        'mwq_uuid': getattr(project, "mwq_uuid", None),
+        'filepath': filepath,
+        'drawing_filename': project.drawing_filename,
+        'preview_filename': getattr(project.preview_image, 'filename', None) if getattr(project, 'preview_image', None) else None,
+        'min_qty': qtys[0] if qtys else 0,
+        'max_qty': qtys[-1] if qtys else 0,
+        'content_hash': content_hash,
+        'has_serie': getattr(project, 'serie_data', None) is not None,
+        'is_prototype': bool(getattr(project, 'is_prototype', False)),
+        'file_size': size,
+        'file_mtime_ns': mtime_ns,
+        'file_inode': inode,
+        'last_modified': datetime.datetime.fromtimestamp(mtime_ns / 1e9) if mtime_ns else None,
+        'search_document': build_search_document(project),
+        'structure': build_structure_rows(project),
+        'prices': build_price_rows(project),
+        'exports': build_export_rows(project),
+        'thumbnail': build_thumbnail(filepath, project),
+    }
+
+
+def build_search_document(project) -> Dict[str, str]:
+    """Text of a project for the full-text index, one entry per FTS column.
+
+    Every version of the project is included, so a supplier reference or an
+    operation from an older version still finds the quote.
+    """
+    operations, costs, comments, supplier_refs, templates = [], [], [], [], []
+    for version in getattr(project, 'versions', None) or []:
+        for op in version.operations:
+            operations.extend([op.code, op.label, op.typology])
+            comments.append(op.comment)
+            templates.append(getattr(op, 'template_name', ""))
+            for cost in op.costs.values():
+                costs.append(cost.name)
+                comments.extend([cost.comment, cost.client_comment])
+                supplier_refs.append(cost.supplier_quote_ref)
+
+    def join(values):
+        # dict.fromkeys: drop duplicates across versions, keep order
+        return " ".join(dict.fromkeys(str(v).strip() for v in values if v and str(v).strip()))
+
+    return {
+        'name': project.name or "",
+        'reference': project.reference or "",
+        'client': project.client or "",
+        'operations': join(operations),
+        'costs': join(costs),
+        'comments': join(comments),
+        'supplier_refs': join(supplier_refs),
+        'templates': join(templates),
+    }
+
+
+def build_structure_rows(project) -> Dict[str, list]:
+    """Operations and cost lines of every project version, as rows for the index.
+
+    Row layout: see OPERATION_COLUMNS / COST_LINE_COLUMNS in infrastructure.database.
+    """
+    operations, cost_lines = [], []
+    current = getattr(project, 'current_version_index', None)
+    for version in getattr(project, 'versions', None) or []:
+        is_current = 1 if version.version_index == current else 0
+        for op_position, op in enumerate(version.operations):
+            operations.append((
+                version.version_index, is_current, op_position, op.code, op.label, op.typology,
+                op.template_id, op.template_name, op.template_drift_score, len(op.costs),
+            ))
+            priced = {id(c) for c in op._get_active_costs()}
+            for position, cost in enumerate(op.costs.values()):
+                pricing = cost.pricing
+                cost_lines.append((
+                    version.version_index, is_current, op_position, position, op.code, op.typology,
+                    cost.name, cost.cost_type.value, pricing.pricing_type.value,
+                    cost.fixed_time, cost.per_piece_time, cost.hourly_rate, cost.margin_rate,
+                    pricing.fixed_price, pricing.unit_price, len(pricing.tiers or []),
+                    1 if cost.is_active else 0, 1 if id(cost) in priced else 0,
+                    cost.supplier_quote_ref,
+                ))
+    return {'operations': operations, 'cost_lines': cost_lines}
+
+
+def build_price_rows(project) -> List[tuple]:
+    """Price breakdown of every project version at each of its sale quantities.
+
+    Row layout: see PRICE_COLUMNS in infrastructure.database.
+    """
+    rows = []
+    current = getattr(project, 'current_version_index', None)
+    for version in getattr(project, 'versions', None) or []:
+        is_current = 1 if version.version_index == current else 0
+        rates = version.volume_margin_rates or {}
+        for qty in sorted(set(version.sale_quantities or [])):
+            if qty <= 0:
+                continue
+            breakdown = Calculator.calculate_price_breakdown(version.operations, qty, rates.get(qty, 1.0))
+            rows.append((version.version_index, is_current, qty,
+                         *(breakdown[col] for col in PRICE_COLUMNS[3:])))
+    return rows
+
+
+def build_export_rows(project) -> List[tuple]:
+    """Entries of the project export history (see ExportService.export_excel).
+
+    Row layout: see EXPORT_COLUMNS in infrastructure.database. Dates are stored
+    as YYYY-MM-DD so that they sort; the XLSX size is that of the embedded file.
+    """
+    rows = []
+    for position, entry in enumerate(getattr(project, 'export_history', None) or []):
+        devis_ref = str(entry.get('devis_ref') or "").strip()
+        if not devis_ref:
+            continue
+        export_date = entry.get('date')
+        try:
+            export_date = datetime.datetime.strptime(export_date, "%d/%m/%Y").date().isoformat()
+        except (TypeError, ValueError):
+            pass
+        xlsx_b64 = entry.get('xlsx_data_b64') or ""
+        xlsx_size = len(xlsx_b64) * 3 // 4 - xlsx_b64[-2:].count("=") if xlsx_b64 else None
+        rows.append((position, devis_ref, export_date, entry.get('time'), entry.get('version_index'),
+                     entry.get('xlsx_filename'), entry.get('_xlsx_path'), xlsx_size))
+    return rows
+
+
+def extract_project_data(filepath: str, signature: Tuple[int, int, int]) -> Dict:
+    """Load one project file and build its index row. Runs in a worker process.
+
+    Returns a result dict (never raises) so the writer can count the error.
+    """
+    try:
+        project, content_hash = PersistenceService.get_project_metadata(filepath)
+        project_data = build_project_data(project, filepath, content_hash, signature)
+        return {'filepath': filepath, 'project_data': project_data, 'error': None}
+    except Exception as e:
+        return {'filepath': filepath, 'project_data': None, 'error': str(e)}
 
 
 class Indexer:
-    def __init__(self, database: Database):
+    def __init__(self, database: Database, max_workers: int = None):
         self.database = database
+        self.max_workers = max_workers or max(1, min(8, os.cpu_count() or 1))
         self.is_indexing = False
         self._stop_event = threading.Event()
+        self._migration_job = None
+        # Outcome of the last directory run: lists of new/changed/removed/restored
+        # paths and the number of files skipped because their signature did not change
+        self.last_run_stats = {}
 
     def index_directory(self, root_path: str,
                        progress_callback: Callable[[str], None] = None,
                        completion_callback: Callable[[int], None] = None,
-                       migrate_to_zip: bool = False):
+                       migrate_to_zip: bool = False,
+                       full_rescan: bool = False):
         """Start indexing in a background thread.
 
         Args:
@@ -22,6 +190,34 @@ class Indexer:
             progress_callback: Called with status messages
             completion_callback: Called with count when done
             migrate_to_zip: If True, convert legacy JSON files to ZIP format
+            full_rescan: If True, list every folder again (see DirectoryScanner)
+        """
+        if self.is_indexing:
+            return
+
+        self._stop_event.clear()
+        self.is_indexing = True
+
+        thread = threading.Thread(
+            target=self._index_worker,
+            args=(root_path, progress_callback, completion_callback, migrate_to_zip, full_rescan)
+        )
+        thread.daemon = True
+        thread.start()
+
+    def index_roots(self, roots: List[Dict],
+                    progress_callback: Callable[[str], None] = None,
+                    completion_callback: Callable[[int], None] = None,
+                    migrate_to_zip: bool = False,
+                    full_rescan: bool = False):
+        """Start indexing several quote roots into the index, in a background thread.
+
+        Args:
+            roots: {'path', 'io_workers'} dicts (see ConfigurationService.get_quote_roots)
+                   or plain folder paths. Each root is walked by its own scanner
+                   thread with its own directory-listing limit; parsing and writing
+                   are shared.
+            Others: see index_directory
         """
         if self.is_indexing:
             return
@@ -31,11 +227,23 @@ class Indexer:
 
         thread = threading.Thread(
             target=self._index_worker,
-            args=(root_path, progress_callback, completion_callback, migrate_to_zip)
+            args=(list(roots), progress_callback, completion_callback, migrate_to_zip, full_rescan)
         )
         thread.daemon = True
         thread.start()
 
+    @staticmethod
+    def _normalize_roots(roots: Union[str, List]) -> List[Dict]:
+        if isinstance(roots, (str, os.PathLike)):
+            roots = [roots]
+        normalized = []
+        for root in roots:
+            if isinstance(root, dict):
+                normalized.append({'path': root['path'], 'io_workers': root.get('io_workers') or 1})
+            else:
+                normalized.append({'path': os.fspath(root), 'io_workers': 1})
+        return normalized
+
     def index_file(self, filepath: str, migrate_to_zip: bool = False) -> bool:
         """Index or re-index a single project file.
 
@@ -60,34 +268,129 @@ class Indexer:
             project, content_hash = PersistenceService.get_project_metadata(filepath)
 
             # Prepare data for DB
-            project_data = self._build_project_data(project, filepath, content_hash)
+            project_data = self._build_project_data(project, filepath, content_hash,
+                                                    self.file_signature(os.stat(filepath)))
             self.database.upsert_project(project_data)
             return True
         except Exception as e:
             print(f"Error indexing single file {filepath}: {e}")
             return False
 
-    def _build_project_data(self, project, filepath: str, content_hash: str) -> Dict:
+    @staticmethod
+    def file_signature(stat_result: os.stat_result) -> Tuple[int, int, int]:
+        """(size, mtime_ns, inode) used to detect files changed since the last run."""
+        return (stat_result.st_size, stat_result.st_mtime_ns, stat_result.st_ino)
+
+    @staticmethod
+    def _same_content(filepath: str, previous, signature: Tuple[int, int, int], touched: Dict) -> bool:
+        """True when a file with a new signature still has its indexed content.
+
+        One small read of the fingerprint stored at the end of the archive (see
+        PersistenceService.read_fingerprint) instead of loading the project: copied
+        back, touched or re-synced files are not parsed again. Their new signature
+        is added to touched, to be recorded with Database.update_file_signatures.
+
+        Never for a stored signature of NULL: schema migrations clear it to have
+        every project reloaded (new derived tables to fill), content unchanged.
+        """
+        if previous is None or not previous[4] or previous[1] is None:
+            return False
+        if PersistenceService.read_fingerprint(filepath) != previous[4]:
+            return False
+        touched[filepath] = signature
+        return True
+
+    def _build_project_data(self, project, filepath: str, content_hash: str,
+                            signature: Tuple[int, int, int] = None) -> Dict:
         """Build the project data dict for database insertion."""
-        qtys = sorted(project.sale_quantities)
-        return {
-            'name': project.name,
-            'reference': project.reference,
-            'client': project.client,
-            'mwq_uuid': getattr(project, "mwq_uuid", None),
-            'filepath': filepath,
-            'drawing_filename': project.drawing_filename,
-            'preview_filename': getattr(project.preview_image, 'filename', None) if getattr(project, 'preview_image', None) else None,
-            'min_qty': qtys[0] if qtys else 0,
-            'max_qty': qtys[-1] if qtys else 0,
-            'content_hash': content_hash,
-            'has_serie': getattr(project, 'serie_data', None) is not None,
-            'is_prototype': bool(getattr(project, 'is_prototype', False)),
-        }
+        return build_project_data(project, filepath, content_hash, signature)
+
+    def apply_file_events(self, changed_paths, deleted_paths) -> Dict:
+        """Apply a debounced batch of filesystem events to the index.
+
+        Used by FolderWatcher. Runs synchronously and parses files in-process
+        (a batch of events is small). Deleted paths may be directories: every
+        file indexed below them is considered deleted.
+
+        A changed path carrying the exact stat signature of a deleted file is a
+        rename: the row is moved without reloading the project. Other moves are
+        reconnected by content hash / UUID in upsert_projects_bulk.
+        """
+        stats = {'new': [], 'changed': [], 'removed': [], 'restored': [], 'moved': [],
+                 'unchanged': 0, 'errors': 0}
+
+        # Files that really disappeared (an atomic save deletes then recreates the path)
+        deleted_paths = [p for p in deleted_paths if not os.path.exists(p)]
+        gone = self.database.get_file_signatures(
+            filepaths=[p for p in deleted_paths if p.lower().endswith('.mwq')])
+        for path in deleted_paths:
+            if not path.lower().endswith('.mwq'):
+                gone.update(self.database.get_file_signatures(root_path=path))
+
+        present = {}
+        for path in changed_paths:
+            if not path.lower().endswith('.mwq'):
+                continue
+            try:
+                present[path] = self.file_signature(os.stat(path))
+            except OSError:
+                # Already gone again: the matching delete event is in the batch
+                continue
+        known = self.database.get_file_signatures(filepaths=list(present))
+
+        # Inode 0 means the filesystem has no stable file ids (some network shares)
+        by_signature = {tuple(sig[:3]): p for p, sig in gone.items() if sig[2]}
+        moves = []
+        to_parse = []
+        touched = {}
+        for path, signature in present.items():
+            previous = known.get(path)
+            if same_signature(previous, signature) or self._same_content(path, previous, signature, touched):
+                if previous[3]:
+                    stats['restored'].append(path)
+                else:
+                    stats['unchanged'] += 1
+            elif previous is None and signature in by_signature:
+                old_path = by_signature.pop(signature)
+                gone.pop(old_path)
+                moves.append((old_path, path))
+            else:
+                to_parse.append(path)
+
+        self.database.update_file_signatures(touched)
+        self.database.move_filepaths(moves)
+        stats['moved'].extend(moves)
+        stats['removed'] = [p for p, sig in gone.items() if not sig[3]]
+        self.database.set_missing_status(stats['removed'], True)
+        self.database.set_missing_status(stats['restored'], False)
+
+        rows = []
+        for path in to_parse:
+            try:
+                project, content_hash = PersistenceService.get_project_metadata(path)
+                rows.append(build_project_data(project, path, content_hash, present[path]))
+            except Exception as e:
+                print(f"Error indexing {path}: {e}")
+                stats['errors'] += 1
+
+        written = self.database.upsert_projects_bulk(rows)
+        reconnected = {new_path for _, new_path in written['reconnected']}
+        reconnected_from = {old_path for old_path, _ in written['reconnected']}
+        stats['moved'].extend(written['reconnected'])
+        stats['removed'] = [p for p in stats['removed'] if p not in reconnected_from]
+        for row in rows:
+            path = row['filepath']
+            if path in known:
+                stats['changed'].append(path)
+            elif path not in reconnected:
+                stats['new'].append(path)
+        return stats
 
     def stop(self):
         """Stop current indexing process."""
         self._stop_event.set()
+        if self._migration_job:
+            self._migration_job.stop()
 
     def reconcile(self, progress_callback: Callable[[str], None] = None) -> Dict:
         """Check all indexed files and update their status.
@@ -97,84 +400,290 @@ class Indexer:
         - Returns stats dict
 
         This does NOT scan for new files, only checks existing DB entries.
+        Paths are checked in parallel (see ReconcileEngine); stop() interrupts it.
         """
-        stats = self.database.reconcile_files()
+        self._stop_event.clear()
+
+        def report(checked, total):
+            if progress_callback:
+                progress_callback(f"Reconciling: {checked}/{total} files checked...")
+
+        stats = ReconcileEngine(self.database).reconcile(progress_callback=report, stop_event=self._stop_event)
         if progress_callback:
             progress_callback(f"Reconciled: {stats['checked']} checked, "
                             f"{stats['missing']} missing, {stats['found']} found")
         return stats
 
-    def _index_worker(self, root_path: str, progress_callback, completion_callback,
-                     migrate_to_zip: bool = False):
-        count = 0
-        error_count = 0
+    def _index_worker(self, root_path: Union[str, List], progress_callback, completion_callback,
+                     migrate_to_zip: bool = False, full_rescan: bool = False):
+        """Index a folder, or a list of quote roots (see index_roots), as a pipeline.
+
+        - one thread per root walks its tree and compares stat signatures (producers)
+        - new and changed files are parsed by a process pool (CPU-bound: zip
+          inflation and JSON parsing would otherwise be serialized behind the GIL)
+        - a single writer thread applies the results to SQLite in batches
+
+        A root that cannot be reached (NAS offline, share not mounted) is skipped:
+        its files are not flagged as missing.
+        """
+        roots = self._normalize_roots(root_path)
         migrated_count = 0
-        reconnected_count = 0
+        stats = {'new': [], 'changed': [], 'removed': [], 'restored': [], 'unchanged': 0, 'roots': {}}
+        counters = {'written': 0, 'errors': 0, 'reconnected': 0}
+        # Set by the writer thread when it fails: the run stops and reports it
+        failure = {}
+
+        results = queue.Queue()
+        in_flight = threading.BoundedSemaphore(self.max_workers * MAX_IN_FLIGHT_PER_WORKER)
+        parsing = {'pool': None, 'lock': threading.Lock()}
+        writer = None
+
+        def submit(filepath, signature):
+            # Backpressure: never more than max_in_flight files between the
+            # scanners and the writer
+            while not in_flight.acquire(timeout=0.2):
+                if self._stop_event.is_set() or failure:
+                    return
+            if failure:
+                in_flight.release()
+                return
+            with parsing['lock']:
+                if parsing['pool'] is None:
+                    parsing['pool'] = ProcessPoolExecutor(max_workers=self.max_workers)
+                future = parsing['pool'].submit(extract_project_data, filepath, signature)
+            future.add_done_callback(results.put)
 
         try:
-            print(f"Starting indexer on: {root_path}")
+            print(f"Starting indexer on: {', '.join(root['path'] for root in roots)}")
+
+            # Convert legacy JSON files up front with the dedicated (parallel,
+            # journaled) migration job rather than one by one in this thread;
+            # a batch interrupted on a root (crash, stop) is resumed
+            if migrate_to_zip:
+                self._migration_job = LegacyMigrationJob(self.database, max_workers=self.max_workers)
+                for root in roots:
+                    migration_stats = self._migration_job.run_or_resume(root['path'],
+                                                                        progress_callback=progress_callback)
+                    migrated_count += migration_stats["converted"]
+                self._migration_job = None
 
-            # First, mark all known files as potentially missing
-            # They will be unmarked as we find them
-            self.database.mark_missing_files()
+            known_by_root = {root['path']: self.database.get_file_signatures(root['path']) for root in roots}
+            known = {}
+            for signatures in known_by_root.values():
+                known.update(signatures)
+            # A new file carrying the hash of an indexed file may be that file moved
+            # (within a root or across roots): it is written once the removed files
+            # are flagged, so upsert_project reconnects it to its previous row
+            # instead of creating a duplicate
+            known_hashes = {sig[4] for sig in known.values() if sig[4]}
 
-            for root, dirs, files in os.walk(root_path):
-                if self._stop_event.is_set():
-                    print("Indexing stopped by user.")
-                    break
+            writer = threading.Thread(
+                target=self._writer_loop,
+                args=(results, in_flight, known, known_hashes, stats, counters, progress_callback, failure)
+            )
+            writer.daemon = True
+            writer.start()
+
+            if len(roots) == 1:
+                scanned = [self._scan_root(roots[0], known, full_rescan, submit)]
+            else:
+                with ThreadPoolExecutor(len(roots), thread_name_prefix="index-root") as producers:
+                    scanned = list(producers.map(
+                        lambda root: self._scan_root(root, known, full_rescan, submit), roots))
 
-                for file in files:
-                    if self._stop_event.is_set():
-                        break
-
-                    if file.endswith('.mwq'):
-                        filepath = os.path.join(root, file)
-                        try:
-                            if progress_callback:
-                                progress_callback(f"Indexing {file}...")
-
-                            # Optionally migrate legacy files
-                            if migrate_to_zip:
-                                if PersistenceService.migrate_to_zip(filepath):
-                                    migrated_count += 1
-                                    print(f"Migrated to ZIP format: {file}")
-
-                            # Load project and compute hash
-                            project, content_hash = PersistenceService.get_project_metadata(filepath)
-
-                            # Check if this might be a reconnection
-                            existing = self.database.find_by_hash(content_hash)
-                            if existing and existing.get('is_missing') and existing['filepath'] != filepath:
-                                reconnected_count += 1
-                                print(f"Reconnecting: {existing['filepath']} -> {filepath}")
-
-                            # Prepare data for DB
-                            project_data = self._build_project_data(project, filepath, content_hash)
-                            self.database.upsert_project(project_data)
-                            count += 1
-                        except Exception as e:
-                            print(f"Error indexing {filepath}: {e}")
-                            error_count += 1
+            touched, on_disk = {}, {}
+            for root, outcome in zip(roots, scanned):
+                on_disk[root['path']] = outcome.pop('on_disk')
+                touched.update(outcome.pop('touched'))
+                stats['restored'].extend(outcome.pop('restored'))
+                stats['unchanged'] += outcome['unchanged']
+                stats['roots'][root['path']] = outcome
+            self.database.update_file_signatures(touched)
+
+            if self._stop_event.is_set():
+                print("Indexing stopped by user.")
+            elif not failure:
+                # After a writer failure the index is incomplete: nothing is flagged missing
+                for root, outcome in zip(roots, scanned):
+                    if outcome['reachable']:
+                        stats['removed'].extend(p for p, sig in known_by_root[root['path']].items()
+                                                if p not in on_disk[root['path']] and not sig[3])
+                results.put(_MARK_MISSING)
+
+            with parsing['lock']:
+                pool, parsing['pool'] = parsing['pool'], None
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=self._stop_event.is_set())
 
         except Exception as e:
             print(f"Indexer critical error: {e}")
         finally:
+            if parsing['pool'] is not None:
+                parsing['pool'].shutdown(wait=True, cancel_futures=True)
+            if writer is not None:
+                results.put(_END)
+                writer.join()
+            if 'error' in failure:
+                stats['error'] = str(failure['error'])
+
             self.is_indexing = False
-            summary = (f"Indexing finished. Processed {count} files, "
-                      f"{error_count} errors, {migrated_count} migrated, "
-                      f"{reconnected_count} reconnected.")
+            self.last_run_stats = stats
+            count = stats['unchanged'] + len(stats['restored']) + counters['written']
+            summary = (f"Indexing finished. {len(stats['new'])} new, {len(stats['changed'])} changed, "
+                      f"{len(stats['removed'])} removed, {stats['unchanged']} unchanged, "
+                      f"{counters['errors']} errors, {migrated_count} migrated, "
+                      f"{counters['reconnected']} reconnected.")
+            if 'error' in stats:
+                summary = f"Indexing failed: {stats['error']}. " + summary
             print(summary)
             if progress_callback:
                 progress_callback(summary)
             if completion_callback:
                 completion_callback(count)
 
+    def _scan_root(self, root: Dict, known: Dict, full_rescan: bool, submit) -> Dict:
+        """Walk one quote root, submitting new and changed files for parsing.
+
+        Returns the files found on disk and the per-root counts: 'reachable',
+        'files', 'unchanged', 'restored', 'touched', 'dirs', 'reused'.
+        """
+        outcome = {'reachable': os.path.isdir(root['path']), 'on_disk': set(), 'files': 0,
+                   'unchanged': 0, 'restored': [], 'touched': {}, 'dirs': 0, 'reused': 0}
+        if not outcome['reachable']:
+            print(f"Quote root unreachable, skipped: {root['path']}")
+            return outcome
+
+        scanner = DirectoryScanner(self.database, io_workers=root['io_workers'])
+        for entry in scanner.scan(root['path'], full=full_rescan, stop_event=self._stop_event):
+            filepath = entry.path
+            signature = (entry.size, entry.mtime_ns, entry.inode)
+            outcome['on_disk'].add(filepath)
+
+            previous = known.get(filepath)
+            if same_signature(previous, signature) or self._same_content(filepath, previous, signature,
+                                                                         outcome['touched']):
+                if previous[3]:
+                    outcome['restored'].append(filepath)
+                else:
+                    outcome['unchanged'] += 1
+                continue
+            submit(filepath, signature)
+
+        outcome['files'] = len(outcome['on_disk'])
+        outcome['dirs'] = scanner.stats.get('dirs', 0)
+        outcome['reused'] = scanner.stats.get('reused', 0)
+        print(f"Scanned {outcome['dirs']} folders in {root['path']} "
+              f"({outcome['reused']} unchanged, not listed again).")
+        return outcome
+
+    def _writer_loop(self, results: queue.Queue, in_flight: threading.BoundedSemaphore,
+                     known: Dict, known_hashes: set, stats: Dict, counters: Dict,
+                     progress_callback, failure: Dict):
+        """Single SQLite writer of the indexing pipeline.
+
+        An error it cannot recover from (database locked or full...) is stored
+        in failure['error']: the producers stop submitting, and the writer keeps
+        releasing the slot of every parsed file until the end of the run, so
+        that no producer waits forever on in_flight.
+        """
+        try:
+            self._write_pipeline(results, in_flight, known, known_hashes, stats, counters, progress_callback)
+        except Exception as e:
+            print(f"Index writer failed: {e}")
+            failure['error'] = e
+            while True:
+                item = results.get()
+                if item is _END:
+                    return
+                if item is not _MARK_MISSING:
+                    in_flight.release()
+
+    def _write_pipeline(self, results: queue.Queue, in_flight: threading.BoundedSemaphore,
+                        known: Dict, known_hashes: set, stats: Dict, counters: Dict,
+                        progress_callback):
+        deferred = []
+        missing_flagged = False
+        done = 0
+
+        while True:
+            item = results.get()
+            batch = [item]
+            # Drain what is already available to write it in one go
+            while len(batch) < WRITE_BATCH_SIZE:
+                try:
+                    batch.append(results.get_nowait())
+                except queue.Empty:
+                    break
+
+            to_write = []
+            finished = False
+            for item in batch:
+                if item is _END:
+                    finished = True
+                    continue
+                if item is _MARK_MISSING:
+                    self.database.set_missing_status(stats['removed'], True)
+                    self.database.set_missing_status(stats['restored'], False)
+                    missing_flagged = True
+                    to_write.extend(deferred)
+                    deferred = []
+                    continue
+
+                in_flight.release()
+                if item.cancelled():
+                    continue
+                try:
+                    result = item.result()
+                except Exception as e:
+                    result = {'filepath': None, 'project_data': None, 'error': str(e)}
+                done += 1
+
+                if result['error']:
+                    print(f"Error indexing {result['filepath']}: {result['error']}")
+                    counters['errors'] += 1
+                elif (not missing_flagged and result['filepath'] not in known
+                      and result['project_data']['content_hash'] in known_hashes):
+                    deferred.append(result)
+                else:
+                    to_write.append(result)
+
+            self._write_results(to_write, known, stats, counters)
+            if progress_callback and to_write:
+                progress_callback(f"Indexing {os.path.basename(to_write[-1]['filepath'])} ({done} parsed)...")
+            if finished:
+                # Stopped before the walk completed: nothing was flagged as missing,
+                # deferred files are written as plain new entries
+                self._write_results(deferred, known, stats, counters)
+                return
+
+    def _write_results(self, results, known: Dict, stats: Dict, counters: Dict):
+        if not results:
+            return
+        try:
+            written = self.database.upsert_projects_bulk([r['project_data'] for r in results])
+        except sqlite3.Error:
+            # Database unusable (locked, disk full...): _writer_loop stops the run
+            raise
+        except Exception as e:
+            print(f"Error writing index batch: {e}")
+            counters['errors'] += len(results)
+            return
+
+        for old_path, new_path in written['reconnected']:
+            print(f"Reconnecting: {old_path} -> {new_path}")
+        counters['reconnected'] += len(written['reconnected'])
+        counters['written'] += written['written']
+        for result in results:
+            stats['changed' if result['filepath'] in known else 'new'].append(result['filepath'])
+
     def migrate_all_to_zip(self, root_path: str,
                           progress_callback: Callable[[str], None] = None,
                           completion_callback: Callable[[int], None] = None):
-        """Migrate all legacy JSON .mwq files to ZIP format.
+        """Migrate all legacy JSON .mwq files to ZIP format, then index them.
 
-        This is a convenience method that calls index_directory with migrate_to_zip=True.
+        This is a convenience method that calls index_directory with migrate_to_zip=True;
+        the conversion itself is done by LegacyMigrationJob (parallel, journaled,
+        reversible with LegacyMigrationJob.rollback).
         """
         self.index_directory(root_path, progress_callback, completion_callback,
                             migrate_to_zip=True)
@@ -0,0 +1,259 @@
+# infrastructure/legacy_migration_job.py
+"""
+Bulk migration of legacy JSON .mwq files (v1.0) to the ZIP format.
+
+- Conversions run in a process pool: JSON parsing and deflate are CPU-bound and
+  would otherwise be serialized behind the GIL of the indexing thread.
+- Each converted file is written atomically (see PersistenceService.save_project)
+  and the original is kept as a backup next to it, so a batch can be rolled back.
+  The fingerprint of the converted file is journaled: a rollback leaves alone
+  (and reports) the files saved or removed since the migration.
+- Every outcome is journaled in SQLite (migration_journal); an interrupted batch
+  resumes where it stopped instead of starting over (run_or_resume).
+- Once the user has checked a batch, purge_backups deletes its backups.
+"""
+
+import datetime
+import os
+import shutil
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, List, Optional
+
+from infrastructure.persistence import PersistenceService
+from infrastructure.directory_scanner import DirectoryScanner
+
+BACKUP_SUFFIX = ".v1bak"
+MAX_IN_FLIGHT_PER_WORKER = 4
+
+
+def _same_path(a: str, b: str) -> bool:
+    return os.path.normcase(os.path.abspath(a)) == os.path.normcase(os.path.abspath(b))
+
+
+def convert_legacy_file(filepath: str, backup_path: str) -> Dict:
+    """Convert one legacy file. Runs in a worker process.
+
+    Returns a result dict (never raises) so the coordinator can journal it.
+    """
+    started = time.perf_counter()
+    result = {"filepath": filepath, "backup_path": None, "status": "skipped", "error": None}
+    try:
+        if PersistenceService.is_zip_format(filepath):
+            return result
+        project = PersistenceService._load_project_legacy(filepath)
+        shutil.copy2(filepath, backup_path)
+        try:
+            PersistenceService.save_project(project, filepath)
+        except Exception:
+            # The original is untouched (atomic save): drop the useless backup
+            os.remove(backup_path)
+            raise
+        result["status"] = "done"
+        result["backup_path"] = backup_path
+        result["fingerprint"] = PersistenceService.read_fingerprint(filepath)
+    except Exception as e:
+        result["status"] = "failed"
+        result["error"] = str(e)
+    finally:
+        result["duration_ms"] = int((time.perf_counter() - started) * 1000)
+    return result
+
+
+class LegacyMigrationJob:
+    """Parallel, resumable and reversible legacy JSON -> ZIP migration."""
+
+    def __init__(self, db, max_workers: int = None):
+        self.db = db
+        self.max_workers = max_workers or max(1, min(8, os.cpu_count() or 1))
+        self._stop_event = threading.Event()
+        self.db.init_migration_journal_table()
+
+    @staticmethod
+    def new_batch_id() -> str:
+        return datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+
+    @staticmethod
+    def backup_path_for(filepath: str) -> str:
+        return filepath + BACKUP_SUFFIX
+
+    def find_candidates(self, root_path: str) -> List[str]:
+        """List every .mwq file under root_path (format is checked by the workers)."""
+        return DirectoryScanner(self.db).list_files(root_path)
+
+    def stop(self):
+        """Request a clean stop; in-flight conversions finish and are journaled."""
+        self._stop_event.set()
+
+    def run(self, root_path: str, batch_id: str = None,
+            progress_callback: Callable[[str], None] = None) -> Dict:
+        """Migrate all legacy files under root_path.
+
+        Passing the id of an interrupted batch resumes it: files already
+        journaled as converted or skipped are not touched again.
+        """
+        self._stop_event.clear()
+        batch_id = batch_id or self.new_batch_id()
+        self.db.start_migration_batch(batch_id, root_path)
+
+        finished = self.db.get_migration_finished_paths(batch_id)
+        pending = [p for p in self.find_candidates(root_path) if p not in finished]
+
+        stats = {
+            "batch_id": batch_id,
+            "total": len(pending),
+            "resumed_skipped": len(finished),
+            "converted": 0,
+            "skipped": 0,
+            "failed": 0,
+            "errors": [],
+            "elapsed_s": 0.0,
+            "files_per_s": 0.0,
+        }
+        started = time.perf_counter()
+        processed = 0
+
+        if pending:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+                queue = iter(pending)
+                in_flight = set()
+                max_in_flight = self.max_workers * MAX_IN_FLIGHT_PER_WORKER
+                exhausted = False
+                while True:
+                    while not exhausted and not self._stop_event.is_set() and len(in_flight) < max_in_flight:
+                        filepath = next(queue, None)
+                        if filepath is None:
+                            exhausted = True
+                            break
+                        in_flight.add(pool.submit(convert_legacy_file, filepath, self.backup_path_for(filepath)))
+                    if not in_flight:
+                        break
+
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        result = future.result()
+                        self._journal_result(batch_id, result, stats)
+                        processed += 1
+                    if progress_callback:
+                        progress_callback(self._format_progress(processed, len(pending), started))
+
+        stats["elapsed_s"] = round(time.perf_counter() - started, 2)
+        stats["files_per_s"] = round(processed / stats["elapsed_s"], 2) if stats["elapsed_s"] > 0 else 0.0
+
+        interrupted = self._stop_event.is_set() and processed < len(pending)
+        self.db.finish_migration_batch(batch_id, "interrupted" if interrupted else "completed")
+        stats["interrupted"] = interrupted
+
+        if progress_callback:
+            progress_callback(
+                f"Migration ZIP terminée : {stats['converted']} convertis, {stats['skipped']} déjà au format ZIP, "
+                f"{stats['failed']} erreurs ({stats['files_per_s']:.1f} fichiers/s)."
+            )
+        return stats
+
+    def resume(self, batch_id: str, progress_callback: Callable[[str], None] = None) -> Dict:
+        """Resume an interrupted batch on its original root folder."""
+        batch = next((b for b in self.db.get_migration_batches() if b["batch_id"] == batch_id), None)
+        if batch is None:
+            raise ValueError(f"Lot de migration inconnu : {batch_id}")
+        return self.run(batch["root_path"], batch_id=batch_id, progress_callback=progress_callback)
+
+    def find_interrupted_batch(self, root_path: str = None) -> Optional[str]:
+        """Most recent batch that did not complete (crash or user stop), on root_path if given."""
+        for batch in self.db.get_migration_batches():
+            if batch["status"] not in ("running", "interrupted"):
+                continue
+            if root_path is None or _same_path(batch["root_path"], root_path):
+                return batch["batch_id"]
+        return None
+
+    def run_or_resume(self, root_path: str, progress_callback: Callable[[str], None] = None) -> Dict:
+        """Migrate root_path, resuming its interrupted batch if there is one."""
+        return self.run(root_path, batch_id=self.find_interrupted_batch(root_path),
+                        progress_callback=progress_callback)
+
+    def rollback(self, batch_id: str, progress_callback: Callable[[str], None] = None) -> Dict:
+        """Restore the original JSON files of every conversion done by a batch.
+
+        Files whose content changed since the conversion (saved in the ZIP
+        format, or removed) are not overwritten: they are listed in
+        stats["changed"] and keep their backup and their "done" entry.
+        Entries journaled before fingerprints were recorded are restored
+        without this check.
+        """
+        stats = {"restored": 0, "changed": [], "errors": []}
+        entries = self.db.get_migration_entries(batch_id, status="done")
+        for i, entry in enumerate(entries):
+            filepath = entry["filepath"]
+            backup_path = entry["backup_path"]
+            if progress_callback:
+                progress_callback(f"Restauration {i + 1}/{len(entries)} - {os.path.basename(filepath)}")
+            try:
+                if not backup_path or not os.path.exists(backup_path):
+                    raise FileNotFoundError(f"Sauvegarde introuvable : {backup_path}")
+                if not self._is_unchanged(filepath, entry.get("converted_fingerprint")):
+                    stats["changed"].append(filepath)
+                    continue
+                os.replace(backup_path, filepath)
+                self.db.set_migration_entry_status(batch_id, filepath, "rolled_back")
+                stats["restored"] += 1
+            except Exception as e:
+                stats["errors"].append(f"{os.path.basename(filepath)}: {e}")
+        self.db.finish_migration_batch(batch_id, "rolled_back")
+        return stats
+
+    @staticmethod
+    def _is_unchanged(filepath: str, converted_fingerprint: Optional[str]) -> bool:
+        if not converted_fingerprint:
+            return True
+        try:
+            return PersistenceService.file_fingerprint(filepath) == converted_fingerprint
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            return False
+
+    def purge_backups(self, batch_id: str) -> int:
+        """Delete the backups of a validated batch. Returns the number removed.
+
+        The batch is flagged "purged": it can no longer be rolled back.
+        """
+        removed = 0
+        for entry in self.db.get_migration_entries(batch_id, status="done"):
+            backup_path = entry["backup_path"]
+            if backup_path and os.path.exists(backup_path):
+                try:
+                    os.remove(backup_path)
+                    removed += 1
+                except OSError as e:
+                    print(f"Could not remove backup {backup_path}: {e}")
+        self.db.finish_migration_batch(batch_id, "purged")
+        return removed
+
+    def _journal_result(self, batch_id: str, result: Dict, stats: Dict):
+        status = result["status"]
+        self.db.record_migration_entry(
+            batch_id,
+            result["filepath"],
+            status,
+            backup_path=result.get("backup_path"),
+            error=result.get("error"),
+            duration_ms=result.get("duration_ms"),
+            converted_fingerprint=result.get("fingerprint"),
+        )
+        if status == "done":
+            stats["converted"] += 1
+        elif status == "skipped":
+            stats["skipped"] += 1
+        else:
+            stats["failed"] += 1
+            stats["errors"].append(f"{os.path.basename(result['filepath'])}: {result.get('error')}")
+
+    @staticmethod
+    def _format_progress(processed: int, total: int, started: float) -> str:
+        elapsed = time.perf_counter() - started
+        rate = processed / elapsed if elapsed > 0 else 0.0
+        remaining = total - processed
+        eta_s = int(remaining / rate) if rate > 0 else 0
+        eta = f"{eta_s // 60:02d}:{eta_s % 60:02d}"
+        return f"Migration ZIP {processed}/{total} - {rate:.1f} fichiers/s - reste ~{eta}"
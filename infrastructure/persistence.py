@@ -4,9 +4,11 @@ import zipfile
 import hashlib
 import os
 import base64
+import shutil
+import tempfile
 import dataclasses
 from enum import Enum
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 from domain.project import Project
 from domain.project_version import ProjectVersion
 from domain.operation import Operation
@@ -18,7 +20,18 @@ from domain.serie_data import SerieData, CapexItem, ToolingItem, MachinePost
 # Constants
 PROJECT_JSON_FILENAME = "project.json"
 DOCUMENTS_FOLDER = "documents/"
+# Folder of the global preview image in the archive (a single entry)
+PREVIEW_FOLDER = DOCUMENTS_FOLDER + "previews/"
 MWQ_VERSION = "3.0"  # Versioned project format
+# Content fingerprint stored as the ZIP archive comment (see content_fingerprint)
+FINGERPRINT_PREFIX = b"MWQFP1:"
+# End of central directory record: signature, fixed part size, offset of the comment length
+_EOCD_SIGNATURE = b"PK\x05\x06"
+_EOCD_SIZE = 22
+# Mode of a newly created file (the umask can only be read by setting it)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+_NEW_FILE_MODE = 0o666 & ~_UMASK
 
 
 class EnhancedJSONEncoder(json.JSONEncoder):
@@ -52,9 +65,143 @@ class PersistenceService:
         identity = f"{project.reference}|{project.client}|{project.name}"
         return hashlib.sha256(identity.encode('utf-8')).hexdigest()[:16]
 
+    @staticmethod
+    def content_fingerprint(json_bytes: bytes, entries: List[Tuple[str, int, int]]) -> str:
+        """Fingerprint of an archive: the project.json bytes and the (path, CRC-32, size)
+        of every other entry. Identical content gives the same value wherever it is
+        saved; any change of the project or of an attached document changes it."""
+        digest = hashlib.blake2b(json_bytes, digest_size=8)
+        for path, crc, size in sorted(entries):
+            digest.update(f"\0{path}\0{crc:08x}\0{size}".encode('utf-8'))
+        return digest.hexdigest()
+
+    @staticmethod
+    def read_fingerprint(filepath: str):
+        """Fingerprint written in the archive comment by save_project, None without one.
+
+        Reads only the end of the file (end of central directory record): nothing is
+        inflated, and the central directory itself is not read.
+        """
+        max_tail = _EOCD_SIZE + len(FINGERPRINT_PREFIX) + 64
+        try:
+            with open(filepath, 'rb') as f:
+                f.seek(0, os.SEEK_END)
+                size = f.tell()
+                f.seek(max(0, size - max_tail))
+                tail = f.read()
+        except OSError:
+            return None
+        pos = tail.rfind(_EOCD_SIGNATURE)
+        if pos < 0 or len(tail) - pos < _EOCD_SIZE:
+            return None
+        comment_length = int.from_bytes(tail[pos + 20:pos + 22], 'little')
+        comment = tail[pos + _EOCD_SIZE:pos + _EOCD_SIZE + comment_length]
+        if len(comment) != comment_length or not comment.startswith(FINGERPRINT_PREFIX):
+            return None
+        return comment[len(FINGERPRINT_PREFIX):].decode('ascii', errors='replace')
+
+    @staticmethod
+    def file_fingerprint(filepath: str) -> str:
+        """Content fingerprint of a project file, in any format.
+
+        Archives saved before fingerprints existed are hashed the same way from
+        their entries; legacy JSON files are hashed whole.
+        """
+        fingerprint = PersistenceService.read_fingerprint(filepath)
+        if fingerprint:
+            return fingerprint
+        if PersistenceService.is_zip_format(filepath):
+            with zipfile.ZipFile(filepath, 'r') as zf:
+                return PersistenceService.content_fingerprint(
+                    zf.read(PROJECT_JSON_FILENAME),
+                    [(i.filename, i.CRC, i.file_size) for i in zf.infolist() if i.filename != PROJECT_JSON_FILENAME]
+                )
+        with open(filepath, 'rb') as f:
+            return hashlib.blake2b(f.read(), digest_size=8).hexdigest()
+
     @staticmethod
     def save_project(project: Project, filepath: str):
-        """Save project to ZIP-based .mwq file (v3.0 format)."""
+        """Save project to ZIP-based .mwq file (v3.0 format).
+
+        The archive is written to a temporary file in the target directory and
+        then swapped in with os.replace, so an interrupted save never leaves a
+        truncated .mwq behind.
+        """
+        PersistenceService._replace_atomically(
+            filepath, lambda tmp_path: PersistenceService._write_project_archive(project, tmp_path))
+
+    @staticmethod
+    def _replace_atomically(filepath: str, write):
+        """Call write(tmp_path) on a temporary file next to filepath, then swap it in."""
+        target_dir = os.path.dirname(os.path.abspath(filepath))
+        fd, tmp_path = tempfile.mkstemp(prefix=".mwq-", suffix=".tmp", dir=target_dir)
+        os.close(fd)
+        try:
+            write(tmp_path)
+            # mkstemp creates the file as 0600 and os.replace keeps the mode of tmp_path
+            if os.path.exists(filepath):
+                shutil.copymode(filepath, tmp_path)
+            else:
+                os.chmod(tmp_path, _NEW_FILE_MODE)
+            os.replace(tmp_path, filepath)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    @staticmethod
+    def append_export_entry(filepath: str, entry: dict):
+        """Add an export history entry to a saved project file.
+
+        Incremental save for batch exports: in a ZIP archive only project.json
+        is rewritten (and the XLSX of the entry added); the other entries are
+        copied without building the project model. Legacy JSON files are
+        loaded and saved in full, which converts them.
+        """
+        if not PersistenceService.is_zip_format(filepath):
+            project = PersistenceService.load_project(filepath)
+            project.export_history.append(dict(entry))
+            PersistenceService.save_project(project, filepath)
+            return
+
+        entry = dict(entry)
+        xlsx_b64 = entry.pop('xlsx_data_b64', None)
+        xlsx_path = None
+        if xlsx_b64 and entry.get('xlsx_filename'):
+            xlsx_path = entry.setdefault('_xlsx_path', f"{DOCUMENTS_FOLDER}exports/{entry['xlsx_filename']}")
+
+        def write(tmp_path):
+            with zipfile.ZipFile(filepath, 'r') as zin, zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED) as zout:
+                data = json.loads(zin.read(PROJECT_JSON_FILENAME).decode('utf-8'))
+                data.setdefault('export_history', []).append(entry)
+                json_bytes = json.dumps(data, cls=EnhancedJSONEncoder, indent=2, ensure_ascii=False).encode('utf-8')
+                zout.writestr(PROJECT_JSON_FILENAME, json_bytes)
+                for info in zin.infolist():
+                    if info.filename in (PROJECT_JSON_FILENAME, xlsx_path):
+                        continue
+                    copied = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+                    copied.external_attr = info.external_attr
+                    zout.writestr(copied, zin.read(info), compress_type=info.compress_type)
+                if xlsx_path:
+                    zout.writestr(xlsx_path, base64.b64decode(xlsx_b64))
+                PersistenceService._write_fingerprint(zout, json_bytes)
+
+        PersistenceService._replace_atomically(filepath, write)
+
+    @staticmethod
+    def _write_fingerprint(zf: zipfile.ZipFile, json_bytes: bytes):
+        # CRCs are known once the entries are written; the comment goes in the
+        # end of central directory record, written on close
+        fingerprint = PersistenceService.content_fingerprint(
+            json_bytes,
+            [(i.filename, i.CRC, i.file_size) for i in zf.infolist() if i.filename != PROJECT_JSON_FILENAME]
+        )
+        zf.comment = FINGERPRINT_PREFIX + fingerprint.encode('ascii')
+
+    @staticmethod
+    def _write_project_archive(project: Project, filepath: str):
         with zipfile.ZipFile(filepath, 'w', zipfile.ZIP_DEFLATED) as zf:
             doc_index = {}   # path -> base64 data
             doc_counter = {}  # base_filename -> counter for uniqueness
@@ -77,7 +224,7 @@ class PersistenceService:
             # Global preview image
             project_preview = None
             if getattr(project, 'preview_image', None) and project.preview_image.filename and project.preview_image.data:
-                preview_path = add_document(project.preview_image, "previews/")
+                preview_path = add_document(project.preview_image, PREVIEW_FOLDER[len(DOCUMENTS_FOLDER):])
                 if preview_path:
                     project_preview = {'filename': project.preview_image.filename, '_path': preview_path}
 
@@ -147,7 +294,8 @@ class PersistenceService:
             }
 
             json_content = json.dumps(project_dict, cls=EnhancedJSONEncoder, indent=2, ensure_ascii=False)
-            zf.writestr(PROJECT_JSON_FILENAME, json_content.encode('utf-8'))
+            json_bytes = json_content.encode('utf-8')
+            zf.writestr(PROJECT_JSON_FILENAME, json_bytes)
 
             for doc_path, doc_data in doc_index.items():
                 try:
@@ -156,15 +304,31 @@ class PersistenceService:
                 except Exception as e:
                     print(f"Warning: Could not write document {doc_path}: {e}")
 
+            PersistenceService._write_fingerprint(zf, json_bytes)
+
     @staticmethod
-    def load_project(filepath: str) -> Project:
+    def load_project(filepath: str, load_preview: bool = True) -> Project:
+        """Load a project file (any format).
+
+        load_preview=False leaves the preview image of a ZIP archive unread
+        (filename only); read_preview_image reads its bytes on demand.
+        """
         if PersistenceService.is_zip_format(filepath):
-            return PersistenceService._load_project_zip(filepath)
+            return PersistenceService._load_project_zip(filepath, load_preview)
         else:
             return PersistenceService._load_project_legacy(filepath)
 
     @staticmethod
-    def _load_project_zip(filepath: str) -> Project:
+    def read_preview_image(filepath: str) -> Optional[bytes]:
+        """Bytes of the preview image entry of a ZIP project file, None without one."""
+        with zipfile.ZipFile(filepath, 'r') as zf:
+            for name in zf.namelist():
+                if name.startswith(PREVIEW_FOLDER):
+                    return zf.read(name)
+        return None
+
+    @staticmethod
+    def _load_project_zip(filepath: str, load_preview: bool = True) -> Project:
         with zipfile.ZipFile(filepath, 'r') as zf:
             json_content = zf.read(PROJECT_JSON_FILENAME).decode('utf-8')
             data = json.loads(json_content)
@@ -174,7 +338,7 @@ class PersistenceService:
             preview_ref = data.get('preview_image')
             if preview_ref and preview_ref.get('_path'):
                 preview_path = preview_ref.get('_path')
-                if preview_path in zf.namelist():
+                if load_preview and preview_path in zf.namelist():
                     binary_data = zf.read(preview_path)
                     preview_image = Document(
                         filename=preview_ref.get('filename'),
@@ -564,6 +728,8 @@ class PersistenceService:
 
     @staticmethod
     def get_project_metadata(filepath: str) -> Tuple[Project, str]:
-        project = PersistenceService.load_project(filepath)
-        content_hash = PersistenceService.compute_content_hash(project)
+        """Project and content fingerprint of a file (the index content_hash)."""
+        # The indexer builds the thumbnail from the preview entry itself
+        project = PersistenceService.load_project(filepath, load_preview=False)
+        content_hash = PersistenceService.file_fingerprint(filepath)
         return project, content_hash
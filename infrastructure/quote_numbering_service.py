@@ -11,7 +11,7 @@ Example: OD260202_001-1 (OD prefix, Feb 2 2026, counter 001, sub-version 1)
 """
 
 import datetime
-from typing import Optional, Dict, Tuple
+from typing import Optional, Dict, List, Tuple
 from infrastructure.database import Database
 
 
@@ -37,19 +37,24 @@ class QuoteNumberingService:
             ("OD260202_001", 1) → use as "OD260202_001-1" in export
         """
         today = datetime.date.today()
-        date_str = today.strftime("%y%m%d")
-        
-        # Get current counter for today
-        current = self.db.get_quote_counter(today, prefix)
-        next_counter = current + 1
-        
-        # Update DB with new counter
-        self.db.update_quote_counter(today, prefix, next_counter)
-        
-        # Format quote number
-        quote_number = f"{prefix}{date_str}_{next_counter:03d}"
-        
-        return quote_number, next_counter
+        # Read and incremented in one transaction (safe across threads and workstations)
+        next_counter = self.db.reserve_quote_numbers(today, prefix, 1)
+        return self.format_quote_number(prefix, today, next_counter), next_counter
+
+    def reserve_block(self, count: int, prefix: str = "OD") -> List[str]:
+        """
+        Allocate count consecutive quote numbers for today in one transaction.
+
+        Used by multi-project exports: the numbers of a batch follow each other
+        even when another workstation exports at the same time.
+        """
+        today = datetime.date.today()
+        first = self.db.reserve_quote_numbers(today, prefix, count)
+        return [self.format_quote_number(prefix, today, first + i) for i in range(count)]
+
+    @staticmethod
+    def format_quote_number(prefix: str, date: datetime.date, counter: int) -> str:
+        return f"{prefix}{date.strftime('%y%m%d')}_{counter:03d}"
 
     def get_quote_number_with_subversion(self, prefix: str = "OD", sub_version: int = 1) -> str:
         """
@@ -76,7 +81,7 @@ class QuoteNumberingService:
         return {
             "date": date.isoformat(),
             "total_quotes": len(stats),
-            "by_prefix": {}
+            "by_prefix": {s["prefix"]: s["counter"] for s in stats}
         }
 
     def reset_counter_for_date(self, date: datetime.date, prefix: str = "OD"):
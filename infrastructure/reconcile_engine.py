@@ -0,0 +1,82 @@
+# infrastructure/reconcile_engine.py
+"""
+Existence check of every indexed project file.
+
+- Paths are checked by a bounded thread pool: on an SMB share each check is a
+  network round trip, and os.stat releases the GIL, so the round trips overlap
+  instead of adding up.
+- Status changes are written with one executemany per direction (see
+  Database.set_missing_status) instead of one UPDATE per row.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+RECONCILE_WORKERS = 16
+# Paths checked between two progress reports / stop checks
+CHUNK_SIZE = 500
+
+
+def path_exists(filepath: str) -> Optional[bool]:
+    """True / False, or None when the check itself failed (share unreachable, access denied)."""
+    try:
+        os.stat(filepath)
+        return True
+    except (FileNotFoundError, NotADirectoryError):
+        return False
+    except OSError:
+        return None
+
+
+class ReconcileEngine:
+    """Flag indexed files as missing / found again, checking paths in parallel."""
+
+    def __init__(self, db, max_workers: int = RECONCILE_WORKERS):
+        self.db = db
+        self.max_workers = max(1, max_workers)
+
+    def check_paths(self, filepaths: List[str],
+                    progress_callback: Callable[[int, int], None] = None,
+                    stop_event: Optional[threading.Event] = None) -> Dict[str, Optional[bool]]:
+        """Existence of each path (see path_exists). Stops early (partial result) when stop_event is set.
+
+        progress_callback(checked, total) is called after each chunk of paths.
+        """
+        exists = {}
+        total = len(filepaths)
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="reconcile") as pool:
+            for start in range(0, total, CHUNK_SIZE):
+                if stop_event is not None and stop_event.is_set():
+                    break
+                chunk = filepaths[start:start + CHUNK_SIZE]
+                exists.update(zip(chunk, pool.map(path_exists, chunk)))
+                if progress_callback:
+                    progress_callback(len(exists), total)
+        return exists
+
+    def reconcile(self, progress_callback: Callable[[int, int], None] = None,
+                  stop_event: Optional[threading.Event] = None,
+                  include_missing: bool = True) -> Dict:
+        """Check every indexed file and update its missing flag.
+
+        With include_missing=False, only files currently present are checked
+        (nothing can be found again). Files that could not be checked keep their
+        status. Returns {'checked', 'missing', 'found', 'interrupted'}.
+        """
+        signatures = self.db.get_file_signatures()
+        was_missing = {path: bool(sig[3]) for path, sig in signatures.items()
+                       if include_missing or not sig[3]}
+        exists = self.check_paths(list(was_missing), progress_callback, stop_event)
+
+        newly_missing = [p for p, ok in exists.items() if ok is False and not was_missing[p]]
+        found = [p for p, ok in exists.items() if ok is True and was_missing[p]]
+        self.db.set_missing_status(newly_missing, True)
+        self.db.set_missing_status(found, False)
+        return {
+            'checked': len(exists),
+            'missing': len(newly_missing),
+            'found': len(found),
+            'interrupted': len(exists) < len(was_missing),
+        }
@@ -0,0 +1,118 @@
+# infrastructure/search_results.py
+"""
+Windowed access to search results, for the virtual result list.
+
+The list asks for rows by index while it draws them. Rows are fetched one page
+at a time: as a keyset continuation of the previous page when scrolling down,
+with LIMIT / OFFSET when jumping. Only the most recently used pages are kept.
+
+When a search term finds nothing, the best fuzzy matches of the reference /
+client are shown instead (see Database.fuzzy_search_projects), ranked by
+similarity.
+"""
+
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional
+
+PAGE_SIZE = 200
+MAX_PAGES = 20
+FUZZY_LIMIT = 50
+
+
+class SearchResultPager:
+    """Read-only, index-addressable view of one search (behaves like {index: row})."""
+
+    def __init__(self, db, global_search: str = None, sort_by: str = "last_modified",
+                 sort_order: str = "DESC", include_missing: bool = False,
+                 page_size: int = PAGE_SIZE, max_pages: int = MAX_PAGES, fuzzy_fallback: bool = True,
+                 root_path: str = None):
+        self.db = db
+        self.query = {
+            'global_search': global_search,
+            'sort_by': sort_by,
+            'sort_order': sort_order,
+            'include_missing': include_missing,
+            'root_path': root_path,
+        }
+        self.page_size = page_size
+        self.max_pages = max(1, max_pages)
+        self.total = db.count_projects(global_search=global_search, include_missing=include_missing,
+                                       root_path=root_path)
+        self._pages = OrderedDict()  # page number -> rows, least recently used first
+        self._page_ends = {}         # page number -> keyset position of its last row
+
+        # Fuzzy matches replacing an empty result (few rows, held whole)
+        self.fuzzy_rows = None
+        if self.total == 0 and fuzzy_fallback and global_search and global_search.strip():
+            rows = db.fuzzy_search_projects(global_search, limit=FUZZY_LIMIT, include_missing=include_missing,
+                                            root_path=root_path)
+            if rows:
+                self.fuzzy_rows = rows
+                self.total = len(rows)
+
+    @property
+    def is_fuzzy(self) -> bool:
+        return self.fuzzy_rows is not None
+
+    def __len__(self) -> int:
+        return self.total
+
+    def __contains__(self, index) -> bool:
+        return isinstance(index, int) and 0 <= index < self.total
+
+    def __getitem__(self, index: int) -> Dict:
+        if index not in self:
+            raise KeyError(index)
+        page, offset = divmod(index, self.page_size)
+        rows = self._page(page)
+        if offset >= len(rows):
+            # The index shrank since the count (rows deleted meanwhile)
+            raise KeyError(index)
+        return rows[offset]
+
+    def get(self, index: int, default=None) -> Optional[Dict]:
+        try:
+            return self[index]
+        except KeyError:
+            return default
+
+    def rows(self, limit: int = None) -> Iterator[Dict]:
+        """Rows in order, page by page (all of them without limit)."""
+        end = self.total if limit is None else min(limit, self.total)
+        for index in range(end):
+            row = self.get(index)
+            if row is None:
+                return
+            yield row
+
+    def index_of(self, filepath: str) -> Optional[int]:
+        """Position of a file in the results; loaded pages are searched first."""
+        for page, rows in list(self._pages.items()):
+            for offset, row in enumerate(rows):
+                if row.get('filepath') == filepath:
+                    return page * self.page_size + offset
+        for index, row in enumerate(self.rows()):
+            if row.get('filepath') == filepath:
+                return index
+        return None
+
+    def _page(self, page: int) -> List[Dict]:
+        if self.fuzzy_rows is not None:
+            return self.fuzzy_rows[page * self.page_size:(page + 1) * self.page_size]
+        rows = self._pages.get(page)
+        if rows is not None:
+            self._pages.move_to_end(page)
+            return rows
+
+        after = self._page_ends.get(page - 1) if page > 0 else None
+        if after is not None:
+            rows = self.db.search_projects(limit=self.page_size, after=after, **self.query)
+        else:
+            rows = self.db.search_projects(limit=self.page_size, offset=page * self.page_size, **self.query)
+
+        self._pages[page] = rows
+        if rows:
+            self._page_ends[page] = self.db.search_key(rows[-1], self.query['sort_by'])
+        while len(self._pages) > self.max_pages:
+            self._pages.popitem(last=False)
+        return rows
@@ -0,0 +1,194 @@
+# infrastructure/streaming_stats.py
+"""
+One-pass statistics of values that are never all kept in memory.
+
+Both accumulators take values one by one and merge with another accumulator
+of the same kind, so partial results built in worker processes (or for a
+subset of projects) combine into the total without going back to the values:
+
+* RunningStats: count, mean, variance, min and max (Welford's update, Chan's
+  merge). Exact, constant size.
+* QuantileSketch: quantiles (median...) as a merging t-digest. Values are
+  kept as they are up to a buffer of 5 x compression, so the quantiles of
+  small samples are exact and equal to statistics.median / quantiles; beyond,
+  neighbouring values are folded into weighted centroids, finer at the tails,
+  and the size stays bounded by the compression.
+"""
+
+import math
+
+DEFAULT_COMPRESSION = 100
+
+
+class RunningStats:
+    """Count, mean, variance, min and max, updated value by value."""
+
+    __slots__ = ("count", "mean", "_m2", "min", "max")
+
+    def __init__(self, values=()):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = None
+        self.max = None
+        self.update(values)
+
+    def add(self, value: float):
+        value = float(value)
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def update(self, values):
+        for value in values:
+            self.add(value)
+        return self
+
+    def merge(self, other: "RunningStats") -> "RunningStats":
+        """Add the values summarized by other, as if they had been added here."""
+        if not other.count:
+            return self
+        if not self.count:
+            self.count, self.mean, self._m2 = other.count, other.mean, other._m2
+            self.min, self.max = other.min, other.max
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self._m2 += other._m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self) -> float:
+        """Sample variance (statistics.variance); 0.0 below two values."""
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def pvariance(self) -> float:
+        """Population variance (statistics.pvariance); 0.0 without values."""
+        return self._m2 / self.count if self.count else 0.0
+
+    @property
+    def stdev(self) -> float:
+        return math.sqrt(self.variance)
+
+    def __repr__(self):
+        return f"RunningStats(count={self.count}, mean={self.mean:.6g}, stdev={self.stdev:.6g})"
+
+
+class QuantileSketch:
+    """Quantiles of a stream as a merging t-digest (exact on small samples)."""
+
+    __slots__ = ("compression", "count", "min", "max", "_centroids", "_buffer", "_buffer_limit")
+
+    def __init__(self, values=(), compression: int = DEFAULT_COMPRESSION):
+        self.compression = max(10, int(compression))
+        self.count = 0
+        self.min = None
+        self.max = None
+        # Sorted (mean, weight) once values have been folded; None while exact
+        self._centroids = None
+        self._buffer = []
+        self._buffer_limit = 5 * self.compression
+        self.update(values)
+
+    def add(self, value: float, weight: float = 1):
+        value = float(value)
+        self.count += weight
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        self._buffer.append((value, weight))
+        if len(self._buffer) > self._buffer_limit:
+            self._compress()
+
+    def update(self, values):
+        for value in values:
+            self.add(value)
+        return self
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        """Add the values summarized by other, as if they had been added here."""
+        if not other.count:
+            return self
+        points = list(other._buffer)
+        if other._centroids is not None:
+            points.extend(other._centroids)
+        min_value, max_value = self.min, self.max
+        for value, weight in points:
+            self.add(value, weight)
+        # Centroid means lie inside the other sketch's range: keep its true extremes
+        self.min = other.min if min_value is None else min(min_value, other.min)
+        self.max = other.max if max_value is None else max(max_value, other.max)
+        return self
+
+    def _compress(self):
+        points = sorted(self._buffer + (self._centroids or []))
+        self._buffer = []
+        total = sum(weight for _, weight in points)
+        merged = []
+        done = 0.0
+        k_limit = self._k(0.0) + 1.0
+        for mean, weight in points:
+            if merged and self._k((done + weight) / total) <= k_limit:
+                last = merged[-1]
+                last[1] += weight
+                last[0] += (mean - last[0]) * weight / last[1]
+            else:
+                if merged:
+                    k_limit = self._k(done / total) + 1.0
+                merged.append([mean, weight])
+            done += weight
+        self._centroids = [(mean, weight) for mean, weight in merged]
+
+    def _k(self, q: float) -> float:
+        # Scale function k1: centroids hold fewer values near the tails
+        return self.compression / (2 * math.pi) * math.asin(2 * min(1.0, max(0.0, q)) - 1)
+
+    def quantile(self, q: float) -> float:
+        """Value below which a share q (0..1) of the values lies; 0.0 without values.
+
+        Each point stands at the middle of its cumulated weight and the quantile
+        is interpolated between the two points around q * count, so on exact
+        samples quantile(0.5) is statistics.median.
+        """
+        if not self.count:
+            return 0.0
+        if self._centroids is None:
+            points = sorted(self._buffer)
+        else:
+            if self._buffer:
+                self._compress()
+            points = self._centroids
+        target = min(1.0, max(0.0, q)) * self.count
+        previous_mean, previous_center = self.min, 0.0
+        done = 0.0
+        for mean, weight in points:
+            center = done + weight / 2
+            if target <= center:
+                if center == previous_center:
+                    return mean
+                ratio = (target - previous_center) / (center - previous_center)
+                return previous_mean + (mean - previous_mean) * ratio
+            previous_mean, previous_center = mean, center
+            done += weight
+        if done == previous_center:
+            return self.max
+        ratio = (target - previous_center) / (done - previous_center)
+        return previous_mean + (self.max - previous_mean) * ratio
+
+    @property
+    def median(self) -> float:
+        return self.quantile(0.5)
+
+    def __repr__(self):
+        return f"QuantileSketch(count={self.count}, median={self.median:.6g})"
@@ -1,11 +1,12 @@
 from __future__ import annotations
 
 import json
-import statistics
+from collections import Counter
 from datetime import datetime
 
 import domain.cost as domain_cost
 from domain.operation import Operation
+from infrastructure.streaming_stats import QuantileSketch
 
 
 class TemplateManager:
@@ -16,7 +17,6 @@ class TemplateManager:
 
     def list_templates(self, typology: str | None = None):
         with self.db.get_connection() as conn:
-            conn.row_factory = None
             cur = conn.cursor()
             if typology:
                 cur.execute(
@@ -174,33 +174,40 @@ class TemplateManager:
                 created += 1
         return created
 
-    def _build_median_template_payload(self, typology: str, operations: list[dict]) -> dict:
-        # flatten costs by cost_type then summarize medians
+    def _build_median_template_payload(self, typology: str, operations) -> dict:
+        # summarize medians by cost_type in one pass (sketches, no list of every cost)
         grouped = {}
         for op in operations:
             for c in op.get("costs", []):
-                ctype = c.get("cost_type")
-                grouped.setdefault(ctype, []).append(c)
+                sketches = grouped.get(c.get("cost_type"))
+                if sketches is None:
+                    sketches = grouped[c.get("cost_type")] = (
+                        QuantileSketch(), QuantileSketch(), QuantileSketch(), QuantileSketch(), Counter()
+                    )
+                fixed_times, piece_times, hourly_rates, margins, units = sketches
+                internal = c.get("internal_operation", {})
+                fixed_times.add(float(internal.get("fixed_time_h", 0.0) or 0.0))
+                piece_times.add(float(internal.get("per_piece_time_h", 0.0) or 0.0))
+                hourly_rates.add(float(internal.get("hourly_rate", 0.0) or 0.0))
+                margins.add(float(c.get("margin_rate", 0.0) or 0.0))
+                unit = c.get("pricing", {}).get("unit")
+                if unit:
+                    units[unit] += 1
 
         costs = []
-        for ctype, items in grouped.items():
-            fixed_times = [float(x.get("internal_operation", {}).get("fixed_time_h", 0.0) or 0.0) for x in items]
-            piece_times = [float(x.get("internal_operation", {}).get("per_piece_time_h", 0.0) or 0.0) for x in items]
-            hourly_rates = [float(x.get("internal_operation", {}).get("hourly_rate", 0.0) or 0.0) for x in items]
-            margins = [float(x.get("margin_rate", 0.0) or 0.0) for x in items]
-            units = [x.get("pricing", {}).get("unit") for x in items if x.get("pricing", {}).get("unit")]
-
+        for ctype, (fixed_times, piece_times, hourly_rates, margins, units) in grouped.items():
             costs.append({
                 "name": f"{ctype} - standard",
                 "cost_type": ctype,
                 "pricing_type": "Par unité",
                 "fixed_price": 0.0,
                 "unit_price": 0.0,
-                "unit": statistics.mode(units) if units else "pièce",
-                "fixed_time": statistics.median(fixed_times) if fixed_times else 0.0,
-                "per_piece_time": statistics.median(piece_times) if piece_times else 0.0,
-                "hourly_rate": statistics.median(hourly_rates) if hourly_rates else 0.0,
-                "margin_rate": statistics.median(margins) if margins else 0.0,
+                # most_common keeps the first unit seen among ties, like statistics.mode
+                "unit": units.most_common(1)[0][0] if units else "pièce",
+                "fixed_time": fixed_times.median,
+                "per_piece_time": piece_times.median,
+                "hourly_rate": hourly_rates.median,
+                "margin_rate": margins.median,
                 "quantity_per_piece": 1.0,
                 "quantity_per_piece_is_inverse": False,
                 "comment": "",
@@ -0,0 +1,67 @@
+# infrastructure/thumbnails.py
+"""
+Preview thumbnails stored in the index.
+
+The preview image of a project is downscaled once, when the file is indexed,
+to the size of the preview area of the search details panel, and stored as a
+small PNG (see Database.get_thumbnail). Selecting a project then shows its
+preview without loading the file or decoding the full-size image.
+
+The indexer workers read the image straight from its entry of the archive
+(PersistenceService.read_preview_image): the project itself is loaded without
+its preview.
+"""
+
+import base64
+import io
+from typing import Optional
+
+from infrastructure.persistence import PersistenceService
+
+# Size of the preview area (ProjectDetailsPanel.PREVIEW_WIDTH / PREVIEW_HEIGHT)
+THUMBNAIL_WIDTH = 320
+THUMBNAIL_HEIGHT = 180
+THUMBNAIL_BACKGROUND = (240, 240, 240, 255)
+
+
+def make_thumbnail(image_bytes: bytes, width: int = THUMBNAIL_WIDTH,
+                   height: int = THUMBNAIL_HEIGHT) -> Optional[bytes]:
+    """PNG of the image fitted and centered in a width x height canvas.
+
+    Returns None when the image cannot be decoded or Pillow is not installed.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            image = image.convert("RGBA")
+            resample = Image.Resampling.LANCZOS if hasattr(Image, 'Resampling') else Image.ANTIALIAS
+            image.thumbnail((width, height), resample)
+            canvas = Image.new("RGBA", (width, height), THUMBNAIL_BACKGROUND)
+            canvas.alpha_composite(image, ((width - image.width) // 2, (height - image.height) // 2))
+            stream = io.BytesIO()
+            canvas.convert("RGB").save(stream, format="PNG", optimize=True)
+            return stream.getvalue()
+    except Exception as e:
+        print(f"Could not build thumbnail: {e}")
+        return None
+
+
+def build_thumbnail(filepath: str, project) -> Optional[bytes]:
+    """Thumbnail of the preview image of the project file, None without one.
+
+    ZIP files: read from the preview entry. Legacy JSON files hold the image
+    in the project data.
+    """
+    preview = getattr(project, 'preview_image', None)
+    if preview is None or not preview.filename:
+        return None
+    if PersistenceService.is_zip_format(filepath):
+        image_bytes = PersistenceService.read_preview_image(filepath)
+    else:
+        image_bytes = base64.b64decode(preview.data) if preview.data else None
+    if not image_bytes:
+        return None
+    return make_thumbnail(image_bytes)
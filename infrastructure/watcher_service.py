@@ -0,0 +1,357 @@
+# infrastructure/watcher_service.py
+"""
+Live watcher of the quotes root folder.
+
+Filesystem events are debounced and applied to the index with
+Indexer.apply_file_events, so files added or moved by colleagues show up
+without a full rescan.
+
+- Linux: inotify (through ctypes, no extra dependency).
+- Elsewhere, and on network shares where inotify sees no remote change:
+  polling. Only directories whose mtime changed are listed again (adding,
+  removing or renaming a file updates the mtime of its directory); every
+  FULL_SWEEP_EVERY polls all files are stat'ed to catch in-place edits.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from infrastructure.logging_service import get_module_logger
+
+logger = get_module_logger("FolderWatcher", "folder_watcher.log")
+
+DEBOUNCE_S = 2.0
+POLL_INTERVAL_S = 5.0
+FULL_SWEEP_EVERY = 12
+
+NETWORK_FS_TYPES = {"nfs", "nfs4", "cifs", "smb3", "smbfs", "fuse.sshfs", "9p", "afs"}
+
+# Event kinds produced by the backends
+CHANGED = "changed"
+DELETED = "deleted"
+RESCAN = "rescan"
+
+
+def _is_project_file(name: str) -> bool:
+    return name.lower().endswith(".mwq")
+
+
+def is_network_path(path: str) -> bool:
+    """True if path is on a network share (UNC path or network mount)."""
+    path = os.path.abspath(path)
+    if path.startswith("\\\\"):
+        return True
+    if not sys.platform.startswith("linux"):
+        return False
+    best, fs_type = "", None
+    try:
+        with open("/proc/mounts", encoding="utf-8") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) < 3:
+                    continue
+                mount_point = parts[1].replace("\\040", " ")
+                if (path == mount_point or path.startswith(mount_point.rstrip("/") + "/")) \
+                        and len(mount_point) > len(best):
+                    best, fs_type = mount_point, parts[2]
+    except OSError:
+        return False
+    return fs_type in NETWORK_FS_TYPES
+
+
+class InotifyBackend:
+    """Recursive inotify watch of a directory tree (Linux only)."""
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_MOVE_SELF = 0x00000800
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ONLYDIR = 0x01000000
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+
+    WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+                  | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+    _EVENT_HEADER = struct.Struct("iIII")
+
+    _libc = None
+
+    @classmethod
+    def is_available(cls) -> bool:
+        if not sys.platform.startswith("linux"):
+            return False
+        if cls._libc is None:
+            try:
+                cls._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+                cls._libc.inotify_init1
+            except (OSError, AttributeError):
+                cls._libc = False
+        return bool(cls._libc)
+
+    def __init__(self, root_path: str):
+        if not self.is_available():
+            raise OSError("inotify indisponible")
+        self.root_path = root_path
+        self._fd = self._libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        self._paths = {}  # watch descriptor -> directory
+        self._add_tree(root_path)
+
+    def _add_watch(self, path: str) -> bool:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), self.WATCH_MASK)
+        if wd < 0:
+            # Typically ENOSPC (fs.inotify.max_user_watches) or a directory already gone
+            logger.warning(f"Cannot watch {path} (errno {ctypes.get_errno()})")
+            return False
+        self._paths[wd] = path
+        return True
+
+    def _add_tree(self, root_path: str) -> List[str]:
+        """Watch root_path and its subdirectories; return the project files found."""
+        found = []
+        for root, dirs, files in os.walk(root_path):
+            self._add_watch(root)
+            found.extend(os.path.join(root, f) for f in files if _is_project_file(f))
+        return found
+
+    def read(self, timeout: float) -> List[Tuple[str, str]]:
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        while offset + self._EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = self._EVENT_HEADER.unpack_from(data, offset)
+            offset += self._EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            events.extend(self._translate(wd, mask, name))
+        return events
+
+    def _translate(self, wd: int, mask: int, name: str) -> List[Tuple[str, str]]:
+        if mask & self.IN_Q_OVERFLOW:
+            return [(RESCAN, self.root_path)]
+        if mask & self.IN_IGNORED:
+            self._paths.pop(wd, None)
+            return []
+        directory = self._paths.get(wd)
+        if directory is None or not name:
+            # *_SELF events: handled through the parent directory's event
+            return []
+        path = os.path.join(directory, name)
+
+        if mask & self.IN_ISDIR:
+            if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                # Watch the new subtree; its files may predate the watch
+                return [(CHANGED, p) for p in self._add_tree(path)]
+            if mask & (self.IN_DELETE | self.IN_MOVED_FROM):
+                prefix = os.path.join(path, "")
+                for stale_wd in [w for w, p in self._paths.items() if p == path or p.startswith(prefix)]:
+                    # A moved directory keeps its watch: it is re-registered on IN_MOVED_TO
+                    self._paths.pop(stale_wd)
+                return [(DELETED, path)]
+            return []
+
+        if not _is_project_file(name):
+            return []
+        if mask & (self.IN_CLOSE_WRITE | self.IN_CREATE | self.IN_MOVED_TO):
+            return [(CHANGED, path)]
+        if mask & (self.IN_DELETE | self.IN_MOVED_FROM):
+            return [(DELETED, path)]
+        return []
+
+    def close(self):
+        if self._fd is not None and self._fd >= 0:
+            os.close(self._fd)
+            self._fd = None
+
+
+class PollingBackend:
+    """Portable watcher comparing directory mtimes between polls."""
+
+    def __init__(self, root_path: str, interval_s: float = POLL_INTERVAL_S,
+                 full_sweep_every: int = FULL_SWEEP_EVERY):
+        self.root_path = root_path
+        self.interval_s = interval_s
+        self.full_sweep_every = full_sweep_every
+        self._dir_mtimes = {}  # directory -> mtime_ns
+        self._subdirs = {}     # directory -> [subdirectories]
+        self._files = {}       # directory -> {project file: (size, mtime_ns)}
+        self._polls = 0
+        self._next_poll = time.monotonic() + interval_s
+        self.poll(full=True)   # initial snapshot, events discarded
+
+    def read(self, timeout: float) -> List[Tuple[str, str]]:
+        now = time.monotonic()
+        if now < self._next_poll:
+            time.sleep(min(timeout, self._next_poll - now))
+            return []
+        self._next_poll = time.monotonic() + self.interval_s
+        self._polls += 1
+        return self.poll(full=self._polls % self.full_sweep_every == 0)
+
+    def poll(self, full: bool = False) -> List[Tuple[str, str]]:
+        events = []
+        seen = set()
+        stack = [self.root_path]
+        while stack:
+            directory = stack.pop()
+            seen.add(directory)
+            try:
+                mtime_ns = os.stat(directory).st_mtime_ns
+            except OSError:
+                continue
+            if not full and self._dir_mtimes.get(directory) == mtime_ns:
+                stack.extend(self._subdirs.get(directory, []))
+                continue
+
+            files, subdirs = self._list(directory)
+            previous = self._files.get(directory, {})
+            events.extend((CHANGED, p) for p, sig in files.items() if previous.get(p) != sig)
+            events.extend((DELETED, p) for p in previous if p not in files)
+            self._dir_mtimes[directory] = mtime_ns
+            self._files[directory] = files
+            self._subdirs[directory] = subdirs
+            stack.extend(subdirs)
+
+        for directory in [d for d in self._dir_mtimes if d not in seen]:
+            events.extend((DELETED, p) for p in self._files.pop(directory, {}))
+            self._dir_mtimes.pop(directory, None)
+            self._subdirs.pop(directory, None)
+        return events
+
+    @staticmethod
+    def _list(directory: str) -> Tuple[Dict[str, tuple], List[str]]:
+        files, subdirs = {}, []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        elif _is_project_file(entry.name):
+                            st = entry.stat()
+                            files[entry.path] = (st.st_size, st.st_mtime_ns)
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        return files, subdirs
+
+    def close(self):
+        pass
+
+
+class FolderWatcher:
+    """Feed debounced filesystem events of a folder into the indexer."""
+
+    def __init__(self, indexer, root_path: str,
+                 on_change: Callable[[Dict], None] = None,
+                 debounce_s: float = DEBOUNCE_S,
+                 poll_interval_s: float = POLL_INTERVAL_S,
+                 use_polling: Optional[bool] = None):
+        self.indexer = indexer
+        self.root_path = os.path.abspath(root_path)
+        self.on_change = on_change
+        self.debounce_s = debounce_s
+        self.poll_interval_s = poll_interval_s
+        if use_polling is None:
+            use_polling = not InotifyBackend.is_available() or is_network_path(self.root_path)
+        self.use_polling = use_polling
+        self._backend = None
+        self._pending = {}  # path -> last event kind
+        self._last_event = 0.0
+        self._stop_event = threading.Event()
+        self._ready = threading.Event()
+        self._thread = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.is_running or not os.path.isdir(self.root_path):
+            return
+        self._stop_event.clear()
+        self._ready.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def wait_ready(self, timeout: float = None) -> bool:
+        """Block until the watch is in place (changes made before are not reported)."""
+        return self._ready.wait(timeout)
+
+    def _open_backend(self):
+        # Walks the whole tree (initial snapshot, one inotify watch per folder):
+        # runs on the watcher thread, never on the caller's (UI) thread
+        if not self.use_polling:
+            try:
+                return InotifyBackend(self.root_path)
+            except OSError as e:
+                logger.warning(f"inotify unavailable ({e}), falling back to polling")
+        return PollingBackend(self.root_path, self.poll_interval_s)
+
+    def _run(self):
+        self._backend = self._open_backend()
+        self._ready.set()
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    for kind, path in self._backend.read(timeout=0.5):
+                        self._pending[path] = kind
+                        self._last_event = time.monotonic()
+                    if self._pending and time.monotonic() - self._last_event >= self.debounce_s:
+                        self.flush()
+                except Exception as e:
+                    logger.error(f"Watcher error on {self.root_path}: {e}", exc_info=True)
+                    self._stop_event.wait(1.0)
+        finally:
+            self._backend.close()
+            self._backend = None
+
+    def flush(self) -> Optional[Dict]:
+        """Apply the pending events now. Returns the indexer stats, if anything was applied."""
+        if not self._pending:
+            return None
+        if self.indexer.is_indexing:
+            # A full run is in progress and will see these files; retry after it
+            return None
+
+        pending, self._pending = self._pending, {}
+        if RESCAN in pending.values():
+            # Events were lost (inotify queue overflow)
+            self.indexer.index_directory(self.root_path)
+            return None
+
+        changed = [p for p, kind in pending.items() if kind == CHANGED]
+        deleted = [p for p, kind in pending.items() if kind == DELETED]
+        stats = self.indexer.apply_file_events(changed, deleted)
+        if self.on_change and (stats['new'] or stats['changed'] or stats['removed']
+                               or stats['moved'] or stats['restored']):
+            self.on_change(stats)
+        return stats
@@ -0,0 +1,78 @@
+# tests/test_analytics_service.py
+"""
+Tests pour le cache d'analyse (rafraîchi en arrière-plan, agrégé en SQL).
+"""
+
+import unittest
+import tempfile
+import os
+import shutil
+import threading
+from infrastructure.analytics_service import AnalyticsService
+from infrastructure.database import Database
+from infrastructure.indexer import Indexer
+from tests.test_legacy_migration_job import write_legacy_file
+
+
+class TestAnalyticsService(unittest.TestCase):
+    """Tests pour AnalyticsService."""
+
+    def setUp(self):
+        """Préparation : trois projets indexés (marge 20 % en Mécanique)."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.root = os.path.join(self.temp_dir, "quotes")
+        os.makedirs(self.root)
+        self.paths = [os.path.join(self.root, f"p{i}.mwq") for i in range(3)]
+        for i, path in enumerate(self.paths):
+            write_legacy_file(path, f"REF-{i}")
+        self.db = Database(os.path.join(self.temp_dir, "test.db"))
+        Indexer(self.db, max_workers=1)._index_worker(self.root, None, None)
+        self.service = AnalyticsService(self.db)
+
+    def tearDown(self):
+        """Nettoyage après tests."""
+        self.db.close()
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def test_incremental_refresh_and_sql_aggregates(self):
+        """Seuls les projets modifiés sont recalculés ; les agrégats viennent du cache."""
+        self.assertEqual(self.service.get_cached_dashboard_data()["kpis"]["projects_total"], 0)
+        self.assertIsNone(self.service.get_cached_dashboard_data()["refreshed_at"])
+
+        self.assertEqual(self.service.refresh_incremental_cache(), 3)
+        self.assertEqual(self.service.refresh_incremental_cache(), 0)
+
+        data = self.service.get_cached_dashboard_data()
+        self.assertEqual(data["kpis"]["projects_total"], 3)
+        self.assertIsNotNone(data["refreshed_at"])
+        self.assertEqual(data["margin_by_client"], [{"client": "ACME", "avg_margin": 20.0, "projects_count": 3}])
+        self.assertEqual(data["margin_by_typology"], [{"typology": "Mécanique", "avg_margin": 20.0, "samples": 3}])
+
+        # Un projet supprimé de l'index sort du cache
+        project_id = next(r["id"] for r in self.db.search_projects() if r["filepath"] == self.paths[0])
+        self.db.delete_project(project_id)
+        self.service.refresh_incremental_cache()
+        data = self.service.get_cached_dashboard_data()
+        self.assertEqual(data["kpis"]["projects_total"], 2)
+        self.assertEqual(data["margin_by_typology"][0]["samples"], 2)
+
+    def test_refresh_in_background(self):
+        """Le rafraîchissement tourne dans un thread et rappelle avec les nouveaux agrégats."""
+        done = threading.Event()
+        received = []
+
+        def callback(data):
+            received.append((threading.current_thread() is threading.main_thread(), data))
+            done.set()
+
+        self.assertTrue(self.service.refresh_in_background(callback))
+        self.assertTrue(done.wait(10))
+        on_main_thread, data = received[0]
+        self.assertFalse(on_main_thread)
+        self.assertEqual(data["kpis"]["projects_total"], 3)
+        self.assertFalse(self.service.is_refreshing)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+# tests/test_batch_export_job.py
+"""
+Tests pour l'export XLSX par lot (pool de processus, sauvegarde incrémentale, annulation).
+"""
+
+import unittest
+import tempfile
+import os
+import base64
+import shutil
+import zipfile
+from datetime import date
+from openpyxl import load_workbook
+from domain.document import Document
+from infrastructure.batch_export_job import BatchExportJob
+from infrastructure.database import Database
+from infrastructure.persistence import PersistenceService
+from tests.test_export_template import TEMPLATE_PATH
+from tests.test_legacy_migration_job import write_legacy_file
+
+
+class TestBatchExportJob(unittest.TestCase):
+    """Tests pour BatchExportJob et PersistenceService.append_export_entry."""
+
+    def setUp(self):
+        """Préparation : quatre projets au format ZIP, le premier avec un plan joint."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.root = os.path.join(self.temp_dir, "quotes")
+        self.output_dir = os.path.join(self.temp_dir, "exports")
+        os.makedirs(self.root)
+        self.paths = [os.path.join(self.root, f"p{i}.mwq") for i in range(4)]
+        for i, path in enumerate(self.paths):
+            write_legacy_file(path, f"REF-{i}")
+            project = PersistenceService.load_project(path)
+            if i == 0:
+                project.documents.append(Document(filename="plan.pdf", data=base64.b64encode(b"%PDF plan").decode()))
+            PersistenceService.save_project(project, path)
+        self.db = Database(os.path.join(self.temp_dir, "test.db"))
+        self.job = BatchExportJob(self.db, max_workers=2)
+
+    def tearDown(self):
+        """Nettoyage après tests."""
+        self.db.close()
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def test_batch_export_records_history(self):
+        """Numéros réservés en bloc, un XLSX par projet, historique écrit dans chaque projet."""
+        seen = []
+        stats = self.job.run(self.paths[:3], TEMPLATE_PATH, self.output_dir,
+                             progress_callback=lambda result, processed, total: seen.append((processed, total)))
+
+        self.assertEqual((stats["exported"], stats["failed"], stats["cancelled"]), (3, 0, 0))
+        self.assertEqual(sorted(seen), [(1, 3), (2, 3), (3, 3)])
+        refs = [r["devis_ref"] for r in stats["results"]]
+        prefix = f"OD{date.today().strftime('%y%m%d')}_"
+        self.assertEqual(refs, [f"{prefix}001", f"{prefix}002", f"{prefix}003"])
+
+        for path, result in zip(self.paths, stats["results"]):
+            self.assertEqual(result["filepath"], path)
+            self.assertTrue(os.path.exists(result["output_path"]))
+            self.assertIn(result["devis_ref"], {c.value for row in load_workbook(result["output_path"]).active.iter_rows()
+                                                for c in row})
+            entry = PersistenceService.load_project(path).export_history[-1]
+            self.assertEqual(entry["devis_ref"], result["devis_ref"])
+            with open(result["output_path"], "rb") as f:
+                self.assertEqual(base64.b64decode(entry["xlsx_data_b64"]), f.read())
+
+        # Sauvegarde incrémentale : pièces jointes conservées, empreinte à jour
+        project = PersistenceService.load_project(self.paths[0])
+        self.assertEqual(base64.b64decode(project.documents[0].data), b"%PDF plan")
+        fingerprint = PersistenceService.read_fingerprint(self.paths[0])
+        with zipfile.ZipFile(self.paths[0], "a") as zf:
+            zf.comment = b""
+        self.assertEqual(PersistenceService.file_fingerprint(self.paths[0]), fingerprint)
+
+    def test_exported_projects_are_reindexed(self):
+        """Les projets réécrits sont réindexés : l'export est retrouvé par son numéro."""
+        stats = self.job.run(self.paths[:2], TEMPLATE_PATH, self.output_dir)
+
+        for result in stats["results"]:
+            exports = self.db.find_exports(result["devis_ref"])
+            self.assertEqual([e["filepath"] for e in exports], [result["filepath"]])
+
+    def test_failed_item_does_not_stop_the_batch(self):
+        """Un projet illisible est rapporté en erreur ; les autres sont exportés."""
+        with open(self.paths[1], "wb") as f:
+            f.write(b"PK corrompu")
+        stats = self.job.run(self.paths[:3], TEMPLATE_PATH, self.output_dir)
+        self.assertEqual([r["status"] for r in stats["results"]], ["done", "failed", "done"])
+        self.assertTrue(stats["results"][1]["error"])
+
+    def test_cancel(self):
+        """Après stop(), les exports non commencés sont annulés ; ceux en cours se terminent."""
+        job = BatchExportJob(self.db, max_workers=1)
+        stats = job.run(self.paths, TEMPLATE_PATH, self.output_dir,
+                        progress_callback=lambda result, processed, total: job.stop())
+        self.assertTrue(stats["interrupted"])
+        self.assertGreaterEqual(stats["cancelled"], 1)
+        self.assertEqual(stats["exported"] + stats["cancelled"], 4)
+        self.assertEqual(stats["results"][-1]["status"], "cancelled")
+        self.assertEqual(PersistenceService.load_project(self.paths[-1]).export_history, [])
+
+    def test_legacy_file_is_saved_in_full(self):
+        """Un fichier JSON legacy reçoit son entrée d'historique par une sauvegarde complète."""
+        legacy = os.path.join(self.root, "legacy.mwq")
+        write_legacy_file(legacy, "REF-L")
+        PersistenceService.append_export_entry(legacy, {"devis_ref": "OD260101_001-1", "date": "01/01/2026"})
+        self.assertTrue(PersistenceService.is_zip_format(legacy))
+        self.assertEqual(PersistenceService.load_project(legacy).export_history[0]["devis_ref"], "OD260101_001-1")
+
+    def test_rewrite_keeps_file_mode(self):
+        """La réécriture atomique conserve les droits du fichier projet."""
+        os.chmod(self.paths[0], 0o644)
+        PersistenceService.append_export_entry(self.paths[0], {"devis_ref": "OD260101_001-1", "date": "01/01/2026"})
+        self.assertEqual(os.stat(self.paths[0]).st_mode & 0o777, 0o644)
+
+        os.chmod(self.paths[0], 0o664)
+        PersistenceService.save_project(PersistenceService.load_project(self.paths[0]), self.paths[0])
+        self.assertEqual(os.stat(self.paths[0]).st_mode & 0o777, 0o664)
+
+
+if __name__ == '__main__':
+    unittest.main()
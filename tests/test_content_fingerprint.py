@@ -0,0 +1,80 @@
+# tests/test_content_fingerprint.py
+"""
+Tests pour l'empreinte de contenu stockée dans le commentaire de l'archive .mwq.
+"""
+
+import unittest
+import tempfile
+import os
+import shutil
+import zipfile
+from unittest import mock
+from infrastructure.database import Database
+from infrastructure.indexer import Indexer
+from infrastructure.persistence import PersistenceService
+from tests.test_legacy_migration_job import write_legacy_file
+
+
+class TestContentFingerprint(unittest.TestCase):
+    """Tests pour PersistenceService.read_fingerprint / file_fingerprint et l'indexeur."""
+
+    def setUp(self):
+        """Préparation : un projet au format ZIP."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.root = os.path.join(self.temp_dir, "quotes")
+        os.makedirs(self.root)
+        self.filepath = os.path.join(self.root, "a.mwq")
+        write_legacy_file(self.filepath, "REF-A")
+        self.project = PersistenceService.load_project(self.filepath)
+        PersistenceService.save_project(self.project, self.filepath)
+        self.db = Database(os.path.join(self.temp_dir, "test.db"))
+
+    def tearDown(self):
+        """Nettoyage après tests."""
+        self.db.close()
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def test_fingerprint_follows_content(self):
+        """Même contenu, même empreinte ; un contenu modifié change l'empreinte."""
+        fingerprint = PersistenceService.read_fingerprint(self.filepath)
+        self.assertTrue(fingerprint)
+
+        copy_path = os.path.join(self.root, "a_copie.mwq")
+        PersistenceService.save_project(self.project, copy_path)
+        self.assertEqual(PersistenceService.read_fingerprint(copy_path), fingerprint)
+
+        self.project.client = "AUTRE CLIENT"
+        PersistenceService.save_project(self.project, copy_path)
+        self.assertNotEqual(PersistenceService.read_fingerprint(copy_path), fingerprint)
+
+    def test_archive_without_comment_gives_same_fingerprint(self):
+        """Une archive sans commentaire (ancienne sauvegarde) est hachée de la même façon."""
+        fingerprint = PersistenceService.read_fingerprint(self.filepath)
+        with zipfile.ZipFile(self.filepath, 'a') as zf:
+            zf.comment = b""
+
+        self.assertIsNone(PersistenceService.read_fingerprint(self.filepath))
+        self.assertEqual(PersistenceService.file_fingerprint(self.filepath), fingerprint)
+
+    def test_touched_file_is_not_parsed_again(self):
+        """Un fichier dont seule la date change n'est pas rechargé ; les copies sont détectées."""
+        indexer = Indexer(self.db, max_workers=1)
+        indexer._index_worker(self.root, None, None)
+        shutil.copy(self.filepath, os.path.join(self.root, "a_copie.mwq"))
+        indexer._index_worker(self.root, None, None)
+        self.assertEqual(len(self.db.find_duplicate_files()), 1)
+
+        stat = os.stat(self.filepath)
+        new_mtime = stat.st_mtime_ns + 5_000_000_000
+        os.utime(self.filepath, ns=(stat.st_atime_ns, new_mtime))
+        with mock.patch("infrastructure.indexer.extract_project_data") as extract:
+            indexer._index_worker(self.root, None, None)
+            extract.assert_not_called()
+
+        self.assertEqual(indexer.last_run_stats['unchanged'], 2)
+        self.assertEqual(self.db.get_file_signatures(filepaths=[self.filepath])[self.filepath][1], new_mtime)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+# tests/test_database_bulk_upsert.py
+"""
+Tests pour l'écriture groupée de l'index (upsert_projects_bulk).
+"""
+
+import unittest
+import tempfile
+import os
+import shutil
+from infrastructure.database import Database
+
+
+def make_row(filepath, reference, content_hash=None):
+    """Ligne de projet minimale telle que construite par l'indexeur."""
+    return {
+        'name': f"Projet {reference}",
+        'reference': reference,
+        'client': "ACME",
+        'filepath': filepath,
+        'drawing_filename': None,
+        'content_hash': content_hash or f"hash-{reference}",
+        'min_qty': 1,
+        'max_qty': 10,
+    }
+
+
+class TestDatabaseBulkUpsert(unittest.TestCase):
+    """Tests pour Database.upsert_projects_bulk."""
+
+    def setUp(self):
+        """Préparation : base temporaire."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.db = Database(os.path.join(self.temp_dir, "test.db"))
+
+    def tearDown(self):
+        """Nettoyage après tests."""
+        self.db.close()
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def test_inserts_then_updates_by_filepath(self):
+        """Une même ligne réécrite est mise à jour, pas dupliquée."""
+        rows = [make_row(f"/q/{i}.mwq", f"REF-{i}") for i in range(7)]
+        stats = self.db.upsert_projects_bulk(rows, batch_size=3)
+        self.assertEqual(stats['written'], 7)
+
+        rows[0]['client'] = "OTHER"
+        self.db.upsert_projects_bulk(rows[:1])
+
+        projects = self.db.search_projects()
+        self.assertEqual(len(projects), 7)
+        self.assertIn("OTHER", [p['client'] for p in projects])
+
+    def test_moved_file_reconnects_missing_row(self):
+        """Un fichier déplacé reprend la ligne marquée manquante."""
+        self.db.upsert_projects_bulk([make_row("/q/old.mwq", "REF-A")])
+        row_id = self.db.search_projects()[0]['id']
+        self.db.set_missing_status(["/q/old.mwq"], True)
+
+        stats = self.db.upsert_projects_bulk([make_row("/q/new.mwq", "REF-A"), make_row("/q/copy.mwq", "REF-A")])
+
+        self.assertEqual(stats['reconnected'], [("/q/old.mwq", "/q/copy.mwq")])
+        rows = {p['filepath']: p['id'] for p in self.db.search_projects(include_missing=True)}
+        self.assertEqual(rows["/q/copy.mwq"], row_id)
+        self.assertEqual(set(rows), {"/q/copy.mwq", "/q/new.mwq"})
+
+    def test_database_uses_wal(self):
+        """La base est en mode WAL."""
+        with self.db.get_connection() as conn:
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+# tests/test_database_connections.py
+"""
+Tests pour les connexions persistantes par thread de Database.
+"""
+
+import unittest
+import tempfile
+import os
+import shutil
+import threading
+import sqlite3
+from infrastructure.database import Database
+from tests.test_database_bulk_upsert import make_row
+
+
+class TestDatabaseConnections(unittest.TestCase):
+    """Tests pour Database.get_connection / close."""
+
+    def setUp(self):
+        """Préparation : base temporaire."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.db = Database(os.path.join(self.temp_dir, "test.db"))
+
+    def tearDown(self):
+        """Nettoyage après tests."""
+        self.db.close()
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def test_connection_is_reused_with_pragmas(self):
+        """Un même thread réutilise sa connexion, configurée une seule fois."""
+        conn = self.db.get_connection()
+        self.assertIs(self.db.get_connection(), conn)
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        self.assertEqual(conn.execute("PRAGMA temp_store").fetchone()[0], 2)
+        self.assertEqual(conn.execute("PRAGMA cache_size").fetchone()[0], -32000)
+
+    def test_each_thread_has_its_own_connection(self):
+        """Chaque thread reçoit sa propre connexion."""
+        seen = []
+        thread = threading.Thread(target=lambda: seen.append(self.db.get_connection()))
+        thread.start()
+        thread.join()
+
+        self.assertIsNot(seen[0], self.db.get_connection())
+
+    def test_row_factory_does_not_leak(self):
+        """Le row_factory posé par une méthode n'affecte pas la suivante."""
+        conn = self.db.get_connection()
+        conn.row_factory = sqlite3.Row
+
+        self.assertIsNone(self.db.get_connection().row_factory)
+
+    def test_closed_connection_is_reopened(self):
+        """Une connexion fermée (close ou appelant) est rouverte de manière transparente."""
+        self.db.get_connection().close()
+        self.assertEqual(self.db.search_projects(), [])
+
+        self.db.close()
+        self.assertEqual(self.db.get_all_clients(), [])
+
+    def test_restore_while_other_instances_are_open(self):
+        """La restauration est vue par les autres instances ouvertes sur le même fichier."""
+        self.db.upsert_project(make_row(os.path.join(self.temp_dir, "a.mwq"), "REF-A"))
+        backup_path = os.path.join(self.temp_dir, "backup.zip")
+        self.db.backup_database(backup_path)
+
+        watcher_db = Database(os.path.join(self.temp_dir, "test.db"))
+        try:
+            self.assertEqual(len(watcher_db.search_projects()), 1)
+            watcher_db.upsert_project(make_row(os.path.join(self.temp_dir, "b.mwq"), "REF-B"))
+
+            self.assertTrue(self.db.restore_database(backup_path))
+
+            self.assertEqual([p['reference'] for p in self.db.search_projects()], ["REF-A"])
+            self.assertEqual([p['reference'] for p in watcher_db.search_projects()], ["REF-A"])
+            watcher_db.upsert_project(make_row(os.path.join(self.temp_dir, "c.mwq"), "REF-C"))
+            self.assertEqual(self.db.count_projects(), 2)
+            integrity = self.db.get_connection().execute("PRAGMA integrity_check").fetchone()[0]
+            self.assertEqual(integrity, "ok")
+        finally:
+            watcher_db.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+# tests/test_directory_scanner.py
+"""
+Tests pour le parcours de dossiers avec cache des listings (DirectoryScanner).
+"""
+
+import unittest
+import tempfile
+import os
+import shutil
+from infrastructure.database import Database
+from infrastructure.directory_scanner import DirectoryScanner
+
+
+def touch(path, content=b"x"):
+    with open(path, "wb") as f:
+        f.write(content)
+
+
+def age(path, seconds=60):
+    """Recule le mtime d'un dossier pour sortir de la fenêtre d'incertitude."""
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns - seconds * 1_000_000_000))
+
+
+class TestDirectoryScanner(unittest.TestCase):
+    """Tests pour DirectoryScanner."""
+
+    def setUp(self):
+        """Préparation : arborescence a/ et a/b/ avec deux fichiers .mwq."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.root = os.path.join(self.temp_dir, "quotes")
+        self.sub = os.path.join(self.root, "a", "b")
+        os.makedirs(self.sub)
+        touch(os.path.join(self.root, "one.mwq"))
+        touch(os.path.join(self.sub, "two.MWQ"))
+        touch(os.path.join(self.sub, "notes.txt"))
+        for path in (self.sub, os.path.dirname(self.sub), self.root):
+            age(path)
+        self.db = Database(os.path.join(self.temp_dir, "test.db"))
+        self.scanner = DirectoryScanner(self.db)
+
+    def tearDown(self):
+        """Nettoyage après tests."""
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def test_lists_project_files_with_stat_data(self):
+        """Seuls les .mwq sont retournés, avec leur taille et mtime."""
+        files = {f.path: f for f in self.scanner.scan(self.root)}
+
+        self.assertEqual(set(files), {os.path.join(self.root, "one.mwq"), os.path.join(self.sub, "two.MWQ")})
+        entry = files[os.path.join(self.root, "one.mwq")]
+        self.assertEqual((entry.size, entry.mtime_ns), (1, os.stat(entry.path).st_mtime_ns))
+
+    def test_unchanged_directories_are_not_listed_again(self):
+        """Un second parcours réutilise les listings des dossiers inchangés."""
+        first = self.scanner.list_files(self.root)
+        second = self.scanner.list_files(self.root)
+
+        self.assertEqual(sorted(first), sorted(second))
+        self.assertEqual(self.scanner.stats, {'dirs': 3, 'listed': 0, 'reused': 3})
+
+    def test_changed_and_removed_directories(self):
+        """Un dossier modifié est relu, un dossier supprimé est oublié."""
+        self.scanner.list_files(self.root)
+        touch(os.path.join(self.root, "three.mwq"))
+        shutil.rmtree(os.path.join(self.root, "a"))
+
+        files = self.scanner.list_files(self.root)
+
+        self.assertEqual(sorted(os.path.basename(f) for f in files), ["one.mwq", "three.mwq"])
+        self.assertEqual(list(self.db.get_scanned_dirs(self.root)), [self.root])
+
+
+if __name__ == '__main__':
+    unittest.main()
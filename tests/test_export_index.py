@@ -0,0 +1,105 @@
+# tests/test_export_index.py
+"""
+Tests pour l'index de l'historique d'export (recherche par numéro de devis).
+"""
+
+import unittest
+import tempfile
+import os
+import base64
+import shutil
+from infrastructure.database import Database, SCHEMA_MIGRATIONS
+from infrastructure.indexer import Indexer
+from infrastructure.persistence import PersistenceService
+from tests.test_legacy_migration_job import write_legacy_file
+
+
+def add_export(project, devis_ref, date, version_index, xlsx_bytes=None):
+    """Ajoute une entrée d'historique d'export telle qu'écrite par ExportService."""
+    entry = {"devis_ref": devis_ref, "date": date, "time": "10:00", "version_index": version_index}
+    if xlsx_bytes is not None:
+        entry["xlsx_filename"] = f"{devis_ref}.xlsx"
+        entry["xlsx_data_b64"] = base64.b64encode(xlsx_bytes).decode("ascii")
+        entry["_xlsx_path"] = f"documents/exports/{devis_ref}.xlsx"
+    project.export_history.append(entry)
+
+
+class TestExportIndex(unittest.TestCase):
+    """Tests pour la table exports et Database.find_exports."""
+
+    def setUp(self):
+        """Préparation : deux projets exportés, indexés."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.root = os.path.join(self.temp_dir, "quotes")
+        os.makedirs(self.root)
+        self.file_a = os.path.join(self.root, "a.mwq")
+        self.file_b = os.path.join(self.root, "b.mwq")
+        for path, reference in ((self.file_a, "REF-A"), (self.file_b, "REF-B")):
+            write_legacy_file(path, reference)
+
+        project = PersistenceService.load_project(self.file_a)
+        add_export(project, "OD260202_014", "02/02/2026", 1, xlsx_bytes=b"x" * 1001)
+        add_export(project, "OD260310_003", "10/03/2026", 1)
+        PersistenceService.save_project(project, self.file_a)
+        project = PersistenceService.load_project(self.file_b)
+        add_export(project, "OD260115_002", "15/01/2026", 1)
+        PersistenceService.save_project(project, self.file_b)
+
+        self.db = Database(os.path.join(self.temp_dir, "test.db"))
+        Indexer(self.db, max_workers=1)._index_worker(self.root, None, None)
+
+    def tearDown(self):
+        """Nettoyage après tests."""
+        self.db.close()
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def _project_id(self, filepath):
+        return next(r["id"] for r in self.db.search_projects() if r["filepath"] == filepath)
+
+    def test_exports_are_indexed(self):
+        """L'historique d'export est indexé : date triable, taille du XLSX embarqué."""
+        project_id = self._project_id(self.file_a)
+        exports = self.db.get_project_exports(project_id)
+        self.assertEqual([e["devis_ref"] for e in exports], ["OD260202_014", "OD260310_003"])
+        self.assertEqual(exports[0]["export_date"], "2026-02-02")
+        self.assertEqual(exports[0]["xlsx_size"], 1001)
+        self.assertEqual(exports[0]["xlsx_path"], "documents/exports/OD260202_014.xlsx")
+        self.assertIsNone(exports[1]["xlsx_size"])
+        self.assertEqual(self.db.get_export_counts()[project_id], 2)
+
+    def test_quote_number_from_customer_order(self):
+        """Un numéro de commande client (avec suffixe de version) retrouve le devis et sa version."""
+        found = self.db.find_exports("od260202_014-1")
+        self.assertEqual(len(found), 1)
+        self.assertEqual(found[0]["filepath"], self.file_a)
+        self.assertEqual(found[0]["version_index"], 1)
+        self.assertEqual(self.db.find_exports("OD260202_099"), [])
+
+        rows = self.db.search_projects(global_search=" OD260115_002-1 ")
+        self.assertEqual([r["filepath"] for r in rows], [self.file_b])
+        self.assertEqual(self.db.count_projects(global_search="OD260115_002"), 1)
+
+    def test_migration_backfills_indexed_projects(self):
+        """Une base indexée avant la table exports est complétée au prochain passage de l'indexeur."""
+        version = SCHEMA_MIGRATIONS.index("_migrate_exports")
+        conn = self.db.get_connection()
+        conn.execute("DROP TABLE exports")
+        conn.execute(f"PRAGMA user_version = {version}")
+        conn.commit()
+        self.db.close()
+
+        self.db = Database(self.db.db_path)
+        self.assertEqual(self.db.get_export_counts(), {})
+        Indexer(self.db, max_workers=1)._index_worker(self.root, None, None)
+        self.assertEqual(len(self.db.get_project_exports(self._project_id(self.file_a))), 2)
+        self.assertEqual(len(self.db.find_exports("OD260115_002")), 1)
+
+    def test_deleted_project_loses_its_exports(self):
+        """La suppression d'un projet retire ses exports de l'index."""
+        self.db.delete_project(self._project_id(self.file_b))
+        self.assertEqual(self.db.find_exports("OD260115_002"), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
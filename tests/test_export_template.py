@@ -0,0 +1,112 @@
+# tests/test_export_template.py
+"""
+Tests pour le template XLSX compilé (analysé une fois, copié en mémoire à chaque export).
+"""
+
+import unittest
+import tempfile
+import os
+import shutil
+from unittest import mock
+from openpyxl import load_workbook
+from infrastructure import export_service
+from infrastructure.export_service import ExportService, compile_template
+from infrastructure.persistence import PersistenceService
+from domain.cost import CostItem, CostType, PricingStructure, PricingType
+from tests.test_legacy_migration_job import write_legacy_file
+
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets", "TEMPLATE.xlsx")
+
+
+class TestCompiledTemplate(unittest.TestCase):
+    """Tests pour CompiledTemplate / compile_template."""
+
+    def setUp(self):
+        """Préparation : copie du template et un projet à deux quantités."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.template = os.path.join(self.temp_dir, "TEMPLATE.xlsx")
+        shutil.copy(TEMPLATE_PATH, self.template)
+        self.project_path = os.path.join(self.temp_dir, "a.mwq")
+        write_legacy_file(self.project_path, "REF-A")
+
+    def tearDown(self):
+        """Nettoyage après tests."""
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def test_template_parsed_once_for_a_batch(self):
+        """Un lot d'exports n'analyse le template qu'une fois ; chaque fichier est complet."""
+        service = ExportService()
+        with mock.patch.object(export_service, "load_workbook", wraps=load_workbook) as loader:
+            for i in range(3):
+                project = PersistenceService.load_project(self.project_path)
+                service.export_excel(project, self.template, os.path.join(self.temp_dir, f"o{i}.xlsx"),
+                                     devis_ref=f"OD260101_00{i}-1")
+        self.assertEqual(loader.call_count, 1)
+
+        ws = load_workbook(os.path.join(self.temp_dir, "o2.xlsx")).active
+        compiled = compile_template(self.template)
+        (devis_row, devis_col), = [(row, col) for row, cols in compiled.placeholders.items()
+                                   for col, token in cols.items() if token == "DEVIS_REF"]
+        self.assertEqual(ws.cell(row=devis_row, column=devis_col).value, "OD260101_002-1")
+        # Deux lignes de quantité remplies, les autres masquées
+        qty_rows = [row for row in compiled.rows_with("PART_REF") if 21 <= row <= 30]
+        self.assertEqual(ws.cell(row=qty_rows[0], column=2).value, "REF-A")
+        self.assertFalse(ws.row_dimensions[qty_rows[1]].hidden)
+        self.assertTrue(all(ws.row_dimensions[row].hidden for row in qty_rows[2:]))
+        values = {c.value for row in ws.iter_rows() for c in row if isinstance(c.value, str)}
+        self.assertFalse(values & {"DEVIS_REF", "DATE_REF", "PU_REF", "COMMENT_REF"})
+
+    def test_copies_are_independent(self):
+        """Chaque export part d'une copie neuve du template."""
+        compiled = compile_template(self.template)
+        first = compiled.new_workbook()
+        first.active["A1"] = "modifié"
+        first.active.row_dimensions[5].hidden = True
+        second = compiled.new_workbook()
+        self.assertNotEqual(second.active["A1"].value, "modifié")
+        self.assertFalse(second.active.row_dimensions[5].hidden)
+
+    def test_copy_matches_template_reload(self):
+        """Avec insertion de lignes d'outillage, la copie en mémoire donne le même fichier qu'une relecture du template."""
+        reloaded_template = os.path.join(self.temp_dir, "TEMPLATE_RELU.xlsx")
+        shutil.copy(TEMPLATE_PATH, reloaded_template)
+        with mock.patch.object(export_service.pickle, "loads", side_effect=AttributeError("_add_row")):
+            self.assertIsNone(compile_template(reloaded_template)._workbook_blob)
+            reloaded = self._export_with_tooling(reloaded_template, "reloaded.xlsx")
+        self.assertIsNotNone(compile_template(self.template)._workbook_blob)
+        copied = self._export_with_tooling(self.template, "copied.xlsx")
+
+        self.assertIn("Outil 5", copied["values"].values())
+        self.assertEqual(copied, reloaded)
+
+    def _export_with_tooling(self, template, filename):
+        project = PersistenceService.load_project(self.project_path)
+        project.operations[0].comment = "Commentaire"
+        for i in range(6):
+            tool = CostItem(name=f"Outil {i}", cost_type=CostType.TOOLING,
+                            pricing=PricingStructure(pricing_type=PricingType.PER_UNIT, fixed_price=100.0 + i))
+            project.operations[0].costs[tool.name] = tool
+        output = os.path.join(self.temp_dir, filename)
+        ExportService().export_excel(project, template, output, devis_ref="OD260101_001-1")
+        ws = load_workbook(output).active
+        return {
+            "values": {c.coordinate: c.value for row in ws.iter_rows() for c in row if c.value is not None},
+            "styles": {c.coordinate: (c.number_format, c.font.b, c.border.top.style, c.fill.fgColor.rgb)
+                       for row in ws.iter_rows() for c in row},
+            "merged": sorted(str(r) for r in ws.merged_cells.ranges),
+            "rows": {i: (d.hidden, d.height) for i, d in ws.row_dimensions.items()},
+            "images": len(ws._images),
+        }
+
+    def test_changed_template_is_compiled_again(self):
+        """Un template modifié sur le disque est analysé de nouveau."""
+        compiled = compile_template(self.template)
+        self.assertIs(compile_template(self.template), compiled)
+        stat = os.stat(self.template)
+        os.utime(self.template, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertIsNot(compile_template(self.template), compiled)
+
+
+if __name__ == '__main__':
+    unittest.main()
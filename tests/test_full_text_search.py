@@ -0,0 +1,80 @@
+# tests/test_full_text_search.py
+"""
+Tests pour la recherche plein texte (FTS5) dans le contenu des devis.
+"""
+
+import unittest
+import tempfile
+import os
+import json
+import shutil
+from infrastructure.database import Database
+from infrastructure.indexer import Indexer
+from tests.test_legacy_migration_job import write_legacy_file
+
+
+def write_project(path, reference, label, supplier_ref=None, comment=None):
+    """Écrit un devis legacy avec une opération et un coût personnalisés."""
+    write_legacy_file(path, reference)
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    op = data["operations"][0]
+    op["label"] = label
+    cost = op["costs"]["Tournage"]
+    cost["supplier_quote_ref"] = supplier_ref
+    cost["comment"] = comment
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+class TestFullTextSearch(unittest.TestCase):
+    """Tests pour Database.search_projects avec l'index FTS5."""
+
+    def setUp(self):
+        """Préparation : trois devis indexés."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.root = os.path.join(self.temp_dir, "quotes")
+        os.makedirs(self.root)
+        write_project(os.path.join(self.root, "a.mwq"), "REF-A", "Soudure laser", supplier_ref="ZQ26-2398")
+        write_project(os.path.join(self.root, "b.mwq"), "REF-B", "Découpe", comment="prévoir soudure")
+        write_project(os.path.join(self.root, "c.mwq"), "SOUDURE-C", "Pliage")
+        self.db = Database(os.path.join(self.temp_dir, "test.db"))
+        Indexer(self.db, max_workers=1)._index_worker(self.root, None, None)
+
+    def tearDown(self):
+        """Nettoyage après tests."""
+        self.db.close()
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def refs(self, term, sort_by="reference"):
+        return [p["reference"] for p in self.db.search_projects(global_search=term, sort_by=sort_by, sort_order="ASC")]
+
+    def test_finds_supplier_reference(self):
+        """Une référence fournisseur retrouve le devis qui l'utilise."""
+        self.assertTrue(self.db.has_fts)
+        self.assertEqual(self.refs("ZQ26-2398"), ["REF-A"])
+        self.assertEqual(self.refs("zq26"), ["REF-A"])
+
+    def test_prefix_words_without_accents(self):
+        """Chaque mot est un préfixe ; les accents sont ignorés."""
+        self.assertEqual(self.refs("soud las"), ["REF-A"])
+        self.assertEqual(self.refs("decoupe"), ["REF-B"])
+
+    def test_relevance_ranks_reference_first(self):
+        """Un mot dans la référence passe avant le même mot dans un commentaire."""
+        self.assertEqual(self.refs("soudure", sort_by="relevance"), ["SOUDURE-C", "REF-A", "REF-B"])
+
+    def test_deleted_project_leaves_index(self):
+        """Supprimer un projet retire ses entrées plein texte."""
+        project = self.db.search_projects(global_search="REF-A")[0]
+        self.db.delete_project(project["id"])
+        self.assertEqual(self.refs("ZQ26"), [])
+
+    def test_inner_wildcard_uses_like(self):
+        """Un joker au milieu d'un mot garde l'ancienne recherche LIKE."""
+        self.assertEqual(self.refs("REF*B"), ["REF-B"])
+
+
+if __name__ == '__main__':
+    unittest.main()
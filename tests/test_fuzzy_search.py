@@ -0,0 +1,83 @@
+# tests/test_fuzzy_search.py
+"""
+Tests pour la recherche approchée par trigrammes (références mal saisies).
+"""
+
+import unittest
+import tempfile
+import os
+import shutil
+from infrastructure.database import Database
+from infrastructure.fuzzy_match import normalize_key, similarity, trigrams
+from infrastructure.search_results import SearchResultPager
+from tests.test_database_bulk_upsert import make_row
+
+
+class TestFuzzySearch(unittest.TestCase):
+    """Tests pour Database.fuzzy_search_projects et le repli de SearchResultPager."""
+
+    def setUp(self):
+        """Préparation : quelques références proches les unes des autres."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.db = Database(os.path.join(self.temp_dir, "test.db"))
+        references = [
+            "MINITUBES-OPP-26-001929-3858",
+            "MINITUBES OPP-25-001051",
+            "AEROTEC-OPP-26-004512",
+            "SAFRAN-2024-117",
+        ]
+        rows = []
+        for i, reference in enumerate(references):
+            row = make_row(os.path.join(self.temp_dir, f"p{i}.mwq"), reference)
+            row['client'] = reference.split("-")[0].split(" ")[0]
+            row['search_document'] = {'reference': reference, 'client': row['client']}
+            rows.append(row)
+        self.db.upsert_projects_bulk(rows)
+
+    def tearDown(self):
+        """Nettoyage après tests."""
+        self.db.close()
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def test_similarity_ignores_case_and_separators(self):
+        """Casse, accents et séparateurs ne comptent pas ; une faute garde un score élevé."""
+        self.assertEqual(normalize_key("Minitubes_opp--26 "), "minitubes opp 26")
+        reference = trigrams("MINITUBES-OPP-26-001929-3858")
+        self.assertEqual(similarity(trigrams("minitubes opp 26 001929 3858"), reference), 1.0)
+        self.assertGreater(similarity(trigrams("MINITUBES-OPP-26-001292-3858"), reference), 0.6)
+        self.assertLess(similarity(trigrams("SAFRAN-2024-117"), reference), 0.2)
+
+    def test_mistyped_reference_is_ranked_first(self):
+        """Une référence mal saisie retrouve la bonne en tête, avec son score."""
+        results = self.db.fuzzy_search_projects("MINITUBE-OPP-26-01929-3858")
+
+        self.assertEqual(results[0]["reference"], "MINITUBES-OPP-26-001929-3858")
+        self.assertEqual(results[0]["matched_field"], "reference")
+        self.assertEqual([r["similarity"] for r in results], sorted((r["similarity"] for r in results), reverse=True))
+        self.assertNotIn("SAFRAN-2024-117", [r["reference"] for r in results])
+        self.assertEqual(self.db.fuzzy_search_projects("ZZZZ"), [])
+
+    def test_index_follows_writes(self):
+        """Modification et suppression d'un projet mettent l'index de trigrammes à jour."""
+        project_id = self.db.fuzzy_search_projects("SAFRAN-2024-117")[0]["id"]
+        self.db.upsert_project(make_row(os.path.join(self.temp_dir, "p3.mwq"), "THALES-2024-999"))
+        self.assertEqual(self.db.fuzzy_search_projects("SAFRAN-2024-117"), [])
+        self.assertEqual(self.db.fuzzy_search_projects("THALES 2024 99")[0]["id"], project_id)
+
+        self.db.delete_project(project_id)
+        self.assertEqual(self.db.fuzzy_search_projects("THALES-2024-999"), [])
+
+    def test_pager_falls_back_to_fuzzy_results(self):
+        """Sans résultat exact, la liste affiche les références approchantes."""
+        exact = SearchResultPager(self.db, global_search="AEROTEC")
+        self.assertFalse(exact.is_fuzzy)
+
+        pager = SearchResultPager(self.db, global_search="AEROTEK-OPP-26-004512", page_size=1)
+        self.assertTrue(pager.is_fuzzy)
+        self.assertEqual(pager[0]["reference"], "AEROTEC-OPP-26-004512")
+        self.assertEqual(len(list(pager.rows())), len(pager))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+# tests/test_index_structure.py
+"""
+Tests pour les tables dénormalisées operations / cost_lines de l'index.
+"""
+
+import unittest
+import tempfile
+import os
+import shutil
+from infrastructure.database import Database
+from infrastructure.indexer import Indexer
+from tests.test_legacy_migration_job import write_legacy_file
+
+
+class TestIndexStructure(unittest.TestCase):
+    """Tests pour l'écriture et la lecture de la structure indexée."""
+
+    def setUp(self):
+        """Préparation : deux projets indexés."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.root = os.path.join(self.temp_dir, "quotes")
+        os.makedirs(self.root)
+        self.file_a = os.path.join(self.root, "a.mwq")
+        self.file_b = os.path.join(self.root, "b.mwq")
+        write_legacy_file(self.file_a, "REF-A")
+        write_legacy_file(self.file_b, "REF-B")
+        self.db = Database(os.path.join(self.temp_dir, "test.db"))
+        self.indexer = Indexer(self.db, max_workers=2)
+        self.indexer._index_worker(self.root, None, None)
+        self.project_id = self.db.search_projects(global_search="REF-A")[0]["id"]
+
+    def tearDown(self):
+        """Nettoyage après tests."""
+        self.db.close()
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def test_structure_rows_are_indexed(self):
+        """Les opérations et lignes de coût de la version courante sont indexées."""
+        operations, cost_lines = self.db.get_project_structure(self.project_id)
+
+        self.assertEqual([(op["code"], op["typology"], op["cost_count"]) for op in operations],
+                         [("OP10", "Mécanique", 1)])
+        self.assertEqual(len(cost_lines), 1)
+        line = cost_lines[0]
+        self.assertEqual((line["name"], line["cost_type"], line["margin_rate"]),
+                         ("Tournage", "Opération interne", 20.0))
+        self.assertEqual(line["is_current_version"], 1)
+
+    def test_margin_stats_match_cost_lines(self):
+        """Les marges agrégées en SQL correspondent aux lignes de coût."""
+        stats = self.db.get_margin_stats([self.project_id])
+
+        self.assertEqual(list(stats), [self.project_id])
+        self.assertAlmostEqual(stats[self.project_id]["avg_margin"], 20.0)
+        self.assertEqual(stats[self.project_id]["lines"], 1)
+        self.assertEqual(stats[self.project_id]["typology_margins"], {"Mécanique": 20.0})
+        self.assertEqual(len(self.db.get_margin_stats()), 2)
+
+    def test_reindexing_replaces_rows(self):
+        """Une réindexation remplace les lignes au lieu de les dupliquer."""
+        write_legacy_file(self.file_a, "REF-A")
+        stat = os.stat(self.file_a)
+        os.utime(self.file_a, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        self.indexer._index_worker(self.root, None, None)
+
+        operations, cost_lines = self.db.get_project_structure(self.project_id)
+        self.assertEqual((len(operations), len(cost_lines)), (1, 1))
+
+    def test_deleted_project_drops_rows(self):
+        """La suppression d'un projet supprime sa structure indexée."""
+        self.db.delete_project(self.project_id)
+
+        self.assertEqual(self.db.get_project_structure(self.project_id), ([], []))
+        self.assertNotIn(self.project_id, self.db.get_margin_stats())
+
+
+if __name__ == '__main__':
+    unittest.main()
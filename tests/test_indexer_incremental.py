@@ -0,0 +1,117 @@
+# tests/test_indexer_incremental.py
+"""
+Tests pour l'indexation incrémentale (signature taille / mtime / inode).
+"""
+
+import unittest
+import tempfile
+import os
+import shutil
+import sqlite3
+import threading
+from unittest import mock
+from infrastructure.database import Database
+from infrastructure.indexer import Indexer
+from tests.test_legacy_migration_job import write_legacy_file
+
+
+class TestIndexerIncremental(unittest.TestCase):
+    """Tests pour Indexer._index_worker en mode incrémental."""
+
+    def setUp(self):
+        """Préparation : deux projets dans un dossier temporaire, déjà indexés."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.root = os.path.join(self.temp_dir, "quotes")
+        os.makedirs(self.root)
+        self.file_a = os.path.join(self.root, "a.mwq")
+        self.file_b = os.path.join(self.root, "b.mwq")
+        write_legacy_file(self.file_a, "REF-A")
+        write_legacy_file(self.file_b, "REF-B")
+        self.db = Database(os.path.join(self.temp_dir, "test.db"))
+        self.indexer = Indexer(self.db, max_workers=2)
+        self.indexer._index_worker(self.root, None, None)
+
+    def tearDown(self):
+        """Nettoyage après tests."""
+        self.db.close()
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def test_first_run_reports_new_files(self):
+        """Le premier passage indexe tout et stocke la signature des fichiers."""
+        self.assertEqual(sorted(self.indexer.last_run_stats["new"]), [self.file_a, self.file_b])
+        signature = self.db.get_file_signatures(self.root)[self.file_a]
+        stat = os.stat(self.file_a)
+        self.assertEqual(signature[:3], (stat.st_size, stat.st_mtime_ns, stat.st_ino))
+
+    def test_unchanged_files_are_not_reloaded(self):
+        """Un second passage sans modification ne recharge aucun fichier."""
+        counts = []
+        self.indexer._index_worker(self.root, None, counts.append)
+
+        stats = self.indexer.last_run_stats
+        self.assertEqual(stats["new"] + stats["changed"], [])
+        self.assertEqual(stats["unchanged"], 2)
+        self.assertEqual(counts, [2])
+
+    def test_changed_and_removed_files_are_reported(self):
+        """Les fichiers modifiés et supprimés sont distingués."""
+        write_legacy_file(self.file_a, "REF-A2")
+        stat = os.stat(self.file_a)
+        os.utime(self.file_a, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        os.remove(self.file_b)
+
+        self.indexer._index_worker(self.root, None, None)
+
+        stats = self.indexer.last_run_stats
+        self.assertEqual(stats["changed"], [self.file_a])
+        self.assertEqual(stats["removed"], [self.file_b])
+        self.assertEqual(stats["unchanged"], 0)
+        refs = {p["reference"] for p in self.db.search_projects(include_missing=False)}
+        self.assertEqual(refs, {"REF-A2"})
+
+    def test_moved_file_is_reconnected(self):
+        """Un fichier déplacé est rattaché à sa ligne existante."""
+        row_id = self.db.search_projects(global_search="REF-B")[0]["id"]
+        moved = os.path.join(self.root, "moved.mwq")
+        os.rename(self.file_b, moved)
+
+        self.indexer._index_worker(self.root, None, None)
+
+        rows = self.db.search_projects(global_search="REF-B", include_missing=True)
+        self.assertEqual([(r["id"], r["filepath"]) for r in rows], [(row_id, moved)])
+
+    def test_unreadable_file_does_not_block_pipeline(self):
+        """Un fichier illisible est compté en erreur, les autres sont indexés."""
+        with open(os.path.join(self.root, "broken.mwq"), "w", encoding="utf-8") as f:
+            f.write("{not json")
+        for i in range(20):
+            write_legacy_file(os.path.join(self.root, f"c{i}.mwq"), f"REF-C{i}")
+
+        counts = []
+        self.indexer._index_worker(self.root, None, counts.append)
+
+        self.assertEqual(len(self.indexer.last_run_stats["new"]), 20)
+        self.assertEqual(counts, [22])
+        self.assertEqual(len(self.db.search_projects()), 22)
+
+    def test_writer_failure_is_reported(self):
+        """Une erreur SQLite du writer arrête l'indexation et est rapportée, sans bloquer les lecteurs."""
+        for i in range(30):
+            write_legacy_file(os.path.join(self.root, f"c{i}.mwq"), f"REF-C{i}")
+        messages = []
+        with mock.patch.object(Database, "upsert_projects_bulk", side_effect=sqlite3.OperationalError("disque plein")):
+            worker = threading.Thread(target=self.indexer._index_worker, args=(self.root, messages.append, None),
+                                      daemon=True)
+            worker.start()
+            worker.join(timeout=30)
+
+        self.assertFalse(worker.is_alive())
+        self.assertIn("disque plein", self.indexer.last_run_stats["error"])
+        self.assertIn("disque plein", messages[-1])
+        # Rien n'est marqué manquant après un échec
+        self.assertEqual(self.indexer.last_run_stats["removed"], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
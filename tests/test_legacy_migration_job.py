@@ -0,0 +1,171 @@
+# tests/test_legacy_migration_job.py
+"""
+Tests pour la migration parallèle JSON -> ZIP (journal, reprise, rollback).
+"""
+
+import unittest
+import tempfile
+import os
+import json
+import shutil
+from infrastructure.database import Database
+from infrastructure.persistence import PersistenceService
+from infrastructure.legacy_migration_job import LegacyMigrationJob, BACKUP_SUFFIX
+
+
+def write_legacy_file(path, reference):
+    """Écrit un fichier .mwq au format legacy v1.0 (JSON brut)."""
+    data = {
+        "name": f"Projet {reference}",
+        "reference": reference,
+        "client": "ACME",
+        "sale_quantities": [10, 100],
+        "operations": [{
+            "code": "OP10",
+            "label": "Usinage",
+            "typology": "Mécanique",
+            "costs": {
+                "Tournage": {
+                    "name": "Tournage",
+                    "cost_type": "Opération interne",
+                    "pricing": {"pricing_type": "Par unité", "unit_price": 0.0},
+                    "fixed_time": 1.0,
+                    "per_piece_time": 0.1,
+                    "hourly_rate": 60.0,
+                    "margin_rate": 20.0,
+                },
+            },
+        }],
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+class TestLegacyMigrationJob(unittest.TestCase):
+    """Tests pour LegacyMigrationJob."""
+
+    def setUp(self):
+        """Préparation : deux fichiers legacy JSON dans un dossier temporaire."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.root = os.path.join(self.temp_dir, "quotes")
+        os.makedirs(os.path.join(self.root, "sub"))
+        self.file_a = os.path.join(self.root, "job1.mwq")
+        self.file_b = os.path.join(self.root, "sub", "job2.mwq")
+        write_legacy_file(self.file_a, "REF-A")
+        write_legacy_file(self.file_b, "REF-B")
+        self.db = Database(os.path.join(self.temp_dir, "test.db"))
+        self.job = LegacyMigrationJob(self.db, max_workers=2)
+
+    def tearDown(self):
+        """Nettoyage après tests."""
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def test_run_converts_and_keeps_backups(self):
+        """Les fichiers sont convertis et l'original est conservé."""
+        stats = self.job.run(self.root)
+
+        self.assertEqual(stats["converted"], 2)
+        self.assertEqual(stats["failed"], 0)
+        for path in (self.file_a, self.file_b):
+            self.assertTrue(PersistenceService.is_zip_format(path))
+            self.assertTrue(os.path.exists(path + BACKUP_SUFFIX))
+        project = PersistenceService.load_project(self.file_a)
+        self.assertEqual(project.reference, "REF-A")
+        self.assertIn("Tournage", project.operations[0].costs)
+
+    def test_second_run_skips_zip_files(self):
+        """Un second lot ne reconvertit pas les fichiers déjà ZIP."""
+        self.job.run(self.root)
+        stats = self.job.run(self.root)
+
+        self.assertEqual(stats["converted"], 0)
+        self.assertEqual(stats["skipped"], 2)
+
+    def test_resume_skips_journaled_paths(self):
+        """La reprise d'un lot ignore les chemins déjà journalisés."""
+        batch_id = self.job.new_batch_id()
+        self.db.start_migration_batch(batch_id, self.root)
+        self.db.record_migration_entry(batch_id, self.file_a, "done")
+
+        self.assertEqual(self.job.find_interrupted_batch(), batch_id)
+        stats = self.job.resume(batch_id)
+
+        self.assertEqual(stats["total"], 1)
+        self.assertEqual(stats["resumed_skipped"], 1)
+        self.assertFalse(PersistenceService.is_zip_format(self.file_a))
+        self.assertTrue(PersistenceService.is_zip_format(self.file_b))
+        self.assertIsNone(self.job.find_interrupted_batch())
+
+    def test_run_or_resume_continues_interrupted_batch(self):
+        """Une nouvelle migration de la même racine reprend le lot interrompu."""
+        batch_id = self.job.new_batch_id()
+        self.db.start_migration_batch(batch_id, self.root)
+        self.db.record_migration_entry(batch_id, self.file_a, "done")
+        other_root = os.path.join(self.temp_dir, "autre")
+        os.makedirs(other_root)
+
+        self.assertIsNone(self.job.find_interrupted_batch(other_root))
+        stats = self.job.run_or_resume(os.path.join(self.root, ""))
+
+        self.assertEqual(stats["batch_id"], batch_id)
+        self.assertEqual(stats["resumed_skipped"], 1)
+        self.assertEqual(len(self.db.get_migration_batches()), 1)
+
+    def test_purge_backups(self):
+        """La purge supprime les sauvegardes d'un lot validé, qui ne peut plus être annulé."""
+        stats = self.job.run(self.root)
+
+        self.assertEqual(self.job.purge_backups(stats["batch_id"]), 2)
+        self.assertFalse(os.path.exists(self.file_a + BACKUP_SUFFIX))
+        self.assertEqual(self.db.get_migration_batches()[0]["status"], "purged")
+
+    def test_rollback_restores_original_files(self):
+        """Le rollback restaure les fichiers JSON d'origine."""
+        with open(self.file_a, "rb") as f:
+            original = f.read()
+
+        stats = self.job.run(self.root)
+        rollback = self.job.rollback(stats["batch_id"])
+
+        self.assertEqual(rollback["restored"], 2)
+        with open(self.file_a, "rb") as f:
+            self.assertEqual(f.read(), original)
+        self.assertFalse(os.path.exists(self.file_a + BACKUP_SUFFIX))
+        entries = self.db.get_migration_entries(stats["batch_id"])
+        self.assertTrue(all(e["status"] == "rolled_back" for e in entries))
+
+    def test_rollback_keeps_files_changed_since_migration(self):
+        """Le rollback n'écrase pas un fichier modifié depuis la migration ; il le signale."""
+        stats = self.job.run(self.root)
+        project = PersistenceService.load_project(self.file_a)
+        project.client = "Client modifié"
+        PersistenceService.save_project(project, self.file_a)
+
+        rollback = self.job.rollback(stats["batch_id"])
+
+        self.assertEqual(rollback["restored"], 1)
+        self.assertEqual(rollback["changed"], [self.file_a])
+        self.assertEqual(PersistenceService.load_project(self.file_a).client, "Client modifié")
+        self.assertTrue(os.path.exists(self.file_a + BACKUP_SUFFIX))
+        self.assertFalse(PersistenceService.is_zip_format(self.file_b))
+        done = self.db.get_migration_entries(stats["batch_id"], status="done")
+        self.assertEqual([e["filepath"] for e in done], [self.file_a])
+
+    def test_failed_file_is_journaled(self):
+        """Un fichier illisible est journalisé en échec sans bloquer le lot."""
+        broken = os.path.join(self.root, "broken.mwq")
+        with open(broken, "w", encoding="utf-8") as f:
+            f.write("{not json")
+
+        stats = self.job.run(self.root)
+
+        self.assertEqual(stats["failed"], 1)
+        self.assertEqual(stats["converted"], 2)
+        self.assertFalse(os.path.exists(broken + BACKUP_SUFFIX))
+        failed = self.db.get_migration_entries(stats["batch_id"], status="failed")
+        self.assertEqual([e["filepath"] for e in failed], [broken])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+# tests/test_project_prices.py
+"""
+Tests pour la table project_prices (prix par version et quantité de vente).
+"""
+
+import unittest
+import tempfile
+import os
+import shutil
+from infrastructure.database import Database
+from infrastructure.indexer import Indexer
+from infrastructure.persistence import PersistenceService
+from tests.test_legacy_migration_job import write_legacy_file
+
+
+class TestProjectPrices(unittest.TestCase):
+    """Tests pour l'indexation et la recherche par prix."""
+
+    def setUp(self):
+        """Préparation : deux projets indexés, le second deux fois plus cher."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.root = os.path.join(self.temp_dir, "quotes")
+        os.makedirs(self.root)
+        self.file_a = os.path.join(self.root, "a.mwq")
+        self.file_b = os.path.join(self.root, "b.mwq")
+        write_legacy_file(self.file_a, "REF-A")
+        write_legacy_file(self.file_b, "REF-B")
+        project = PersistenceService.load_project(self.file_b)
+        project.operations[0].costs["Tournage"].hourly_rate = 120.0
+        PersistenceService.save_project(project, self.file_b)
+        self.db = Database(os.path.join(self.temp_dir, "test.db"))
+        Indexer(self.db, max_workers=2)._index_worker(self.root, None, None)
+        self.ids = {p["reference"]: p["id"] for p in self.db.search_projects()}
+
+    def tearDown(self):
+        """Nettoyage après tests."""
+        self.db.close()
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def test_prices_match_project_total_price(self):
+        """Chaque quantité de vente a son prix, identique au calcul du projet."""
+        project = PersistenceService.load_project(self.file_a)
+        prices = self.db.get_project_prices([self.ids["REF-A"]])[self.ids["REF-A"]]
+
+        self.assertEqual(sorted(prices), [10, 100])
+        for qty, row in prices.items():
+            self.assertAlmostEqual(row["unit_price"], project.total_price(qty))
+            self.assertAlmostEqual(row["fixed_part"] + row["variable_part"], row["unit_price"])
+        # Opération interne : 1 h + 0,1 h/pièce
+        self.assertAlmostEqual(prices[10]["internal_hours"], 2.0)
+        self.assertEqual(prices[10]["purchase_sale"], 0.0)
+
+    def test_search_filters_and_sorts_by_price(self):
+        """La recherche filtre et trie sur le prix à une quantité donnée."""
+        rows = self.db.search_projects(price_quantity=100, sort_by="price_at_qty", sort_order="DESC")
+        self.assertEqual([r["reference"] for r in rows], ["REF-B", "REF-A"])
+        price_a = rows[1]["price_at_qty"]
+
+        rows = self.db.search_projects(price_quantity=100, max_price=price_a)
+        self.assertEqual([r["reference"] for r in rows], ["REF-A"])
+
+        rows = self.db.search_projects(global_search="REF", price_quantity=50)
+        self.assertEqual({r["price_at_qty"] for r in rows}, {None})
+
+    def test_deleted_project_drops_prices(self):
+        """La suppression d'un projet supprime ses prix indexés."""
+        self.db.delete_project(self.ids["REF-A"])
+
+        self.assertEqual(list(self.db.get_project_prices()), [self.ids["REF-B"]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -8,6 +8,7 @@ import tempfile
 import os
 import shutil
 import datetime
+import threading
 from infrastructure.database import Database
 from infrastructure.quote_numbering_service import QuoteNumberingService
 
@@ -137,6 +138,43 @@ class TestQuoteNumbering(unittest.TestCase):
         
         self.assertEqual(stats["date"], today.isoformat())
         self.assertEqual(stats["total_quotes"], 2)  # 2 entrées (OD, QT)
+        self.assertEqual(stats["by_prefix"], {"OD": 2, "QT": 1})
+
+    def test_reserve_block(self):
+        """Test réservation d'un bloc de numéros consécutifs."""
+        self.numbering.get_next_quote_number("OD")
+        block = self.numbering.reserve_block(3, "OD")
+
+        self.assertEqual([num.split("_")[1] for num in block], ["002", "003", "004"])
+        _, cnt = self.numbering.get_next_quote_number("OD")
+        self.assertEqual(cnt, 5)
+        with self.assertRaises(ValueError):
+            self.numbering.reserve_block(0)
+
+    def test_concurrent_allocation_is_unique(self):
+        """Test unicité des numéros entre threads et connexions (postes) concurrents."""
+        other_db = Database(self.db_path)
+        numbers = []
+        lock = threading.Lock()
+
+        def allocate(db):
+            service = QuoteNumberingService(db)
+            for _ in range(20):
+                quote_num, _ = service.get_next_quote_number("OD")
+                with lock:
+                    numbers.append(quote_num)
+
+        threads = [threading.Thread(target=allocate, args=(db,))
+                   for db in (self.db, other_db, self.db, other_db)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        other_db.close()
+
+        self.assertEqual(len(numbers), 80)
+        self.assertEqual(len(set(numbers)), 80)
+        self.assertEqual(self.numbering.get_current_counter("OD"), 80)
 
 
 class TestDatabaseQuoteNumbering(unittest.TestCase):
@@ -187,6 +225,21 @@ class TestDatabaseQuoteNumbering(unittest.TestCase):
         self.assertEqual(counters["OD"], 10)
         self.assertEqual(counters["QT"], 5)
 
+    def test_export_numbering_stats_for_range(self):
+        """Test statistiques sur une plage de dates (bornes incluses)."""
+        day = datetime.date(2026, 2, 2)
+        self.db.update_quote_counter(day - datetime.timedelta(days=1), "OD", 7)
+        self.db.update_quote_counter(day, "OD", 3)
+        self.db.update_quote_counter(day, "QT", 2)
+        self.db.update_quote_counter(day + datetime.timedelta(days=1), "OD", 4)
+        self.db.update_quote_counter(day + datetime.timedelta(days=2), "OD", 9)
+
+        stats = self.db.export_quote_numbering_stats(day, day + datetime.timedelta(days=1))
+
+        self.assertEqual(stats["total_quotes"], 9)
+        self.assertEqual(stats["by_prefix"], {"OD": 7, "QT": 2})
+        self.assertEqual(stats["by_date"], {"2026-02-02": {"OD": 3, "QT": 2}, "2026-02-03": {"OD": 4}})
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,95 @@
+# tests/test_quote_roots.py
+"""
+Tests pour l'indexation de plusieurs racines de devis (SSD, partage, NAS).
+"""
+
+import unittest
+import tempfile
+import os
+import shutil
+from infrastructure.configuration import ConfigurationService, MAX_ROOT_IO_WORKERS
+from infrastructure.database import Database
+from infrastructure.directory_scanner import DirectoryScanner
+from infrastructure.indexer import Indexer
+from tests.test_legacy_migration_job import write_legacy_file
+
+
+class TestQuoteRoots(unittest.TestCase):
+    """Tests pour Indexer.index_roots / _index_worker avec plusieurs racines."""
+
+    def setUp(self):
+        """Préparation : deux racines de devis avec leurs projets."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.active = os.path.join(self.temp_dir, "actifs")
+        self.archive = os.path.join(self.temp_dir, "archives")
+        for i, root in enumerate((self.active, self.archive)):
+            for sub in ("2024", "2025"):
+                os.makedirs(os.path.join(root, sub))
+                write_legacy_file(os.path.join(root, sub, f"p{i}.mwq"), f"REF-{i}-{sub}")
+        self.roots = [{'path': self.active, 'io_workers': 8}, {'path': self.archive, 'io_workers': 1}]
+        self.db = Database(os.path.join(self.temp_dir, "test.db"))
+        self.indexer = Indexer(self.db, max_workers=2)
+
+    def tearDown(self):
+        """Nettoyage après tests."""
+        self.db.close()
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def test_roots_feed_one_index_queryable_per_root(self):
+        """Les racines alimentent un seul index, interrogeable racine par racine."""
+        self.indexer._index_worker(self.roots, None, None)
+
+        self.assertEqual(len(self.indexer.last_run_stats["new"]), 4)
+        self.assertEqual(self.db.count_projects(), 4)
+        self.assertEqual(self.db.count_projects(root_path=self.archive), 2)
+        references = {r["reference"] for r in self.db.search_projects(root_path=self.active)}
+        self.assertEqual(references, {"REF-0-2024", "REF-0-2025"})
+        self.assertEqual(self.indexer.last_run_stats["roots"][self.archive]["files"], 2)
+
+        # Second passage : état incrémental propre à chaque racine
+        self.indexer._index_worker(self.roots, None, None)
+        self.assertEqual(self.indexer.last_run_stats["unchanged"], 4)
+        for root in (self.active, self.archive):
+            self.assertEqual(len(self.db.get_scanned_dirs(root)), 3)
+
+    def test_unreachable_root_keeps_its_projects(self):
+        """Une racine injoignable (NAS éteint) n'est pas marquée manquante ; les autres sont traitées."""
+        self.indexer._index_worker(self.roots, None, None)
+        os.rename(self.archive, self.archive + "-hors-ligne")
+        os.remove(os.path.join(self.active, "2024", "p0.mwq"))
+
+        self.indexer._index_worker(self.roots, None, None)
+        stats = self.indexer.last_run_stats
+        self.assertFalse(stats["roots"][self.archive]["reachable"])
+        self.assertEqual(stats["removed"], [os.path.join(self.active, "2024", "p0.mwq")])
+        self.assertEqual(self.db.count_projects(root_path=self.archive), 2)
+
+    def test_parallel_listing_finds_same_files(self):
+        """La lecture parallèle des dossiers trouve les mêmes fichiers que la lecture séquentielle."""
+        for i in range(20):
+            os.makedirs(os.path.join(self.archive, "lot", f"d{i}"))
+            write_legacy_file(os.path.join(self.archive, "lot", f"d{i}", "x.mwq"), f"LOT-{i}")
+        sequential = sorted(DirectoryScanner().list_files(self.archive))
+        parallel = DirectoryScanner(io_workers=4).list_files(self.archive)
+        self.assertEqual(sorted(parallel), sequential)
+        self.assertEqual(len(parallel), 22)
+
+    def test_configured_roots(self):
+        """La configuration liste le dossier principal en premier, puis les racines ajoutées."""
+        config = ConfigurationService(os.path.join(self.temp_dir, "config.json"))
+        config.set_quotes_root_folder(self.active)
+        config.add_quote_root(self.archive, "Archives", io_workers=2)
+        config.set_quote_root_io_workers(self.active, 999)
+
+        roots = ConfigurationService(config.config_path).get_quote_roots()
+        self.assertEqual([r['path'] for r in roots], [self.active, self.archive])
+        self.assertEqual(roots[0]['io_workers'], MAX_ROOT_IO_WORKERS)
+        self.assertEqual(roots[1]['label'], "Archives")
+
+        self.assertTrue(config.remove_quote_root(self.archive))
+        self.assertEqual([r['path'] for r in config.get_quote_roots()], [self.active])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+# tests/test_reconcile_engine.py
+"""
+Tests pour ReconcileEngine (vérification parallèle des fichiers indexés).
+"""
+
+import unittest
+import tempfile
+import os
+import shutil
+import threading
+from infrastructure.database import Database
+from infrastructure.indexer import Indexer
+from infrastructure.reconcile_engine import ReconcileEngine
+from tests.test_legacy_migration_job import write_legacy_file
+
+
+class TestReconcileEngine(unittest.TestCase):
+    """Tests pour ReconcileEngine.reconcile."""
+
+    def setUp(self):
+        """Préparation : trois projets indexés."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.root = os.path.join(self.temp_dir, "quotes")
+        os.makedirs(self.root)
+        self.files = [os.path.join(self.root, f"{name}.mwq") for name in ("a", "b", "c")]
+        for path in self.files:
+            write_legacy_file(path, os.path.basename(path))
+        self.db = Database(os.path.join(self.temp_dir, "test.db"))
+        Indexer(self.db, max_workers=2)._index_worker(self.root, None, None)
+        self.engine = ReconcileEngine(self.db, max_workers=4)
+
+    def tearDown(self):
+        """Nettoyage après tests."""
+        self.db.close()
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def _missing(self):
+        return sorted(p["filepath"] for p in self.db.get_missing_projects())
+
+    def test_missing_and_found_again(self):
+        """Un fichier disparu est marqué manquant puis retrouvé."""
+        moved = self.files[0] + ".bak"
+        os.rename(self.files[0], moved)
+
+        progress = []
+        stats = self.engine.reconcile(progress_callback=lambda done, total: progress.append((done, total)))
+        self.assertEqual((stats["checked"], stats["missing"], stats["found"]), (3, 1, 0))
+        self.assertEqual(self._missing(), [self.files[0]])
+        self.assertEqual(progress[-1], (3, 3))
+
+        os.rename(moved, self.files[0])
+        stats = self.engine.reconcile()
+        self.assertEqual((stats["missing"], stats["found"]), (0, 1))
+        self.assertEqual(self._missing(), [])
+
+    def test_stop_event_interrupts(self):
+        """Un arrêt demandé laisse les statuts inchangés et le signale."""
+        os.remove(self.files[1])
+        stop = threading.Event()
+        stop.set()
+
+        stats = self.engine.reconcile(stop_event=stop)
+
+        self.assertTrue(stats["interrupted"])
+        self.assertEqual(self._missing(), [])
+
+    def test_delete_missing_files_is_set_based(self):
+        """Les entrées manquantes sont supprimées avec leurs données dérivées."""
+        os.remove(self.files[2])
+        self.assertEqual(self.db.mark_missing_files(), 1)
+
+        self.assertEqual(self.db.delete_missing_files(), 1)
+        self.assertEqual(len(self.db.search_projects(include_missing=True)), 2)
+        self.assertEqual(len(self.db.get_project_prices()), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+# tests/test_schema_migrations.py
+"""
+Tests pour les migrations de schéma versionnées (PRAGMA user_version).
+"""
+
+import unittest
+import tempfile
+import os
+import shutil
+import sqlite3
+from unittest import mock
+from infrastructure.database import Database, SCHEMA_MIGRATIONS, SCHEMA_VERSION
+from infrastructure.analytics_service import AnalyticsService
+from tests.test_database_bulk_upsert import make_row
+
+
+class TestSchemaMigrations(unittest.TestCase):
+    """Tests pour Database.init_db."""
+
+    def setUp(self):
+        """Préparation : répertoire temporaire."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, "test.db")
+        self.db = None
+
+    def tearDown(self):
+        """Nettoyage après tests."""
+        if self.db is not None:
+            self.db.close()
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def _tables(self):
+        rows = self.db.get_connection().execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        return {row[0] for row in rows}
+
+    def test_new_database_reaches_current_version(self):
+        """Une base neuve est créée au dernier schéma, tables d'analyse comprises."""
+        self.db = Database(self.db_path)
+        self.assertEqual(self.db.schema_version(), SCHEMA_VERSION)
+        tables = self._tables()
+        for table in ("projects", "cost_lines", "project_prices", "thumbnails", "quote_numbers",
+                      "migration_journal", "analytics_project_cache", "analytics_cache_meta"):
+            self.assertIn(table, tables)
+
+        self.db.upsert_project(make_row(os.path.join(self.temp_dir, "a.mwq"), "REF-A"))
+        AnalyticsService(self.db).refresh_incremental_cache()
+        count = self.db.get_connection().execute("SELECT COUNT(*) FROM analytics_project_cache").fetchone()[0]
+        self.assertEqual(count, 1)
+
+    def test_current_database_runs_no_migration(self):
+        """À l'ouverture d'une base à jour, aucune étape de migration n'est rejouée."""
+        self.db = Database(self.db_path)
+        self.db.close()
+        with mock.patch.object(Database, SCHEMA_MIGRATIONS[0]) as step:
+            self.db = Database(self.db_path)
+            self.db.init_quote_numbering_table()
+            step.assert_not_called()
+
+    def test_unversioned_database_is_upgraded(self):
+        """Une base antérieure au versionnage (user_version = 0, colonnes manquantes) est migrée une fois."""
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("CREATE TABLE projects (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, "
+                     "reference TEXT, client TEXT, filepath TEXT UNIQUE, drawing_filename TEXT, "
+                     "last_modified TIMESTAMP)")
+        conn.execute("INSERT INTO projects (name, reference, client, filepath) "
+                     "VALUES ('Pièce', 'REF-OLD', 'ACME', 'old.mwq')")
+        conn.commit()
+        conn.close()
+
+        self.db = Database(self.db_path)
+        self.assertEqual(self.db.schema_version(), SCHEMA_VERSION)
+        columns = {row[1] for row in self.db.get_connection().execute("PRAGMA table_info(projects)")}
+        self.assertIn("file_inode", columns)
+        self.assertIn("is_missing", columns)
+        self.assertEqual([r["reference"] for r in self.db.search_projects(global_search="REF-OLD")], ["REF-OLD"])
+
+    def test_failed_migration_is_rolled_back(self):
+        """Une étape en échec n'avance pas la version : elle sera rejouée à la prochaine ouverture."""
+        with mock.patch.object(Database, SCHEMA_MIGRATIONS[-1], side_effect=sqlite3.OperationalError("disque plein")):
+            with self.assertRaises(sqlite3.OperationalError):
+                Database(self.db_path)
+        self.db = Database(self.db_path)
+        self.assertEqual(self.db.schema_version(), SCHEMA_VERSION)
+        self.assertIn("analytics_cache_meta", self._tables())
+
+
+if __name__ == '__main__':
+    unittest.main()
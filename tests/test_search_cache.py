@@ -0,0 +1,90 @@
+# tests/test_search_cache.py
+"""
+Tests pour le cache des résultats de recherche (invalidé par génération d'écriture).
+"""
+
+import unittest
+import tempfile
+import os
+import shutil
+import sqlite3
+from unittest import mock
+from infrastructure.database import Database
+from tests.test_database_bulk_upsert import make_row
+
+
+def make_indexed_row(filepath, reference):
+    """Ligne de projet avec son document plein texte."""
+    row = make_row(filepath, reference)
+    row['search_document'] = {'reference': reference, 'name': row['name'], 'client': row['client']}
+    return row
+
+
+class TestSearchCache(unittest.TestCase):
+    """Tests pour le cache de search_projects / count_projects."""
+
+    def setUp(self):
+        """Préparation : trois projets indexés."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, "test.db")
+        self.db = Database(self.db_path)
+        self.paths = [os.path.join(self.temp_dir, f"p{i}.mwq") for i in range(3)]
+        self.db.upsert_projects_bulk([make_indexed_row(p, f"REF-{i}") for i, p in enumerate(self.paths)])
+
+    def tearDown(self):
+        """Nettoyage après tests."""
+        self.db.close()
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def _search(self, db=None):
+        return (db or self.db).search_projects(global_search="REF", sort_by="reference", sort_order="ASC")
+
+    def test_repeated_search_is_served_from_cache(self):
+        """Une recherche répétée (même terme normalisé) ne relance pas de requête."""
+        first = self._search()
+        with mock.patch.object(self.db, "_search_projects", wraps=self.db._search_projects) as query:
+            again = self.db.search_projects(global_search="  REF ", sort_by="reference", sort_order="asc")
+            again[0]["reference"] = "modifié"
+            self.assertEqual(query.call_count, 0)
+            self.assertEqual(self._search()[0]["reference"], "REF-0")
+        self.assertEqual([r["id"] for r in again], [r["id"] for r in first])
+
+    def test_writes_invalidate_cache(self):
+        """Ajout, fichier manquant et suppression sont visibles immédiatement."""
+        self.assertEqual(len(self._search()), 3)
+        self.assertEqual(self.db.count_projects(global_search="REF"), 3)
+
+        self.db.upsert_project(make_indexed_row(os.path.join(self.temp_dir, "p3.mwq"), "REF-3"))
+        self.assertEqual(len(self._search()), 4)
+        self.assertEqual(self.db.count_projects(global_search="REF"), 4)
+
+        self.db.mark_missing(self.paths[0])
+        self.assertEqual(len(self._search()), 3)
+
+        self.db.delete_project(self._search()[0]["id"])
+        self.assertEqual(len(self._search()), 2)
+        self.assertEqual(self.db.count_projects(global_search="REF"), 2)
+
+    def test_writes_from_other_instances_and_connections(self):
+        """Les écritures d'une autre instance ou d'une autre connexion invalident aussi le cache."""
+        self.assertEqual(len(self._search()), 3)
+        other = Database(self.db_path)
+        try:
+            other.mark_missing(self.paths[1])
+            self.assertEqual(len(self._search()), 2)
+        finally:
+            other.close()
+
+        # Connexion externe (autre processus) : détectée par PRAGMA data_version
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute("UPDATE projects SET is_missing = 1 WHERE filepath = ?", (self.paths[2],))
+            conn.commit()
+        finally:
+            conn.close()
+        self.assertEqual(len(self._search()), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+# tests/test_search_pagination.py
+"""
+Tests pour la pagination des recherches (LIMIT/OFFSET, keyset, SearchResultPager).
+"""
+
+import unittest
+import tempfile
+import os
+import shutil
+from infrastructure.database import Database
+from infrastructure.search_results import SearchResultPager
+from tests.test_database_bulk_upsert import make_row
+
+
+class TestSearchPagination(unittest.TestCase):
+    """Tests pour search_projects(limit/after) et SearchResultPager."""
+
+    def setUp(self):
+        """Préparation : 55 projets, dont des clients vides et des doublons de clé de tri."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.db = Database(os.path.join(self.temp_dir, "test.db"))
+        rows = []
+        for i in range(55):
+            row = make_row(os.path.join(self.temp_dir, f"p{i:02d}.mwq"), f"REF-{i:02d}")
+            row['client'] = None if i % 7 == 0 else f"CLIENT-{i % 4}"
+            rows.append(row)
+        self.db.upsert_projects_bulk(rows)
+
+    def tearDown(self):
+        """Nettoyage après tests."""
+        self.db.close()
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def _ids(self, rows):
+        return [r["id"] for r in rows]
+
+    def test_keyset_pages_match_full_query(self):
+        """Les pages keyset enchaînées redonnent exactement le tri complet, NULL compris."""
+        for order in ("ASC", "DESC"):
+            full = self.db.search_projects(sort_by="client", sort_order=order)
+            pages, after = [], None
+            while True:
+                page = self.db.search_projects(sort_by="client", sort_order=order, limit=10, after=after)
+                if not page:
+                    break
+                pages.extend(page)
+                after = Database.search_key(page[-1], "client")
+            self.assertEqual(self._ids(pages), self._ids(full), order)
+
+    def test_offset_pages_and_count(self):
+        """LIMIT/OFFSET et count_projects suivent les mêmes critères."""
+        full = self.db.search_projects(global_search="REF-1", sort_by="reference", sort_order="ASC")
+        page = self.db.search_projects(global_search="REF-1", sort_by="reference", sort_order="ASC",
+                                       limit=4, offset=3)
+
+        self.assertEqual(self._ids(page), self._ids(full)[3:7])
+        self.assertEqual(self.db.count_projects(global_search="REF-1"), len(full))
+
+    def test_pager_serves_rows_by_index(self):
+        """Le pager charge les pages à la demande et n'en garde qu'un nombre limité."""
+        full = self.db.search_projects(sort_by="reference", sort_order="DESC")
+        pager = SearchResultPager(self.db, sort_by="reference", sort_order="DESC", page_size=8, max_pages=2)
+
+        self.assertEqual(len(pager), 55)
+        self.assertEqual(pager[54]["id"], full[54]["id"])
+        self.assertEqual(self._ids(pager.rows()), self._ids(full))
+        self.assertLessEqual(len(pager._pages), 2)
+        self.assertNotIn(55, pager)
+        self.assertIsNone(pager.get(55))
+        self.assertEqual(pager.index_of(full[20]["filepath"]), 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+# tests/test_streaming_stats.py
+"""
+Tests pour les statistiques en flux (moyenne/variance de Welford, t-digest).
+"""
+
+import unittest
+import random
+import statistics
+from infrastructure.streaming_stats import RunningStats, QuantileSketch
+from infrastructure.template_manager import TemplateManager
+
+
+class TestStreamingStats(unittest.TestCase):
+    """Tests pour RunningStats et QuantileSketch."""
+
+    def setUp(self):
+        """Préparation : tirages reproductibles."""
+        self.random = random.Random(42)
+
+    def test_small_samples_match_statistics(self):
+        """Sur de petits échantillons, les résultats sont ceux du module statistics."""
+        for size in (1, 2, 3, 10, 101):
+            values = [self.random.uniform(0, 50) for _ in range(size)]
+            stats = RunningStats(values)
+            self.assertAlmostEqual(stats.mean, statistics.mean(values))
+            self.assertEqual((stats.min, stats.max), (min(values), max(values)))
+            if size > 1:
+                self.assertAlmostEqual(stats.variance, statistics.variance(values))
+            self.assertAlmostEqual(QuantileSketch(values).median, statistics.median(values))
+        self.assertEqual(RunningStats().mean, 0.0)
+        self.assertEqual(QuantileSketch().median, 0.0)
+
+    def test_merged_partials_equal_whole(self):
+        """Des agrégats partiels (un par worker) fusionnés donnent le total."""
+        values = [self.random.gauss(25, 8) for _ in range(5000)]
+        whole = RunningStats(values)
+        merged = RunningStats()
+        for i in range(4):
+            merged.merge(RunningStats(values[i::4]))
+        self.assertEqual(merged.count, whole.count)
+        self.assertAlmostEqual(merged.mean, whole.mean)
+        self.assertAlmostEqual(merged.variance, whole.variance)
+        self.assertEqual((merged.min, merged.max), (whole.min, whole.max))
+
+        small = QuantileSketch(values[:50]).merge(QuantileSketch(values[50:120]))
+        self.assertAlmostEqual(small.median, statistics.median(values[:120]))
+
+    def test_large_stream_stays_bounded(self):
+        """Sur un grand flux, la taille reste bornée et les quantiles restent précis."""
+        values = [self.random.lognormvariate(3, 1) for _ in range(100000)]
+        sketch = QuantileSketch()
+        for i in range(4):
+            sketch.merge(QuantileSketch(values[i::4]))
+        self.assertLess(len(sketch._centroids) + len(sketch._buffer), 5 * sketch.compression + 1)
+        ordered = sorted(values)
+        for q in (0.1, 0.5, 0.9):
+            exact = ordered[int(q * len(values))]
+            self.assertAlmostEqual(sketch.quantile(q), exact, delta=exact * 0.02)
+        self.assertEqual((sketch.quantile(0), sketch.quantile(1)), (ordered[0], ordered[-1]))
+
+    def test_template_medians(self):
+        """Le gabarit automatique reprend la médiane et l'unité la plus fréquente par type de coût."""
+        operations = [
+            {"costs": [{"cost_type": "Opération interne", "margin_rate": margin,
+                        "internal_operation": {"fixed_time_h": fixed, "hourly_rate": 60.0},
+                        "pricing": {"unit": unit}}]}
+            for margin, fixed, unit in ((10.0, 1.0, "pièce"), (30.0, 3.0, "kg"),
+                                        (20.0, 2.0, "kg"), (40.0, 8.0, "pièce"))
+        ]
+        payload = TemplateManager(None)._build_median_template_payload("Usinage", operations)
+        cost = payload["costs"][0]
+        self.assertEqual(cost["margin_rate"], 25.0)
+        self.assertEqual(cost["fixed_time"], 2.5)
+        self.assertEqual(cost["hourly_rate"], 60.0)
+        self.assertEqual(cost["unit"], "pièce")
+
+
+if __name__ == '__main__':
+    unittest.main()
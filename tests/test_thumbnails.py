@@ -0,0 +1,97 @@
+# tests/test_thumbnails.py
+"""
+Tests pour les vignettes de preview construites à l'indexation.
+"""
+
+import unittest
+import tempfile
+import os
+import io
+import base64
+import shutil
+from PIL import Image
+from domain.document import Document
+from infrastructure.database import Database
+from infrastructure.indexer import Indexer
+from infrastructure.persistence import PersistenceService
+from infrastructure.thumbnails import THUMBNAIL_HEIGHT, THUMBNAIL_WIDTH, build_thumbnail, make_thumbnail
+from tests.test_legacy_migration_job import write_legacy_file
+
+
+def png_bytes(width, height, color=(200, 30, 30)):
+    """Image PNG unie de la taille demandée."""
+    stream = io.BytesIO()
+    Image.new("RGB", (width, height), color).save(stream, format="PNG")
+    return stream.getvalue()
+
+
+class TestThumbnails(unittest.TestCase):
+    """Tests pour make_thumbnail et la table thumbnails."""
+
+    def setUp(self):
+        """Préparation : un projet ZIP avec une grande image de preview."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.root = os.path.join(self.temp_dir, "quotes")
+        os.makedirs(self.root)
+        self.filepath = os.path.join(self.root, "a.mwq")
+        write_legacy_file(self.filepath, "REF-A")
+        project = PersistenceService.load_project(self.filepath)
+        project.preview_image = Document(filename="preview.png",
+                                         data=base64.b64encode(png_bytes(1600, 1200)).decode("ascii"))
+        PersistenceService.save_project(project, self.filepath)
+
+        self.db = Database(os.path.join(self.temp_dir, "test.db"))
+        self.indexer = Indexer(self.db, max_workers=1)
+        self.indexer._index_worker(self.root, None, None)
+        self.project_id = self.db.search_projects()[0]["id"]
+
+    def tearDown(self):
+        """Nettoyage après tests."""
+        self.db.close()
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def test_make_thumbnail_fits_preview_area(self):
+        """La vignette a la taille de la zone de preview, image centrée sur fond gris."""
+        with Image.open(io.BytesIO(make_thumbnail(png_bytes(1600, 1200)))) as thumb:
+            self.assertEqual(thumb.size, (THUMBNAIL_WIDTH, THUMBNAIL_HEIGHT))
+            self.assertEqual(thumb.getpixel((THUMBNAIL_WIDTH // 2, THUMBNAIL_HEIGHT // 2)), (200, 30, 30))
+            self.assertEqual(thumb.getpixel((0, 0)), (240, 240, 240))
+        self.assertIsNone(make_thumbnail(b"not an image"))
+
+    def test_indexed_thumbnail(self):
+        """L'indexation stocke la preview réduite à la taille de la zone d'affichage."""
+        thumbnail = self.db.get_thumbnail(self.project_id)
+
+        self.assertIsNotNone(thumbnail)
+        with Image.open(io.BytesIO(thumbnail)) as thumb:
+            self.assertEqual((thumb.format, thumb.size), ("PNG", (THUMBNAIL_WIDTH, THUMBNAIL_HEIGHT)))
+
+    def test_preview_read_from_archive_entry(self):
+        """L'indexeur charge le projet sans sa preview et lit l'image directement dans l'archive."""
+        project, _ = PersistenceService.get_project_metadata(self.filepath)
+        self.assertEqual(project.preview_image.filename, "preview.png")
+        self.assertIsNone(project.preview_image.data)
+        self.assertEqual(PersistenceService.read_preview_image(self.filepath), png_bytes(1600, 1200))
+        self.assertEqual(build_thumbnail(self.filepath, project), self.db.get_thumbnail(self.project_id))
+
+    def test_thumbnail_follows_file_signature(self):
+        """Une vignette n'est plus servie si le fichier a changé, et disparaît avec l'image."""
+        # Signature du projet changée sans nouvelle vignette
+        with self.db.get_connection() as conn:
+            conn.execute("UPDATE projects SET file_mtime_ns = 1 WHERE id = ?", (self.project_id,))
+        self.assertIsNone(self.db.get_thumbnail(self.project_id))
+
+        project = PersistenceService.load_project(self.filepath)
+        project.preview_image = None
+        PersistenceService.save_project(project, self.filepath)
+        with self.db.get_connection() as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM thumbnails").fetchone()[0], 1)
+
+        self.indexer._index_worker(self.root, None, None)
+        with self.db.get_connection() as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM thumbnails").fetchone()[0], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
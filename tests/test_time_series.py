@@ -0,0 +1,113 @@
+# tests/test_time_series.py
+"""
+Tests pour les séries mensuelles de marge et de volume (fonctions de fenêtre SQL).
+"""
+
+import unittest
+import tempfile
+import os
+import shutil
+from datetime import date
+from infrastructure.analytics_service import AnalyticsService, _months_back
+from infrastructure.database import Database
+from infrastructure.indexer import Indexer
+from infrastructure.persistence import PersistenceService
+from tests.test_export_index import add_export
+from tests.test_legacy_migration_job import write_legacy_file
+
+
+class TestTimeSeries(unittest.TestCase):
+    """Tests pour AnalyticsService.get_time_series."""
+
+    def setUp(self):
+        """Préparation : trois devis exportés sur janvier, février et avril 2026."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.root = os.path.join(self.temp_dir, "quotes")
+        os.makedirs(self.root)
+        exports = {
+            "a.mwq": ("ACME", 20.0, [("OD260105_001", "05/01/2026"), ("OD260220_002", "20/02/2026")]),
+            "b.mwq": ("ACME", 40.0, [("OD260131_003", "31/01/2026")]),
+            "c.mwq": ("Globex", 30.0, [("OD260402_004", "02/04/2026")]),
+        }
+        for filename, (client, margin, history) in exports.items():
+            path = os.path.join(self.root, filename)
+            write_legacy_file(path, filename)
+            project = PersistenceService.load_project(path)
+            project.client = client
+            for cost in project.operations[0].costs.values():
+                cost.margin_rate = margin
+            for devis_ref, day in history:
+                add_export(project, devis_ref, day, 1)
+            PersistenceService.save_project(project, path)
+        # Un export sans date exploitable est ignoré
+        path = os.path.join(self.root, "d.mwq")
+        write_legacy_file(path, "d.mwq")
+        project = PersistenceService.load_project(path)
+        add_export(project, "OD000000_005", "", 1)
+        PersistenceService.save_project(project, path)
+
+        self.db = Database(os.path.join(self.temp_dir, "test.db"))
+        Indexer(self.db, max_workers=1)._index_worker(self.root, None, None)
+        self.service = AnalyticsService(self.db)
+
+    def tearDown(self):
+        """Nettoyage après tests."""
+        self.db.close()
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def test_monthly_series_with_rolling_margin(self):
+        """Un point par mois, à zéro sans export ; la marge glissante ignore les mois sans export."""
+        rows = self.service.get_time_series(rolling_months=2)
+        self.assertEqual([r["month"] for r in rows], ["2026-01", "2026-02", "2026-03", "2026-04"])
+        january, february, march, april = rows
+        self.assertEqual((march["export_count"], march["quote_count"], march["quoted_value"]), (0, 0, 0.0))
+        self.assertIsNone(march["margin"])
+        self.assertEqual(march["rolling_margin"], 20.0)
+        self.assertEqual((january["quote_count"], january["export_count"]), (2, 2))
+        self.assertEqual(january["margin"], 30.0)
+        self.assertEqual(february["margin"], 20.0)
+        # Glissant sur 2 mois : janvier + février, puis mars (vide) + avril
+        self.assertAlmostEqual(february["rolling_margin"], (20.0 + 40.0 + 20.0) / 3, places=3)
+        self.assertEqual(february["rolling_export_count"], 3)
+        self.assertEqual(april["rolling_margin"], 30.0)
+        self.assertEqual(april["rolling_export_count"], 1)
+        # Montant chiffré : prix à la plus grande quantité de la version exportée
+        # (a : 660 € de coût à 20 % = 825 € ; b : même coût à 40 % = 1100 €)
+        self.assertEqual(february["quoted_value"], 825.0)
+        self.assertEqual(january["quoted_value"], 825.0 + 1100.0)
+        self.assertEqual(april["rolling_quoted_value"], april["quoted_value"] / 2)
+
+    def test_series_by_client_and_typology(self):
+        """Une série par client ou par typologie."""
+        rows = self.service.get_time_series(group_by="client")
+        acme = [(r["month"], r["margin"]) for r in rows if r["group"] == "ACME"]
+        self.assertEqual(acme, [("2026-01", 30.0), ("2026-02", 20.0), ("2026-03", None), ("2026-04", None)])
+        globex = [r["export_count"] for r in rows if r["group"] == "Globex"]
+        self.assertEqual(globex, [0, 0, 0, 1])
+
+        rows = self.service.get_time_series(group_by="typology")
+        self.assertEqual({r["group"] for r in rows}, {"Mécanique"})
+        self.assertEqual([r["quote_count"] for r in rows], [2, 1, 0, 1])
+        self.assertTrue(all(r["quoted_value"] is None for r in rows))
+
+        with self.assertRaises(ValueError):
+            self.service.get_time_series(group_by="commercial")
+
+    def test_month_range(self):
+        """start / end bornent les mois, tous deux inclus."""
+        rows = self.service.get_time_series(start="2026-01", end="2026-01")
+        self.assertEqual([r["month"] for r in rows], ["2026-01"])
+        self.assertEqual(rows[0]["export_count"], 2)
+        rows = self.service.get_time_series(start="2026-02")
+        self.assertEqual([r["month"] for r in rows], ["2026-02", "2026-03", "2026-04"])
+        # Mois sans export aux bornes : présents, à zéro
+        rows = self.service.get_time_series(start="2025-12", end="2026-05")
+        self.assertEqual([r["month"] for r in rows],
+                         ["2025-12", "2026-01", "2026-02", "2026-03", "2026-04", "2026-05"])
+        self.assertEqual([r["export_count"] for r in rows], [0, 2, 1, 0, 1, 0])
+        self.assertEqual(_months_back(date(2026, 3, 15), 23), "2024-04")
+
+
+if __name__ == '__main__':
+    unittest.main()
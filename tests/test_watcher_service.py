@@ -0,0 +1,119 @@
+# tests/test_watcher_service.py
+"""
+Tests pour la surveillance du dossier des devis et l'indexation au fil de l'eau.
+"""
+
+import unittest
+import tempfile
+import os
+import shutil
+import time
+from infrastructure.database import Database
+from infrastructure.indexer import Indexer
+from infrastructure.watcher_service import (
+    FolderWatcher, InotifyBackend, PollingBackend, CHANGED, DELETED
+)
+from tests.test_legacy_migration_job import write_legacy_file
+
+
+class TestWatcherService(unittest.TestCase):
+    """Tests pour FolderWatcher, ses backends et Indexer.apply_file_events."""
+
+    def setUp(self):
+        """Préparation : un projet indexé dans un dossier temporaire."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.root = os.path.join(self.temp_dir, "quotes")
+        os.makedirs(os.path.join(self.root, "sub"))
+        self.file_a = os.path.join(self.root, "a.mwq")
+        write_legacy_file(self.file_a, "REF-A")
+        self.db = Database(os.path.join(self.temp_dir, "test.db"))
+        self.indexer = Indexer(self.db, max_workers=1)
+        self.indexer._index_worker(self.root, None, None)
+
+    def tearDown(self):
+        """Nettoyage après tests."""
+        self.db.close()
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def test_rename_moves_row_without_reparsing(self):
+        """Un renommage déplace la ligne existante (même id, pas de doublon)."""
+        row_id = self.db.search_projects()[0]["id"]
+        renamed = os.path.join(self.root, "sub", "renamed.mwq")
+        os.rename(self.file_a, renamed)
+
+        stats = self.indexer.apply_file_events([renamed], [self.file_a])
+
+        self.assertEqual(stats["moved"], [(self.file_a, renamed)])
+        self.assertEqual(stats["new"] + stats["removed"], [])
+        rows = self.db.search_projects(include_missing=True)
+        self.assertEqual([(r["id"], r["filepath"]) for r in rows], [(row_id, renamed)])
+
+    def test_move_onto_stale_row_cleans_derived_rows(self):
+        """Un déplacement sur le chemin d'une ligne périmée supprime celle-ci et ses lignes dérivées."""
+        stale = os.path.join(self.root, "b.mwq")
+        write_legacy_file(stale, "REF-B")
+        self.indexer._index_worker(self.root, None, None)
+        stale_id = next(r["id"] for r in self.db.search_projects() if r["filepath"] == stale)
+        moved_id = next(r["id"] for r in self.db.search_projects() if r["filepath"] == self.file_a)
+
+        self.assertEqual(self.db.move_filepaths([(self.file_a, stale)]), 1)
+
+        rows = self.db.search_projects(include_missing=True)
+        self.assertEqual([(r["id"], r["filepath"]) for r in rows], [(moved_id, stale)])
+        with self.db.get_connection() as conn:
+            for table, column in (("project_fts", "rowid"), ("thumbnails", "project_id"),
+                                  ("cost_lines", "project_id"), ("project_prices", "project_id")):
+                count = conn.execute(f"SELECT COUNT(*) FROM {table} WHERE {column} = ?", (stale_id,)).fetchone()[0]
+                self.assertEqual(count, 0, table)
+            if self.db.has_fuzzy:
+                count = conn.execute("SELECT COUNT(*) FROM project_trigrams WHERE rowid = ?", (stale_id,)).fetchone()[0]
+                self.assertEqual(count, 0)
+
+    def test_new_file_and_deleted_directory(self):
+        """Un nouveau fichier est indexé ; un dossier supprimé retire ses fichiers."""
+        file_b = os.path.join(self.root, "sub", "b.mwq")
+        write_legacy_file(file_b, "REF-B")
+        stats = self.indexer.apply_file_events([file_b], [])
+        self.assertEqual(stats["new"], [file_b])
+
+        shutil.rmtree(os.path.join(self.root, "sub"))
+        stats = self.indexer.apply_file_events([], [os.path.join(self.root, "sub")])
+
+        self.assertEqual(stats["removed"], [file_b])
+        self.assertEqual([r["reference"] for r in self.db.search_projects()], ["REF-A"])
+
+    def test_polling_backend_detects_changes(self):
+        """Le backend par scrutation détecte création, modification et suppression."""
+        backend = PollingBackend(self.root, interval_s=0)
+        file_b = os.path.join(self.root, "sub", "b.mwq")
+        write_legacy_file(file_b, "REF-B")
+        os.remove(self.file_a)
+
+        events = set(backend.poll())
+
+        self.assertEqual(events, {(CHANGED, file_b), (DELETED, self.file_a)})
+        self.assertEqual(backend.poll(), [])
+
+    @unittest.skipUnless(InotifyBackend.is_available(), "inotify indisponible")
+    def test_watcher_indexes_new_file(self):
+        """Avec inotify, un fichier déposé est indexé après le délai d'attente."""
+        changes = []
+        watcher = FolderWatcher(self.indexer, self.root, on_change=changes.append,
+                                debounce_s=0.2, use_polling=False)
+        watcher.start()
+        try:
+            self.assertTrue(watcher.wait_ready(timeout=5))
+            write_legacy_file(os.path.join(self.root, "sub", "c.mwq"), "REF-C")
+            deadline = time.monotonic() + 5
+            while not changes and time.monotonic() < deadline:
+                time.sleep(0.05)
+        finally:
+            watcher.stop()
+
+        self.assertTrue(changes)
+        self.assertIn("REF-C", [r["reference"] for r in self.db.search_projects()])
+
+
+if __name__ == '__main__':
+    unittest.main()
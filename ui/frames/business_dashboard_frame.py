@@ -41,6 +41,70 @@ class TypologyBarPanel(wx.Panel):
             y += bar_h
 
 
+class MonthlyTrendPanel(wx.Panel):
+    """Quoted value per month (bars) with the monthly and rolling margins (lines)."""
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.data = []
+        self.SetMinSize((-1, 200))
+        self.Bind(wx.EVT_PAINT, self._on_paint)
+        self.Bind(wx.EVT_SIZE, lambda e: (self.Refresh(), e.Skip()))
+
+    def set_data(self, rows):
+        self.data = rows or []
+        self.Refresh()
+
+    def _on_paint(self, event):
+        dc = wx.PaintDC(self)
+        gc = wx.GraphicsContext.Create(dc)
+        if not gc:
+            return
+        w, h = self.GetSize()
+        gc.SetBrush(wx.Brush(wx.Colour(255, 255, 255)))
+        gc.DrawRectangle(0, 0, w, h)
+        font = wx.Font(8, wx.FONTFAMILY_DEFAULT, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_NORMAL)
+        gc.SetFont(font, wx.BLACK)
+        if not self.data:
+            gc.DrawText("Aucun export daté", 10, 10)
+            return
+
+        left, right, top, bottom = 12, 60, 24, 22
+        plot_w = max(1, w - left - right)
+        plot_h = max(1, h - top - bottom)
+        slot = plot_w / len(self.data)
+        max_value = max([float(r.get("quoted_value") or 0.0) for r in self.data] + [1.0])
+        margins = [float(r[key]) for r in self.data for key in ("margin", "rolling_margin")
+                   if r.get(key) is not None]
+        max_margin = max(margins + [1.0])
+
+        gc.DrawText("Montant chiffré (barres), marge % (courbe), marge glissante (pointillés)", left, 4)
+
+        gc.SetBrush(wx.Brush(wx.Colour(176, 196, 222)))
+        gc.SetPen(wx.TRANSPARENT_PEN)
+        for i, row in enumerate(self.data):
+            bh = float(row.get("quoted_value") or 0.0) / max_value * plot_h
+            gc.DrawRectangle(left + i * slot + 2, top + plot_h - bh, max(1, slot - 4), bh)
+
+        def margin_points(key):
+            return [(left + (i + 0.5) * slot, top + plot_h - float(row[key]) / max_margin * plot_h)
+                    for i, row in enumerate(self.data) if row.get(key) is not None]
+
+        for key, pen in (("margin", wx.Pen(wx.Colour(70, 130, 180), 2)),
+                         ("rolling_margin", wx.Pen(wx.Colour(205, 92, 92), 2, wx.PENSTYLE_SHORT_DASH))):
+            points = margin_points(key)
+            if len(points) > 1:
+                gc.SetPen(pen)
+                gc.StrokeLines(points)
+
+        last = self.data[-1]
+        if last.get("rolling_margin") is not None:
+            gc.DrawText(f"{float(last['rolling_margin']):.1f}%", left + plot_w + 6, top)
+        step = max(1, len(self.data) // 8)
+        for i in range(0, len(self.data), step):
+            gc.DrawText(self.data[i].get("month", ""), left + i * slot, top + plot_h + 4)
+
+
 class BusinessDashboardFrame(wx.Frame):
     def __init__(self, parent, analytics_service):
         super().__init__(parent, title="MWQuote - Business Dashboard", size=(980, 700))
@@ -85,14 +149,37 @@ class BusinessDashboardFrame(wx.Frame):
         split.SplitVertically(left, right, 430)
         root.Add(split, 1, wx.EXPAND | wx.ALL, 5)
 
-        refresh_btn = wx.Button(panel, label="Rafraîchir")
-        refresh_btn.Bind(wx.EVT_BUTTON, lambda e: self._load_data())
-        root.Add(refresh_btn, 0, wx.ALIGN_RIGHT | wx.ALL, 8)
+        root.Add(wx.StaticText(panel, label="Tendance mensuelle (exports)"), 0, wx.LEFT | wx.TOP, 11)
+        self.trend_chart = MonthlyTrendPanel(panel)
+        root.Add(self.trend_chart, 0, wx.EXPAND | wx.ALL, 5)
+
+        bottom = wx.BoxSizer(wx.HORIZONTAL)
+        self.refresh_status = wx.StaticText(panel, label="")
+        bottom.Add(self.refresh_status, 1, wx.ALIGN_CENTER_VERTICAL | wx.ALL, 8)
+        self.refresh_btn = wx.Button(panel, label="Rafraîchir")
+        self.refresh_btn.Bind(wx.EVT_BUTTON, lambda e: self._load_data())
+        bottom.Add(self.refresh_btn, 0, wx.ALL, 8)
+        root.Add(bottom, 0, wx.EXPAND)
 
         panel.SetSizer(root)
 
     def _load_data(self):
-        data = self.analytics_service.get_dashboard_data()
+        """Show the last computed figures at once, then refresh them in the background."""
+        self._show_data(self.analytics_service.get_cached_dashboard_data())
+        self.refresh_btn.Disable()
+        self.refresh_status.SetLabel("Actualisation en cours...")
+        self.analytics_service.refresh_in_background(lambda data: wx.CallAfter(self._on_refreshed, data))
+
+    def _on_refreshed(self, data):
+        if not self:
+            # Frame closed while refreshing
+            return
+        self._show_data(data)
+        self.refresh_btn.Enable()
+
+    def _show_data(self, data):
+        refreshed_at = data.get("refreshed_at")
+        self.refresh_status.SetLabel(f"Données du {refreshed_at} (UTC)" if refreshed_at else "Jamais calculé")
         k = data.get("kpis", {})
         self.kpi_total.SetLabel(f"Projets: {k.get('projects_total', 0)}")
         self.kpi_non_final.SetLabel(f"Non finalisés: {k.get('projects_non_finalized', 0)}")
@@ -106,3 +193,4 @@ class BusinessDashboardFrame(wx.Frame):
             self.client_list.SetItem(idx, 2, str(int(row.get("projects_count", 0))))
 
         self.typology_chart.set_data(data.get("margin_by_typology", []))
+        self.trend_chart.set_data(data.get("monthly", []))
@@ -572,6 +572,7 @@ class MainFrame(wx.Frame):
                     event.Veto()
                     return
         clear_logs_directory()
+        self.db.close()
         self.Destroy()
 
     def _confirm_discard_or_save(self) -> bool:
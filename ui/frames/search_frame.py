@@ -6,17 +6,22 @@ import shutil
 import io
 import json
 import datetime as dt_module
+import threading
 from collections import defaultdict
 from datetime import date, datetime
 from infrastructure.database import Database
 from infrastructure.indexer import Indexer
 from infrastructure.persistence import PersistenceService
-from infrastructure.configuration import ConfigurationService
+from infrastructure.configuration import ConfigurationService, DEFAULT_ROOT_IO_WORKERS, MAX_ROOT_IO_WORKERS
 from infrastructure.migration_service import MigrationService
+from infrastructure.legacy_migration_job import LegacyMigrationJob, BACKUP_SUFFIX
+from infrastructure.batch_export_job import BatchExportJob
+from infrastructure.watcher_service import FolderWatcher
 from infrastructure.file_manager import FileManager
 from infrastructure.export_service import ExportService
 from infrastructure.template_manager import TemplateManager
 from infrastructure.analytics_service import AnalyticsService
+from infrastructure.search_results import SearchResultPager
 from infrastructure.logging_service import get_module_logger
 from ui.panels.search_project_details_panel import ProjectDetailsPanel
 from ui.panels.comparison_panel import ComparisonPanel
@@ -30,6 +35,9 @@ MONTHS_FR = ["Janvier", "Février", "Mars", "Avril", "Mai", "Juin",
              "Juillet", "Août", "Septembre", "Octobre", "Novembre", "Décembre"]
 DAYS_FR = ["Lundi", "Mardi", "Mercredi", "Jeudi", "Vendredi", "Samedi", "Dimanche"]
 
+# Most recent projects shown as timeline cards (one widget each)
+TIMELINE_LIMIT = 300
+
 
 class TimelinePanel(scrolled.ScrolledPanel):
     """Chronological timeline view of project activity."""
@@ -209,17 +217,92 @@ class TimelinePanel(scrolled.ScrolledPanel):
         card.Refresh()
 
 
+class ProjectListCtrl(wx.ListCtrl):
+    """Virtual result list: rows are read from a SearchResultPager as they are drawn."""
+
+    SERIE_BG = wx.Colour(210, 240, 220)   # soft green tint
+    PROTO_BG = wx.Colour(255, 235, 205)   # soft orange tint
+
+    def __init__(self, parent):
+        super().__init__(parent, style=wx.LC_REPORT | wx.LC_VIRTUAL | wx.BORDER_SUNKEN)
+        self.pager = None
+        self._serie_attr = wx.ItemAttr()
+        self._serie_attr.SetBackgroundColour(self.SERIE_BG)
+        self._proto_attr = wx.ItemAttr()
+        self._proto_attr.SetBackgroundColour(self.PROTO_BG)
+
+    def set_pager(self, pager, keep_view: bool = False):
+        """Show the rows of pager; keep_view redraws the visible rows in place (scroll kept)."""
+        count = len(pager) if pager is not None else 0
+        if not keep_view:
+            self.DeleteAllItems()
+            self.pager = pager
+            self.SetItemCount(count)
+            self.Refresh()
+            return
+        self.pager = pager
+        self.SetItemCount(count)
+        if count:
+            top = min(self.GetTopItem(), count - 1)
+            self.RefreshItems(top, min(count - 1, top + self.GetCountPerPage()))
+
+    def OnGetItemText(self, item, col):
+        p = self.pager.get(item) if self.pager is not None else None
+        if p is None:
+            return ""
+        if col == 0:
+            return "Oui" if p.get('preview_filename') else ""
+        if col == 1:
+            return str(p.get('reference') or "")
+        if col == 2:
+            return str(p.get('client') or "")
+        if col == 3:
+            return self._mode_label(p)
+        if col == 4:
+            return str(p.get('min_qty', 0))
+        if col == 5:
+            return str(p.get('max_qty', 0))
+        if col == 6:
+            return str(p.get('project_date') or "")
+        if col == 7:
+            return str(p.get('last_modified', ""))[:16]
+        return ""
+
+    def OnGetItemAttr(self, item):
+        p = self.pager.get(item) if self.pager is not None else None
+        if p is None:
+            return None
+        if p.get('is_prototype'):
+            return self._proto_attr
+        if p.get('has_serie'):
+            return self._serie_attr
+        return None
+
+    @staticmethod
+    def _mode_label(p) -> str:
+        has_serie = bool(p.get('has_serie', 0))
+        is_prototype = bool(p.get('is_prototype', 0))
+        if is_prototype and has_serie:
+            return "PROTO + SÉRIE"
+        if is_prototype:
+            return "PROTOTYPE"
+        if has_serie:
+            return "SÉRIE"
+        return "—"
+
+
 class SearchFrame(wx.Frame):
     def __init__(self):
         super().__init__(None, title="MWQuote - Analyse et Recherche", size=(1200, 800))
 
         self.db = Database()
-        self.indexer = Indexer(self.db)
         self.config = ConfigurationService.get_instance()
+        self.indexer = Indexer(self.db, max_workers=self.config.get_indexer_workers() or None)
         self.migration_service = MigrationService(self.db)
         self.export_service = ExportService(db=self.db)
         self.template_manager = TemplateManager(self.db)
         self.analytics_service = AnalyticsService(self.db)
+        self._restoring_selection = False
         
         self._build_ui()
         self._build_menu()
@@ -230,6 +313,10 @@ class SearchFrame(wx.Frame):
         self._timeline_mode = False
 
         self._refresh_list()
+
+        self.folder_watchers = []
+        self._start_folder_watchers()
+        wx.CallAfter(self._offer_migration_resume)
         
         self.Centre()
         self.Show()
@@ -272,7 +359,7 @@ class SearchFrame(wx.Frame):
         search_box = wx.BoxSizer(wx.HORIZONTAL)
         search_box.Add(wx.StaticText(top_bar_container, label="Rechercher :"), 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 5)
         self.search_global = wx.TextCtrl(top_bar_container, style=wx.TE_PROCESS_ENTER)
-        self.search_global.SetHint("Réf, Client, Nom...")
+        self.search_global.SetHint("Réf, client, nom, opération, réf. fournisseur...")
         search_box.Add(self.search_global, 1, wx.EXPAND)
 
         search_btn = wx.Button(top_bar_container, label="Rechercher")
@@ -307,7 +394,7 @@ class SearchFrame(wx.Frame):
         self.left_sizer = wx.BoxSizer(wx.VERTICAL)
 
         # List view
-        self.list_ctrl = wx.ListCtrl(self.left_container, style=wx.LC_REPORT | wx.BORDER_SUNKEN)
+        self.list_ctrl = ProjectListCtrl(self.left_container)
         self.list_ctrl.InsertColumn(0, "Preview", width=70)
         self.list_ctrl.InsertColumn(1, "Référence", width=120)
         self.list_ctrl.InsertColumn(2, "Client", width=120)
@@ -338,7 +425,7 @@ class SearchFrame(wx.Frame):
         self.right_sizer = wx.BoxSizer(wx.VERTICAL)
         
         self.details_panel = ProjectDetailsPanel(self.right_container)
-        self.comparison_panel = ComparisonPanel(self.right_container)
+        self.comparison_panel = ComparisonPanel(self.right_container, db=self.db)
         
         self.right_sizer.Add(self.details_panel, 1, wx.EXPAND)
         self.right_sizer.Add(self.comparison_panel, 1, wx.EXPAND)
@@ -429,7 +516,17 @@ class SearchFrame(wx.Frame):
         self.comparison_panel.Hide()
         self.right_container.Layout()
         if p_data.get('filepath'):
-            self.details_panel.load_project(p_data['filepath'])
+            self._show_project_details(p_data)
+
+    def _show_project_details(self, p_data):
+        """Show the indexed structure at once, then load the file for prices and graphs."""
+        if p_data.get('id') is not None:
+            operations, cost_lines = self.db.get_project_structure(p_data['id'])
+            thumbnail = self.db.get_thumbnail(p_data['id'])
+            if operations or thumbnail:
+                self.details_panel.show_index_summary(p_data, operations, cost_lines, thumbnail)
+                self.details_panel.Update()
+        self.details_panel.load_project(p_data['filepath'])
 
     def _on_timeline_item_activated(self, p_data):
         """Open project editor on double-click of a timeline card."""
@@ -450,6 +547,12 @@ class SearchFrame(wx.Frame):
     def _on_search(self, event):
         """Trigger global search"""
         term = self.search_global.GetValue()
+        if event is not None and term.strip():
+            # New search: best matches first until a column header is clicked
+            self.sort_col = "relevance"
+        elif self.sort_col == "relevance" and not term.strip():
+            self.sort_col = "last_modified"
+            self.sort_ascending = False
         self._refresh_list(term)
 
     def _on_col_click(self, event):
@@ -466,64 +569,55 @@ class SearchFrame(wx.Frame):
             
         self._on_search(None)
 
-    def _refresh_list(self, term=None):
+    def _refresh_list(self, term=None, keep_view=False):
         if term is None: term = self.search_global.GetValue()
 
         sort_order = "ASC" if self.sort_ascending else "DESC"
-        results = self.db.search_projects(
+        # Rows are fetched page by page as the list draws them
+        results = SearchResultPager(
+            self.db,
             global_search=term,
             sort_by=self.sort_col,
             sort_order=sort_order
         )
 
-        # Build project_map for all modes (needed by context menu, etc.)
-        self.project_map = {}
+        # project_map: index -> project row, for all modes (needed by context menu, etc.)
+        self.project_map = results
 
         if self._timeline_mode:
-            self.timeline_panel.load_events(results)
-            self.SetStatusText(f"{len(results)} projets trouvés")
-            return
-
-        self.list_ctrl.DeleteAllItems()
-
-        SERIE_BG  = wx.Colour(210, 240, 220)   # soft green tint
-        PROTO_BG  = wx.Colour(255, 235, 205)   # soft orange tint
-
-        for i, p in enumerate(results):
-            has_preview = bool(p.get('preview_filename'))
-            has_serie    = bool(p.get('has_serie', 0))
-            is_prototype = bool(p.get('is_prototype', 0))
-
-            if is_prototype and has_serie:
-                mode_label = "PROTO + SÉRIE"
-            elif is_prototype:
-                mode_label = "PROTOTYPE"
-            elif has_serie:
-                mode_label = "SÉRIE"
+            if results.is_fuzzy:
+                recent = list(results.rows())
             else:
-                mode_label = "—"
-
-            idx = self.list_ctrl.InsertItem(i, "Oui" if has_preview else "")
-            self.list_ctrl.SetItem(idx, 1, str(p.get('reference') or ""))
-            self.list_ctrl.SetItem(idx, 2, str(p.get('client') or ""))
-            self.list_ctrl.SetItem(idx, 3, mode_label)
-            self.list_ctrl.SetItem(idx, 4, str(p.get('min_qty', 0)))
-            self.list_ctrl.SetItem(idx, 5, str(p.get('max_qty', 0)))
-            self.list_ctrl.SetItem(idx, 6, str(p.get('project_date') or ""))
-            ts = p.get('last_modified', "")
-            self.list_ctrl.SetItem(idx, 7, str(ts)[:16])
-
-            if is_prototype:
-                self.list_ctrl.SetItemBackgroundColour(idx, PROTO_BG)
-            elif has_serie:
-                self.list_ctrl.SetItemBackgroundColour(idx, SERIE_BG)
-
-            self.project_map[idx] = p
+                recent = self.db.search_projects(global_search=term, sort_by="last_modified",
+                                                 sort_order="DESC", limit=TIMELINE_LIMIT)
+            self.timeline_panel.load_events(recent)
+            if len(results) > len(recent):
+                self.SetStatusText(f"{len(results)} projets trouvés ({len(recent)} plus récents affichés)")
+            else:
+                self.SetStatusText(f"{len(results)} projets trouvés")
+            return
 
-        self.SetStatusText(f"{len(results)} projets trouvés")
+        self.list_ctrl.set_pager(results, keep_view=keep_view)
+        exports = self.db.find_exports(term) if self.db.parse_quote_number(term) else []
+        if exports:
+            # Quote number (customer order): the quote and the version it was issued for
+            export = exports[0]
+            self.SetStatusText(f"Devis {export['devis_ref']} : {export['reference'] or export['name']} "
+                               f"({export['client'] or 'client inconnu'}), version {export['version_index']}, "
+                               f"exporté le {export['export_date']}")
+            if len(results) == 1:
+                self.list_ctrl.Select(0)
+                self.list_ctrl.Focus(0)
+        elif results.is_fuzzy:
+            self.SetStatusText(f"Aucun résultat exact pour « {term.strip()} » : "
+                               f"{len(results)} références approchantes")
+        else:
+            self.SetStatusText(f"{len(results)} projets trouvés")
 
     def _on_item_selected(self, event):
         """Update display based on selection count (Details vs Comparison)"""
+        if self._restoring_selection:
+            return
         count = self.list_ctrl.GetSelectedItemCount()
         
         # Hide/Show panels
@@ -541,7 +635,7 @@ class SearchFrame(wx.Frame):
             idx = event.GetIndex()
             if idx in self.project_map:
                 p_data = self.project_map[idx]
-                self.details_panel.load_project(p_data['filepath'])
+                self._show_project_details(p_data)
         elif 2 <= count <= 4:
             # Multi-selection -> Automatic comparison
             selected_indices = []
@@ -551,7 +645,8 @@ class SearchFrame(wx.Frame):
                 idx = self.list_ctrl.GetNextSelected(idx)
             
             filepaths = [self.project_map[i]['filepath'] for i in selected_indices]
-            self.comparison_panel.load_projects(filepaths)
+            project_ids = [self.project_map[i].get('id') for i in selected_indices]
+            self.comparison_panel.load_projects(filepaths, project_ids)
         elif count > 4:
             self.details_panel.Show()
             self.comparison_panel.Hide()
@@ -805,7 +900,14 @@ class SearchFrame(wx.Frame):
         if btn:
             btn.Enable()
         self._refresh_list()
-        wx.MessageBox(f"Indexation terminée.\n{count} projets trouvés.", "Succès", wx.OK | wx.ICON_INFORMATION)
+        run = self.indexer.last_run_stats or {}
+        details = ""
+        if run:
+            details = (f"\n\n- Nouveaux : {len(run.get('new', []))}"
+                       f"\n- Modifiés : {len(run.get('changed', []))}"
+                       f"\n- Supprimés : {len(run.get('removed', []))}"
+                       f"\n- Inchangés : {run.get('unchanged', 0)}")
+        wx.MessageBox(f"Indexation terminée.\n{count} projets trouvés.{details}", "Succès", wx.OK | wx.ICON_INFORMATION)
 
     def _on_maintenance(self, event):
         """Show maintenance dialog with debugging and cleaning tools"""
@@ -815,10 +917,18 @@ class SearchFrame(wx.Frame):
 
         missing_info = f"\n- Projets manquants : {stats['missing_projects']}" if stats.get('missing_projects', 0) > 0 else ""
         root_info = root_folder if root_folder else "(non défini)"
+        quote_roots = self.config.get_quote_roots()
+        roots_info = ""
+        if len(quote_roots) > 1:
+            roots_info = "Racines de devis :\n" + "".join(
+                f"- {root['label'] or root['path']} : {self.db.count_projects(root_path=root['path'])} projets"
+                f" ({root['io_workers']} lectures parallèles)\n"
+                for root in quote_roots) + "\n"
         msg = (f"Maintenance & Debug - MWQuote\n\n"
                f"Base : {db_path}\n"
                f"Taille : {stats['db_size_kb']:.1f} KB\n"
                f"Dossier racine : {root_info}\n\n"
+               f"{roots_info}"
                f"Statistiques :\n"
                f"- Projets indexés : {stats['total_projects']}{missing_info}\n"
                f"- Clients uniques : {stats['total_clients']}\n"
@@ -831,8 +941,14 @@ class SearchFrame(wx.Frame):
             choices.append(f"Re-scanner le dossier racine")
             choices.append(f"Re-scanner + Migrer vers ZIP")
             choices.append(f"Migrer noms legacy vers UUID")
+        if len(quote_roots) > 1:
+            choices.append("Re-scanner toutes les racines")
+        choices.append("Annuler la dernière migration ZIP")
+        choices.append("Supprimer les sauvegardes d'une migration ZIP...")
         choices.extend([
             "Définir/Changer le dossier racine...",
+            "Ajouter une racine de devis...",
+            "Retirer une racine de devis...",
             "Relocaliser les fichiers vers un nouveau dossier...",
             "Réconcilier fichiers déplacés",
             "Vérifier l'intégrité de la base",
@@ -850,23 +966,27 @@ class SearchFrame(wx.Frame):
             selected = dlg.GetStringSelection()
 
             if selected == "Re-scanner le dossier racine":
-                self._do_index(root_folder, migrate=False)
+                self._do_index(root_folder, migrate=False, full_rescan=True)
             elif selected == "Re-scanner + Migrer vers ZIP":
-                self._do_index(root_folder, migrate=True)
+                self._do_index(root_folder, migrate=True, full_rescan=True)
             elif selected == "Migrer noms legacy vers UUID":
                 self._do_migrate_legacy_filenames(root_folder)
+            elif selected == "Re-scanner toutes les racines":
+                self._do_index_roots(full_rescan=True)
+            elif selected == "Annuler la dernière migration ZIP":
+                self._on_rollback_zip_migration()
+            elif selected == "Supprimer les sauvegardes d'une migration ZIP...":
+                self._on_purge_migration_backups()
             elif selected == "Définir/Changer le dossier racine...":
                 self._on_set_root_folder()
+            elif selected == "Ajouter une racine de devis...":
+                self._on_add_quote_root()
+            elif selected == "Retirer une racine de devis...":
+                self._on_remove_quote_root()
             elif selected == "Relocaliser les fichiers vers un nouveau dossier...":
                 self._on_relocate_files()
             elif selected == "Réconcilier fichiers déplacés":
-                rec_stats = self.indexer.reconcile()
-                self._refresh_list()
-                wx.MessageBox(f"Réconciliation terminée.\n\n"
-                             f"Fichiers vérifiés: {rec_stats['checked']}\n"
-                             f"Nouveaux manquants: {rec_stats['missing']}\n"
-                             f"Retrouvés: {rec_stats['found']}",
-                             "Réconciliation", wx.OK | wx.ICON_INFORMATION)
+                self._do_reconcile()
             elif selected == "Vérifier l'intégrité de la base":
                 ok = self.db.check_integrity()
                 if ok:
@@ -892,6 +1012,91 @@ class SearchFrame(wx.Frame):
                     self._refresh_list()
                     wx.MessageBox("Base de données réinitialisée (VACUUM OK).", "Succès", wx.OK | wx.ICON_INFORMATION)
 
+    def _on_rollback_zip_migration(self):
+        """Restore the legacy JSON files converted by the last ZIP migration batch."""
+        job = LegacyMigrationJob(self.db)
+        batch = next((b for b in self.db.get_migration_batches()
+                      if b["status"] not in ("rolled_back", "purged")), None)
+        if batch is None:
+            wx.MessageBox("Aucune migration ZIP à annuler.", "Information", wx.OK | wx.ICON_INFORMATION)
+            return
+        converted = len(self.db.get_migration_entries(batch["batch_id"], status="done"))
+        if wx.MessageBox(f"Lot {batch['batch_id']} ({batch['root_path']})\n"
+                         f"{converted} fichiers convertis seront restaurés au format JSON d'origine.\n\n"
+                         f"Continuer ?",
+                         "Annuler la migration ZIP", wx.YES_NO | wx.ICON_WARNING) != wx.YES:
+            return
+
+        self.SetStatusText("Annulation de la migration ZIP...")
+
+        def progress(msg):
+            wx.CallAfter(self.SetStatusText, msg)
+
+        def run():
+            stats = job.rollback(batch["batch_id"], progress_callback=progress)
+            wx.CallAfter(self._on_rollback_complete, batch, stats)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def _on_rollback_complete(self, batch, stats):
+        self.SetStatusText("Migration ZIP annulée.")
+        self._do_index(batch["root_path"], migrate=False)
+
+        msg = f"{stats['restored']} fichiers restaurés."
+        if stats["changed"]:
+            msg += (f"\n\n{len(stats['changed'])} fichiers modifiés depuis la migration, conservés "
+                    f"(sauvegarde {BACKUP_SUFFIX} gardée) :\n"
+                    + "\n".join(os.path.basename(p) for p in stats["changed"][:5]))
+        if stats["errors"]:
+            msg += f"\n\n{len(stats['errors'])} erreurs :\n" + "\n".join(stats["errors"][:5])
+        wx.MessageBox(msg, "Annuler la migration ZIP", wx.OK | wx.ICON_INFORMATION)
+
+    def _offer_migration_resume(self):
+        """Offer to resume a ZIP migration batch interrupted by a crash or a stop."""
+        job = LegacyMigrationJob(self.db)
+        batch_id = job.find_interrupted_batch()
+        if batch_id is None:
+            return
+        batch = next(b for b in self.db.get_migration_batches() if b["batch_id"] == batch_id)
+        if not os.path.isdir(batch["root_path"]):
+            return
+        done = len(self.db.get_migration_entries(batch_id, status="done"))
+        if wx.MessageBox(f"La migration ZIP du lot {batch_id} ({batch['root_path']}) a été interrompue "
+                         f"après {done} fichiers convertis.\n\nReprendre la migration maintenant ?",
+                         "Migration ZIP interrompue", wx.YES_NO | wx.ICON_QUESTION) == wx.YES:
+            # The indexer resumes the interrupted batch of the root (LegacyMigrationJob.run_or_resume)
+            self._do_index(batch["root_path"], migrate=True)
+
+    def _on_purge_migration_backups(self):
+        """Delete the .v1bak backups of a checked ZIP migration batch (no rollback afterwards)."""
+        batches = [b for b in self.db.get_migration_batches() if b["status"] in ("completed", "rolled_back")]
+        batches = [(b, len(self.db.get_migration_entries(b["batch_id"], status="done"))) for b in batches]
+        batches = [(b, count) for b, count in batches if count]
+        if not batches:
+            wx.MessageBox("Aucune sauvegarde de migration ZIP à supprimer.", "Information",
+                          wx.OK | wx.ICON_INFORMATION)
+            return
+        labels = [f"{b['batch_id']} ({b['root_path']}) - {count} sauvegardes" for b, count in batches]
+        dlg = wx.SingleChoiceDialog(self, "Lot dont les sauvegardes seront supprimées :",
+                                    "Sauvegardes de migration ZIP", labels)
+        if dlg.ShowModal() != wx.ID_OK:
+            dlg.Destroy()
+            return
+        batch, count = batches[dlg.GetSelection()]
+        dlg.Destroy()
+        if wx.MessageBox(f"{count} fichiers {BACKUP_SUFFIX} du lot {batch['batch_id']} seront supprimés.\n"
+                         f"La migration ne pourra plus être annulée.\n\nContinuer ?",
+                         "Sauvegardes de migration ZIP", wx.YES_NO | wx.ICON_WARNING) != wx.YES:
+            return
+
+        self.SetStatusText("Suppression des sauvegardes de migration...")
+
+        def run():
+            removed = LegacyMigrationJob(self.db).purge_backups(batch["batch_id"])
+            wx.CallAfter(self.SetStatusText, f"{removed} sauvegardes de migration supprimées.")
+
+        threading.Thread(target=run, daemon=True).start()
+
     def _on_export_ai_dataset(self):
         """Export anonymized project dataset for AI analysis (business + software usage)."""
         rows = self.db.search_projects(include_missing=False, sort_by="last_modified", sort_order="DESC")
@@ -1067,8 +1272,13 @@ class SearchFrame(wx.Frame):
             "operations": operations_payload,
         }
 
-    def _do_index(self, folder: str, migrate: bool = False):
-        """Helper to run indexing on a folder."""
+    def _do_index(self, folder: str, migrate: bool = False, full_rescan: bool = False):
+        """Helper to run indexing on a folder.
+
+        full_rescan lists every directory again, so files edited in place
+        (directory mtime unchanged) are re-read too: used by the explicit
+        "Re-scanner" maintenance actions.
+        """
         self.SetStatusText(f"Indexation de {folder}...")
 
         def progress(msg):
@@ -1078,7 +1288,77 @@ class SearchFrame(wx.Frame):
             wx.CallAfter(self._on_index_complete, count, None)
 
         self.indexer.index_directory(folder, progress_callback=progress,
-                                    completion_callback=complete, migrate_to_zip=migrate)
+                                    completion_callback=complete, migrate_to_zip=migrate,
+                                    full_rescan=full_rescan)
+
+    def _do_index_roots(self, roots=None, full_rescan: bool = False):
+        """Index the registered quote roots (all by default), each with its own scanner and I/O limit."""
+        roots = roots if roots is not None else self.config.get_quote_roots()
+        self.SetStatusText(f"Indexation de {len(roots)} racines...")
+
+        def progress(msg):
+            wx.CallAfter(self.SetStatusText, msg)
+
+        def complete(count):
+            wx.CallAfter(self._on_index_complete, count, None)
+
+        self.indexer.index_roots(roots, progress_callback=progress, completion_callback=complete,
+                                 full_rescan=full_rescan)
+
+    def _on_add_quote_root(self):
+        """Register another folder of quotes (archives, legacy tree) and index it."""
+        with wx.DirDialog(self, "Choisir une racine de devis supplémentaire",
+                          style=wx.DD_DEFAULT_STYLE | wx.DD_DIR_MUST_EXIST) as dir_dialog:
+            if dir_dialog.ShowModal() == wx.ID_CANCEL:
+                return
+            path = dir_dialog.GetPath()
+
+        label = wx.GetTextFromUser("Nom de la racine (ex. Archives, NAS) :", "Racine de devis",
+                                   os.path.basename(path), self)
+        io_workers = wx.GetNumberFromUser(
+            "Lectures de dossiers en parallèle :\nélevé pour un disque local, faible pour un NAS.",
+            "Lectures", "Racine de devis", DEFAULT_ROOT_IO_WORKERS, 1, MAX_ROOT_IO_WORKERS, self)
+        if io_workers == -1:
+            return
+        self.config.add_quote_root(path, label, io_workers)
+        self._start_folder_watchers()
+        self._do_index_roots([root for root in self.config.get_quote_roots() if root['path'] == path])
+
+    def _on_remove_quote_root(self):
+        """Unregister a quote root; its projects stay in the index until cleaned up."""
+        roots = self.config.get_quote_roots()[1:]
+        if not roots:
+            wx.MessageBox("Aucune racine supplémentaire enregistrée.", "Information", wx.OK | wx.ICON_INFORMATION)
+            return
+        labels = [f"{root['label']} ({root['path']})" if root['label'] else root['path'] for root in roots]
+        dlg = wx.SingleChoiceDialog(self, "Racine à retirer :", "Racines de devis", labels)
+        if dlg.ShowModal() == wx.ID_OK:
+            self.config.remove_quote_root(roots[dlg.GetSelection()]['path'])
+            self._start_folder_watchers()
+        dlg.Destroy()
+
+    def _do_reconcile(self):
+        """Check every indexed file in the background (network shares can be slow)."""
+        self.SetStatusText("Réconciliation en cours...")
+
+        def progress(msg):
+            wx.CallAfter(self.SetStatusText, msg)
+
+        def run():
+            rec_stats = self.indexer.reconcile(progress_callback=progress)
+            wx.CallAfter(self._on_reconcile_complete, rec_stats)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def _on_reconcile_complete(self, rec_stats):
+        self.SetStatusText("Réconciliation terminée.")
+        self._refresh_list()
+        interrupted = "\n\n(Interrompue avant la fin)" if rec_stats.get('interrupted') else ""
+        wx.MessageBox(f"Réconciliation terminée.\n\n"
+                     f"Fichiers vérifiés: {rec_stats['checked']}\n"
+                     f"Nouveaux manquants: {rec_stats['missing']}\n"
+                     f"Retrouvés: {rec_stats['found']}{interrupted}",
+                     "Réconciliation", wx.OK | wx.ICON_INFORMATION)
 
     def _on_set_root_folder(self):
         """Set or change the root folder for quotes."""
@@ -1092,6 +1372,7 @@ class SearchFrame(wx.Frame):
                 
                 # Update configuration
                 self.config.set_quotes_root_folder(new_folder)
+                self._start_folder_watchers()
                 
                 # Offer automatic migration if there's an old folder and it's different
                 if old_folder and old_folder != new_folder and os.path.exists(old_folder):
@@ -1217,6 +1498,7 @@ class SearchFrame(wx.Frame):
             finally:
                 progress_dlg.Destroy()
 
+            self._start_folder_watchers()
             self._refresh_list()
 
             msg = f"Relocalisation terminée.\n\n{copied} fichiers copiés."
@@ -1332,6 +1614,35 @@ class SearchFrame(wx.Frame):
         
         event.Skip()
 
+    def _on_batch_export_item(self, progress, job, result, processed, total):
+        label = result.get('reference') or os.path.basename(result['filepath'])
+        if result['status'] == 'done':
+            logger.info(f"Export successful: {result['output_path']}")
+        else:
+            logger.error(f"Export failed for {label}: {result['error']}")
+        keep_going, _ = progress.Update(processed, f"Export {processed}/{total} : {label}")
+        if not keep_going:
+            job.stop()
+
+    def _on_batch_export_complete(self, progress, stats):
+        progress.Destroy()
+        if stats.get("error"):
+            wx.MessageBox(f"Export interrompu :\n{stats['error']}", "Export Excel", wx.OK | wx.ICON_ERROR)
+            return
+
+        errors = [f"{r.get('reference') or os.path.basename(r['filepath'])}: {r['error']}"
+                  for r in stats["results"] if r["status"] == "failed"]
+        msg = f"Export terminé!\n\n{stats['exported']}/{stats['total']} fichiers exportés."
+        if stats["cancelled"]:
+            msg += f"\n{stats['cancelled']} exports annulés (numéros de devis réservés non utilisés)."
+        if errors:
+            msg += f"\n\n{len(errors)} erreurs :\n" + "\n".join(errors[:5])
+            if len(errors) > 5:
+                msg += f"\n... et {len(errors) - 5} autres"
+
+        wx.MessageBox(msg, "Export Excel", wx.OK | wx.ICON_INFORMATION if stats["exported"] > 0 else wx.ICON_WARNING)
+        self._refresh_list()
+
     def _on_quick_export_xlsx(self, event):
         """Quick export to XLSX with automatic numbering and template (supports multiple selection)"""
         # Get all selected items
@@ -1369,62 +1680,32 @@ class SearchFrame(wx.Frame):
                     return
                 
                 output_dir = dirDialog.GetPath()
-                
-                # Show progress dialog
-                progress = wx.ProgressDialog(
-                    "Export Excel - Fichiers multiples",
-                    "Initialisation...",
-                    maximum=len(selected_indices),
-                    style=wx.PD_APP_MODAL | wx.PD_AUTO_HIDE | wx.PD_CAN_ABORT
-                )
-                
-                success_count = 0
-                error_list = []
-                
+
+            filepaths = [self.project_map[i]['filepath'] for i in selected_indices if self.project_map.get(i)]
+            progress = wx.ProgressDialog(
+                "Export Excel - Fichiers multiples",
+                "Réservation des numéros de devis...",
+                maximum=len(filepaths),
+                parent=self,
+                style=wx.PD_APP_MODAL | wx.PD_AUTO_HIDE | wx.PD_CAN_ABORT | wx.PD_ELAPSED_TIME | wx.PD_REMAINING_TIME
+            )
+            job = BatchExportJob(self.db, indexer=self.indexer)
+
+            def on_item(result, processed, total):
+                wx.CallAfter(self._on_batch_export_item, progress, job, result, processed, total)
+
+            def run():
                 try:
-                    for i, item_idx in enumerate(selected_indices):
-                        p_data = self.project_map.get(item_idx)
-                        if not p_data:
-                            continue
-                        
-                        try:
-                            project = PersistenceService.load_project(p_data['filepath'])
-                            reference = self.export_service.get_devis_reference(project=project)
-                            default_filename = self.export_service.get_default_filename(project, devis_ref=reference)
-                            output_path = os.path.join(output_dir, default_filename)
-                            
-                            # Update progress
-                            wx.CallAfter(progress.Update, i, f"Export {i+1}/{len(selected_indices)}: {p_data['reference']}")
-                            
-                            # Generate Excel file
-                            self.export_service.export_excel(
-                                project,
-                                template_path,
-                                output_path,
-                                project_save_path=p_data['filepath'],
-                                devis_ref=reference
-                            )
-
-                            success_count += 1
-                            logger.info(f"Export successful: {output_path}")
-                            
-                        except Exception as e:
-                            error_list.append(f"{p_data['reference']}: {str(e)}")
-                            logger.error(f"Export failed for {p_data['reference']}: {e}")
-                
-                finally:
-                    progress.Destroy()
-                
-                # Show summary
-                msg = f"Export terminé!\n\n{success_count}/{len(selected_indices)} fichiers exportés."
-                if error_list:
-                    msg += f"\n\n{len(error_list)} erreurs :\n" + "\n".join(error_list[:5])
-                    if len(error_list) > 5:
-                        msg += f"\n... et {len(error_list) - 5} autres"
-                
-                wx.MessageBox(msg, "Export Excel", wx.OK | wx.ICON_INFORMATION if success_count > 0 else wx.ICON_WARNING)
-                self._refresh_list()
-                return
+                    stats = job.run(filepaths, template_path, output_dir, progress_callback=on_item)
+                except Exception as e:
+                    logger.error(f"Batch export failed: {e}", exc_info=True)
+                    stats = {"total": len(filepaths), "exported": 0, "failed": 0, "cancelled": 0,
+                             "results": [], "error": str(e)}
+                wx.CallAfter(self._on_batch_export_complete, progress, stats)
+
+            # Rendered in worker processes: the UI stays responsive and the export can be cancelled
+            threading.Thread(target=run, daemon=True).start()
+            return
         
         # Single file export
         p_data = self.project_map.get(selected_indices[0])
@@ -1760,9 +2041,78 @@ class SearchFrame(wx.Frame):
 
     def _on_close(self, event):
         """Handle window close event"""
+        self._stop_folder_watchers()
         self.indexer.stop()
+        self.db.close()
         self.Destroy()
 
+    def _stop_folder_watchers(self):
+        for watcher in self.folder_watchers:
+            watcher.stop()
+        self.folder_watchers = []
+
+    def _start_folder_watchers(self):
+        """(Re)start live indexing of every quote root (call again when the roots change)."""
+        self._stop_folder_watchers()
+        if not self.config.is_folder_watch_enabled():
+            return
+        for root in self.config.get_quote_roots():
+            if not os.path.isdir(root['path']):
+                continue
+            watcher = FolderWatcher(
+                self.indexer, root['path'],
+                on_change=lambda stats: wx.CallAfter(self._on_folder_change, stats)
+            )
+            watcher.start()
+            self.folder_watchers.append(watcher)
+
+    def _on_folder_change(self, stats):
+        """Index updated by the folder watcher."""
+        parts = []
+        if stats['new']:
+            parts.append(f"{len(stats['new'])} nouveau(x)")
+        if stats['changed']:
+            parts.append(f"{len(stats['changed'])} modifié(s)")
+        if stats['moved']:
+            parts.append(f"{len(stats['moved'])} déplacé(s)")
+        if stats['removed']:
+            parts.append(f"{len(stats['removed'])} supprimé(s)")
+        # Refreshed in place: the user's selection, scroll position and details stay
+        selected = self._selected_filepaths()
+        self._refresh_list(keep_view=True)
+        if not self._timeline_mode:
+            self._restore_selection(selected)
+            if len(selected) == 1 and selected[0] in stats['changed']:
+                index = self.project_map.index_of(selected[0])
+                if index is not None:
+                    self._show_project_details(self.project_map[index])
+        if parts:
+            self.SetStatusText("Dossier surveillé : " + ", ".join(parts))
+
+    def _selected_filepaths(self):
+        paths = []
+        idx = self.list_ctrl.GetFirstSelected()
+        while idx != -1:
+            if idx in self.project_map:
+                paths.append(self.project_map[idx]['filepath'])
+            idx = self.list_ctrl.GetNextSelected(idx)
+        return paths
+
+    def _restore_selection(self, filepaths):
+        """Select the rows of filepaths again (their position may have changed), details unchanged."""
+        self._restoring_selection = True
+        try:
+            idx = self.list_ctrl.GetFirstSelected()
+            while idx != -1:
+                self.list_ctrl.Select(idx, on=False)
+                idx = self.list_ctrl.GetNextSelected(idx)
+            for filepath in filepaths:
+                index = self.project_map.index_of(filepath)
+                if index is not None:
+                    self.list_ctrl.Select(index)
+        finally:
+            self._restoring_selection = False
+
     def _select_and_display_quote(self, filepath):
         """
         Find and display a quote in the list and details panel.
@@ -1773,11 +2123,7 @@ class SearchFrame(wx.Frame):
         """
         try:
             # Find the item in project_map that matches this filepath
-            target_idx = None
-            for idx, p_data in self.project_map.items():
-                if p_data.get('filepath') == filepath:
-                    target_idx = idx
-                    break
+            target_idx = self.project_map.index_of(filepath)
             
             if target_idx is not None:
                 # Clear previous selection and select the target item
@@ -4,13 +4,14 @@ import os
 import wx.grid
 from infrastructure.persistence import PersistenceService
 from domain.calculator import Calculator
-from domain.cost import CostType
 
 class ComparisonPanel(wx.Panel):
-    def __init__(self, parent):
+    def __init__(self, parent, db=None):
         super().__init__(parent)
         
+        self.db = db
         self.projects = []
+        self.project_prices = []  # per project: {quantity: indexed price row}
         self.offer_checks = []
         self.chart_elements = []
         self.current_tooltip = None
@@ -92,14 +93,20 @@ class ComparisonPanel(wx.Panel):
         
         self.SetSizer(main_sizer)
 
-    def load_projects(self, filepaths):
+    def load_projects(self, filepaths, project_ids=None):
+        """Load the projects to compare; grid cells come from the index prices when project_ids is given."""
         self.projects = []
+        self.project_prices = []
         # Limit to 2 projects for comparison
         max_projects = 2
-        for fp in filepaths[:max_projects]:
+        indexed = {}
+        if self.db is not None and project_ids:
+            indexed = self.db.get_project_prices(list(project_ids[:max_projects]))
+        for i, fp in enumerate(filepaths[:max_projects]):
             try:
                 p = PersistenceService.load_project(fp)
                 self.projects.append(p)
+                self.project_prices.append(indexed.get(project_ids[i], {}) if project_ids else {})
             except Exception:
                 continue
         
@@ -140,6 +147,14 @@ class ComparisonPanel(wx.Panel):
         self._refresh_offer_checkboxes()
         self.Refresh()
 
+    def _price_breakdown(self, project_idx: int, qty: int) -> dict:
+        """Indexed price row of a project at qty, computed when the quantity is not quoted."""
+        row = self.project_prices[project_idx].get(qty) if project_idx < len(self.project_prices) else None
+        if row is not None:
+            return row
+        p = self.projects[project_idx]
+        return Calculator.calculate_price_breakdown(p.operations, qty, p.volume_margin_rates.get(qty, 1.0))
+
     def _on_qty_change(self, event):
         self._update_comparison_grid()
         self.Refresh()
@@ -162,7 +177,7 @@ class ComparisonPanel(wx.Panel):
         for i, q in enumerate(base_qtys):
             self.smart_grid.SetRowLabelValue(i, f"Qté: {q}")
             for j, p in enumerate(self.projects):
-                price = p.total_price(q)
+                price = self._price_breakdown(j, q)['unit_price']
                 self.smart_grid.SetCellValue(i, j, f"{price:.4f} €/pc")
                 if j == 0:
                     self.smart_grid.SetCellBackgroundColour(i, j, wx.Colour(245, 245, 245))
@@ -192,50 +207,28 @@ class ComparisonPanel(wx.Panel):
             self.metrics_inner_grid.Add(t, 0, wx.ALIGN_LEFT | wx.ALIGN_CENTER_VERTICAL)
             
             row_idx = labels.index(lbl)
-            for p in self.projects:
+            for p_idx, p in enumerate(self.projects):
                 val = "-"
                 # Note: Smart match also for metrics!
-                unit_p = p.total_price(qty)
+                prices = self._price_breakdown(p_idx, qty)
                 if row_idx == 0:
                     display = p.display_name
                     val = f"{display[:20]}" if len(display) > 20 else display
                 elif row_idx == 1:
-                    val = f"{unit_p * qty:.2f} €"
+                    val = f"{prices['unit_price'] * qty:.2f} €"
                 elif row_idx == 2 or row_idx == 3:
-                    ps = 0; prod_s = 0
-                    for op in p.operations:
-                        for cost in op._get_active_costs():
-                            res = Calculator.calculate_item(cost, qty)
-                            if cost.cost_type == CostType.INTERNAL_OPERATION: prod_s += res.unit_sale_price * qty
-                            else: ps += res.unit_sale_price * qty
+                    ps, prod_s = prices['purchase_sale'], prices['internal_sale']
                     total = ps + prod_s
                     if total > 0:
                         val = f"{ps/total*100:.1f} %" if row_idx == 2 else f"{prod_s/total*100:.1f} %"
                 elif row_idx == 4:
-                    pc = 0; ps = 0
-                    for op in p.operations:
-                        for cost in op._get_active_costs():
-                            if cost.cost_type != CostType.INTERNAL_OPERATION:
-                                res = Calculator.calculate_item(cost, qty)
-                                pc += res.batch_supplier_cost
-                                ps += res.unit_sale_price * qty
+                    pc, ps = prices['purchase_cost'], prices['purchase_sale']
                     val = f"{((ps-pc)/ps*100):.1f} %" if ps > 0 else "0 %"
                 elif row_idx == 5:
-                    th = 0; ps = 0
-                    for op in p.operations:
-                        for cost in op._get_active_costs():
-                            if cost.cost_type == CostType.INTERNAL_OPERATION:
-                                res = Calculator.calculate_item(cost, qty)
-                                th += cost.fixed_time + (cost.per_piece_time * qty)
-                                ps += res.unit_sale_price * qty
+                    th, ps = prices['internal_hours'], prices['internal_sale']
                     val = f"{ps/th:.2f} €/h" if th > 0 else "0 €/h"
                 elif row_idx == 6:
-                    th = 0
-                    for op in p.operations:
-                        for cost in op._get_active_costs():
-                            if cost.cost_type == CostType.INTERNAL_OPERATION:
-                                th += cost.fixed_time + (cost.per_piece_time * qty)
-                    val = f"{th:.2f} h"
+                    val = f"{prices['internal_hours']:.2f} h"
                 
                 v = wx.StaticText(self.scroll, label=val)
                 if row_idx == 0:
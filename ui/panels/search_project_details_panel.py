@@ -16,6 +16,8 @@ class ProjectDetailsPanel(wx.Panel):
     def __init__(self, parent):
         super().__init__(parent)
         self.project = None
+        # The preview area already shows the index thumbnail of the loading project
+        self._thumbnail_shown = False
         self._build_ui()
         
     # Colour constants for mode badges
@@ -127,6 +129,47 @@ class ProjectDetailsPanel(wx.Panel):
             self._update_history_ui()
         except Exception as e:
             wx.MessageBox(f"Erreur de chargement: {e}", "Erreur", wx.OK | wx.ICON_ERROR)
+        finally:
+            self._thumbnail_shown = False
+
+    def show_index_summary(self, project_row: dict, operations: list, cost_lines: list,
+                           thumbnail: bytes = None):
+        """Show the structure and preview thumbnail stored in the index right away,
+        before the file is loaded.
+
+        Tree items carry no data: they are replaced by load_project.
+        """
+        self.project = None
+        self._show_thumbnail(thumbnail)
+        client_str = f" | {project_row.get('client')}" if project_row.get('client') else ""
+        self.title_lbl.SetLabel(f"Projet: {project_row.get('reference') or ''}{client_str}")
+        self.tree.DeleteAllItems()
+        root = self.tree.AddRoot("Root")
+
+        lines_by_op = {}
+        for line in cost_lines:
+            lines_by_op.setdefault(line['op_position'], []).append(line)
+        for op in operations:
+            op_item = self.tree.AppendItem(root, f"🔧 {op.get('typology') or 'Op'} | {op.get('label') or ''}")
+            for line in lines_by_op.get(op['position'], []):
+                if line.get('typology') == SUBCONTRACTING_TYPOLOGY and not line.get('is_active'):
+                    c_item = self.tree.AppendItem(op_item, f"📁 [ARCHIVE] {line.get('name')}")
+                    self.tree.SetItemTextColour(c_item, wx.Colour(150, 150, 150))
+                else:
+                    self.tree.AppendItem(op_item, f"{self._cost_icon(line.get('cost_type'))} {line.get('name')}")
+        self.tree.ExpandAll()
+        self.Layout()
+
+    @staticmethod
+    def _cost_icon(cost_type_value) -> str:
+        CT = domain_cost.CostType
+        if cost_type_value in (CT.MATERIAL.value, CT.SUBCONTRACTING.value):
+            return "💰"
+        if cost_type_value == CT.INTERNAL_OPERATION.value:
+            return "⚙️"
+        if cost_type_value == CT.TOOLING.value:
+            return "🛠️"
+        return "📈"
 
     def _populate_version_selector(self):
         self.version_choice.Clear()
@@ -235,8 +278,7 @@ class ProjectDetailsPanel(wx.Panel):
         for op in self.project.operations:
             op_item = self.tree.AppendItem(root, f"🔧 {op.typology or 'Op'} | {op.label}")
             for cost in op.costs.values():
-                cost_icon = "💰" if cost.cost_type in [domain_cost.CostType.MATERIAL, domain_cost.CostType.SUBCONTRACTING] else "⚙️" if cost.cost_type == domain_cost.CostType.INTERNAL_OPERATION else "🛠️" if cost.cost_type == domain_cost.CostType.TOOLING else "📈"
-                label = f"{cost_icon} {cost.name}"
+                label = f"{self._cost_icon(cost.cost_type.value)} {cost.name}"
                 
                 is_archived = (op.typology == SUBCONTRACTING_TYPOLOGY and not cost.is_active)
                 if is_archived:
@@ -251,9 +293,29 @@ class ProjectDetailsPanel(wx.Panel):
             self.tree.SetItemData(op_item, {"type": "operation", "operation": op})
         
         self.tree.ExpandAll()
-        self._set_preview_bitmap(getattr(self.project, 'preview_image', None))
+        preview_doc = getattr(self.project, 'preview_image', None)
+        if self._thumbnail_shown and preview_doc and getattr(preview_doc, 'data', None):
+            # Same image, already scaled at index time: no need to decode the full one
+            self.open_preview_btn.Enable()
+        else:
+            self._set_preview_bitmap(preview_doc)
         self.Layout()
 
+    def _show_thumbnail(self, thumbnail: bytes):
+        """Preview area from an index thumbnail (PNG already at PREVIEW_WIDTH x PREVIEW_HEIGHT)."""
+        self._thumbnail_shown = False
+        self.open_preview_btn.Disable()
+        if thumbnail:
+            image = wx.Image(wx.MemoryInputStream(thumbnail), wx.BITMAP_TYPE_PNG)
+            if image.IsOk():
+                if (image.GetWidth(), image.GetHeight()) == (self.PREVIEW_WIDTH, self.PREVIEW_HEIGHT):
+                    self.preview_bitmap.SetBitmap(wx.Bitmap(image))
+                else:
+                    self.preview_bitmap.SetBitmap(self._bitmap_from_wx_image(image))
+                self._thumbnail_shown = True
+                return
+        self.preview_bitmap.SetBitmap(self._build_blank_preview_bitmap())
+
     def _set_preview_bitmap(self, preview_doc):
         if preview_doc and getattr(preview_doc, 'data', None):
             try: